@@ -0,0 +1,104 @@
+"""
+Benchmark for parsing time growth on adversarial pages
+
+Builds pages designed to make backtracking regexes blow up (long runs of
+capitalized words with no suffix next to them, pasted text without line
+breaks, long whitespace runs after field labels, long amounts) at doubling
+sizes, and times chunking plus validation and metadata for both rule sets.
+The growth exponent is fitted on a log-log scale from the smallest to the
+largest size; it fails if any case grows faster than --max-exponent (1.0
+is linear, 2.0 quadratic). --legacy also times the old business name
+regex on the first case, to show what the rewrite removed.
+
+Usage: python benchmarks/bench_adversarial.py [--base 2000] [--steps 5] [--max-exponent 1.3] [--legacy]
+"""
+
+import argparse
+import math
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from onenote_parsing import (com_extractor, com_scanner, page_entries, powershell_extractor,
+                             powershell_scanner)
+
+RULES = {
+    'com': (com_scanner, com_extractor),
+    'powershell': (powershell_scanner, powershell_extractor),
+}
+
+LEGACY_BUSINESS_NAME = re.compile(
+    r'([A-Z][a-z]+\s+[A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)\s*(?:LLC|INC|CORP|COMPANY)'
+)
+
+# Page text for n units of each adversarial shape
+CASES = {
+    'capitalized_run': lambda n: 'Underwriter: 1 on 01/02/2024 ' + 'Acme ' * n + 'x LLC',
+    'no_line_breaks': lambda n: (
+        'underwriter john smith broker jane doe company: acme widgets llc '
+        'paid $1,000 on 01/02/2024 n/a Business Name Group ' * (n // 16 + 1)
+    ),
+    'whitespace_runs': lambda n: ('Underwriter' + ' ' * 40 + 'Acme' + ' ' * 40) * (n // 4 + 1) + '1',
+    'label_spaces': lambda n: ('underwriter:' + ' ' * 40 + '1 01/02/2024 ') * (n // 4 + 1),
+    'long_amount': lambda n: 'Broker: Jane Doe 01/02/2024 $' + '1,' * n,
+    'single_word': lambda n: 'Company: A' + 'a' * (n * 4) + ' 01/02/2024',
+}
+
+
+def best_time(function, argument, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(argument)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def exponent(sizes, times):
+    """Slope of log(time) over log(size) between the first and last size"""
+    return math.log(max(times[-1], 1e-9) / max(times[0], 1e-9)) / math.log(sizes[-1] / sizes[0])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--base', type=int, default=2000, help="units in the smallest page")
+    parser.add_argument('--steps', type=int, default=5, help="number of doublings")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--max-exponent', type=float, default=1.3)
+    parser.add_argument('--legacy', action='store_true',
+                        help="also time the old business name regex (slow on purpose)")
+    args = parser.parse_args()
+
+    sizes = [args.base * 2 ** step for step in range(args.steps)]
+    failures = []
+    for case, build in CASES.items():
+        for rules, (scanner, extractor) in RULES.items():
+            times = []
+            for size in sizes:
+                page = {'content': build(size)}
+                times.append(best_time(lambda page: page_entries(page, scanner, extractor),
+                                       page, args.repeat))
+            growth = exponent(sizes, times)
+            print(f"{case:>16} {rules:>10}: {times[0] * 1000:8.2f} ms -> {times[-1] * 1000:8.2f} ms "
+                  f"({len(build(sizes[-1])):,} chars), exponent {growth:.2f}")
+            if growth > args.max_exponent:
+                failures.append(f"{case} ({rules}) grows with exponent {growth:.2f}")
+
+    if args.legacy:
+        legacy_sizes = sizes[:3]
+        times = [best_time(LEGACY_BUSINESS_NAME.search, CASES['capitalized_run'](size), 1)
+                 for size in legacy_sizes]
+        print(f"{'legacy regex':>16} {'':>10}: {times[0] * 1000:8.2f} ms -> {times[-1] * 1000:8.2f} ms, "
+              f"exponent {exponent(legacy_sizes, times):.2f}")
+
+    for failure in failures:
+        print(failure)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Benchmark for the asyncio extraction core against the streaming script
+
+Runs powershell_stub.py with every --slow-every'th page taking --slow-delay
+milliseconds, as a page that hangs in GetPageContent would. The streaming
+PowerShellBackend, given --page-timeout as its silence timeout, stops at
+the first slow page; AsyncExtractor skips each slow page after
+--page-timeout and carries on. A second async run with --deadline shows a
+partial run ending on time. Checks the async run delivers exactly the pages
+that are not slow, in order, and the deadline run a prefix of them.
+
+Usage: python benchmarks/bench_async.py [--pages 100] [--delay 10] [--slow-every 25]
+                                        [--slow-delay 5000] [--page-timeout 1] [--fetchers 4]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARKS))
+
+from onenote_async import AsyncExtractor
+from onenote_backends import PowerShellBackend
+from synthetic import page_id
+
+
+def run(pages):
+    """Page records and seconds for one extraction"""
+    start = time.perf_counter()
+    received = list(pages)
+    return received, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pages', type=int, default=100)
+    parser.add_argument('--delay', type=float, default=10, help="milliseconds per page")
+    parser.add_argument('--slow-every', type=int, default=25)
+    parser.add_argument('--slow-delay', type=float, default=5000, help="milliseconds per slow page")
+    parser.add_argument('--page-timeout', type=float, default=1, help="seconds")
+    parser.add_argument('--deadline', type=float, help="seconds (default: half the async run)")
+    parser.add_argument('--fetchers', type=int, default=4)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    stub = [sys.executable, os.path.join(BENCHMARKS, 'powershell_stub.py'),
+            '--pages', str(args.pages), '--delay', str(args.delay), '--seed', str(args.seed),
+            '--slow-every', str(args.slow_every), '--slow-delay', str(args.slow_delay)]
+
+    def backend():
+        return PowerShellBackend('notebook.one', timeout=args.page_timeout, command=stub)
+
+    expected = [page_id(index) for index in range(args.pages) if (index + 1) % args.slow_every]
+
+    streamed, elapsed = run(backend().iter_pages())
+    print(f"{'streaming':>9}: {len(streamed):4} pages in {elapsed:6.2f}s")
+
+    extractor = AsyncExtractor(backend(), args.fetchers, args.page_timeout)
+    fetched, elapsed = run(extractor.iter_pages())
+    print(f"{'async':>9}: {len(fetched):4} pages in {elapsed:6.2f}s, "
+          f"{extractor.stats['page_timeouts']} timed out")
+
+    deadline = args.deadline or round(elapsed / 2, 1)
+    partial = AsyncExtractor(backend(), args.fetchers, args.page_timeout, deadline)
+    cut, elapsed = run(partial.iter_pages())
+    print(f"{'deadline':>9}: {len(cut):4} pages in {elapsed:6.2f}s against {deadline:g}s, "
+          f"{partial.stats['skipped_pages']} skipped")
+
+    failed = False
+    if [page['page_id'] for page in fetched] != expected:
+        print("Async run did not deliver the pages that are not slow, in order")
+        failed = True
+    delivered = [page['page_id'] for page in cut]
+    if delivered != expected[:len(delivered)]:
+        print("Deadline run did not deliver a prefix of the pages")
+        failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Benchmark for the incremental re-extraction cache
+
+Records a synthetic notebook as hierarchy/page XML, then runs the COM
+extraction path against it through a replay backend three times: with an
+empty cache, with a warm cache, and after a share of pages changed. Each
+GetPageContent call sleeps --latency milliseconds to stand in for the COM
+round-trip. Checks that cached runs produce the same entries as the cold one.
+
+Usage: python benchmarks/bench_cache.py [--pages N] [--changed 0.05] [--latency 20]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from onenote_backends import ComBackend, LatencyBackend, RecordedOneNote
+from onenote_cache import PageCache
+from onenote_extractor import iter_onenote_data
+from onenote_parsing import com_extractor, com_scanner, iter_business_entries
+from synthetic import generate_pages, record_notebook
+
+
+def run(directory, cache, latency):
+    one_note = RecordedOneNote(directory)
+    stats = Counter()
+    start = time.perf_counter()
+    pages = iter_onenote_data('notebook.one', LatencyBackend(ComBackend(one_note), latency), cache)
+    entries = list(iter_business_entries(pages, com_scanner, com_extractor, stats, cache=cache))
+    return entries, time.perf_counter() - start, one_note.calls['GetPageContent'], stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pages', type=int, default=500)
+    parser.add_argument('--changed', type=float, default=0.05)
+    parser.add_argument('--latency', type=float, default=20, help="milliseconds per page")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    pages = generate_pages(args.pages, seed=args.seed)
+    latency = args.latency / 1000
+    changed = set(range(0, args.pages, max(1, round(1 / args.changed)))) if args.changed else set()
+
+    with tempfile.TemporaryDirectory() as directory:
+        record_notebook(pages, directory)
+        with PageCache(os.path.join(directory, 'cache.sqlite')) as cache:
+            # The extractor's progress prints would drown the results
+            stdout, sys.stdout = sys.stdout, open(os.devnull, 'w')
+            try:
+                cold = run(directory, cache, latency)
+                warm = run(directory, cache, latency)
+                record_notebook(pages, directory,
+                                {index: '2025-02-01T00:00:00.000Z' for index in changed})
+                incremental = run(directory, cache, latency)
+            finally:
+                sys.stdout.close()
+                sys.stdout = stdout
+
+    for name, (entries, elapsed, calls, stats) in (
+            ('cold', cold), ('warm', warm), (f'{len(changed)} changed', incremental)):
+        if entries != cold[0]:
+            print(f"{name}: entries differ from the cold run")
+            sys.exit(1)
+        print(f"{name:>12}: {elapsed:6.2f}s, {calls} GetPageContent calls, "
+              f"{stats['cached_pages']} pages from cache, {len(entries)} entries")
+
+
+if __name__ == "__main__":
+    main()
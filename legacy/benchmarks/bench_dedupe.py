@@ -0,0 +1,92 @@
+"""
+Benchmark for near-duplicate merging as the number of entries grows
+
+Generates entries where --copy-rate of them are copies of an earlier entry
+with one word changed (like copied-forward meeting notes), at doubling
+sizes, and times dedupe_entries on them. Reports entries per second and
+how many copies were merged, and fails if the time grows faster than
+--max-exponent on a log-log scale (1.0 is linear, 2.0 is what comparing
+every pair would cost). --trace-memory adds tracemalloc's peak (and slows
+every run down); with a small --max-index it stays flat once the index is
+full.
+
+Usage: python benchmarks/bench_dedupe.py [--base 5000] [--steps 4] [--copy-rate 0.5]
+                                         [--max-index 100000] [--trace-memory]
+"""
+
+import argparse
+import math
+import os
+import random
+import sys
+import time
+import tracemalloc
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from onenote_dedupe import DEFAULT_MAX_INDEX, DEFAULT_THRESHOLD, dedupe_entries
+
+VOCABULARY = [f'word{i}' for i in range(5000)]
+
+
+def generate_entries(count, copy_rate, words_per_entry, seed):
+    """Yield entries, copy_rate of them an earlier entry with one word changed"""
+    rng = random.Random(seed)
+    originals = []
+    for index in range(count):
+        if originals and rng.random() < copy_rate:
+            words = rng.choice(originals).split()
+            words[rng.randrange(len(words))] = rng.choice(VOCABULARY)
+            text = ' '.join(words)
+        else:
+            text = ' '.join(rng.choice(VOCABULARY) for _ in range(words_per_entry))
+            originals.append(text)
+        yield {
+            'source_notebook': 'Synthetic', 'source_section': f'Section {index % 10}',
+            'source_page': f'Page {index}', 'raw_content': text,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--base', type=int, default=5000, help="entries in the smallest run")
+    parser.add_argument('--steps', type=int, default=4, help="number of doublings")
+    parser.add_argument('--copy-rate', type=float, default=0.5)
+    parser.add_argument('--words', type=int, default=40, help="words per entry")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument('--max-index', type=int, default=DEFAULT_MAX_INDEX)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--max-exponent', type=float, default=1.3)
+    parser.add_argument('--trace-memory', action='store_true')
+    args = parser.parse_args()
+
+    sizes = [args.base * 2 ** step for step in range(args.steps)]
+    times = []
+    for size in sizes:
+        stats = Counter()
+        if args.trace_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        kept = sum(1 for _ in dedupe_entries(
+            generate_entries(size, args.copy_rate, args.words, args.seed),
+            args.threshold, args.max_index, stats
+        ))
+        elapsed = time.perf_counter() - start
+        times.append(elapsed)
+        line = (f"{size:>9,} entries: {elapsed:7.2f} s  {size / elapsed:9,.0f} entries/s  "
+                f"kept {kept:,}, merged {stats['duplicates']:,}")
+        if args.trace_memory:
+            line += f"  peak {tracemalloc.get_traced_memory()[1] / 1024 / 1024:6.1f} MB"
+            tracemalloc.stop()
+        print(line)
+
+    growth = math.log(times[-1] / times[0]) / math.log(sizes[-1] / sizes[0])
+    print(f"Growth exponent: {growth:.2f}")
+    if growth > args.max_exponent:
+        print(f"Time grows faster than --max-exponent {args.max_exponent}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Benchmark for fetching pages ahead of parsing
+
+Replays a synthetic notebook through a backend that delays every page fetch
+by --latency milliseconds, and parses it with an increasing number of fetch
+threads. Checks that every run yields the same entries in the same order and
+reports pages/second and speedup per fetcher count.
+
+Usage: python benchmarks/bench_fetch.py [--pages N] [--latency 20] [--fetchers 1,2,4,8]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from onenote_backends import LatencyBackend, ReplayBackend
+from onenote_parsing import com_extractor, com_scanner, iter_business_entries
+from synthetic import generate_pages, record_notebook
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pages', type=int, default=300)
+    parser.add_argument('--latency', type=float, default=20, help="milliseconds per page")
+    parser.add_argument('--fetchers', default='1,2,4,8')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    pages = generate_pages(args.pages, entries_per_page=8, noise_lines=40, seed=args.seed)
+
+    with tempfile.TemporaryDirectory() as directory:
+        record_notebook(pages, directory)
+        backend = LatencyBackend(ReplayBackend(directory), args.latency / 1000)
+
+        reference = None
+        serial_time = None
+        for fetchers in [int(count) for count in args.fetchers.split(',')]:
+            # The backend's progress prints would drown the results
+            stdout, sys.stdout = sys.stdout, open(os.devnull, 'w')
+            try:
+                start = time.perf_counter()
+                entries = list(iter_business_entries(
+                    backend.iter_pages(fetchers=fetchers), com_scanner, com_extractor
+                ))
+                elapsed = time.perf_counter() - start
+            finally:
+                sys.stdout.close()
+                sys.stdout = stdout
+
+            if reference is None:
+                reference = entries
+                serial_time = elapsed
+            elif entries != reference:
+                print(f"fetchers={fetchers}: output differs from the first run")
+                sys.exit(1)
+
+            print(f"fetchers={fetchers:>3}: {len(pages) / elapsed:,.0f} pages/s, "
+                  f"speedup {serial_time / elapsed:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Benchmark for the entry index: build, incremental update and query latency
+
+Indexes a synthetic notebook the way --index does, times a set of term,
+field and date-range queries (first DEFAULT_LIMIT results) against the
+index and against loading the extraction's JSON and scanning every entry,
+then changes --changed of the pages and times the incremental update.
+Checks that every query finds the same entries both ways and that the
+updated index holds the same rows as one built from scratch, and fails if
+a query's p99 is over --max-ms.
+
+Usage: python benchmarks/bench_index.py [--pages 40000] [--changed 0.01] [--repeat 50] [--max-ms 100]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from onenote_index import EntryIndex, iso_day, parse_day
+from onenote_parsing import com_extractor, com_scanner, iter_business_entries
+from synthetic import generate_pages, page_id
+
+# (label, search arguments, the same condition on an entry dict)
+QUERIES = [
+    ('words', {'words': 'loss runs acme'},
+     lambda entry: all(word in entry['raw_content'].lower() for word in ('loss runs', 'acme'))),
+    ('underwriter', {'underwriter': 'priya shah'},
+     lambda entry: (entry.get('underwriter') or '').lower() == 'priya shah'),
+    ('broker prefix + dates', {'broker': 'lock*', 'date_from': '2024-03-01', 'date_to': '2024-03-31'},
+     lambda entry: (entry.get('broker') or '').lower().startswith('lock')
+     and '2024-03-01' <= (iso_day(entry.get('primary_date')) or '') <= '2024-03-31'),
+    ('words + dates', {'words': 'financials', 'date_from': '1/1/25', 'date_to': '1/15/25'},
+     lambda entry: 'financials' in entry['raw_content'].lower()
+     and parse_day('1/1/25') <= (iso_day(entry.get('primary_date')) or '') <= parse_day('1/15/25')),
+]
+
+
+def notebook(pages, modified=()):
+    """Page records with the IDs and lastModifiedTime a backend would give them"""
+    for index, page in enumerate(pages):
+        yield {**page, 'page_id': page_id(index),
+               'last_modified': '2025-02-01T00:00:00.000Z' if index in modified
+               else '2025-01-01T00:00:00.000Z'}
+
+
+def build(path, pages, modified=()):
+    """Run the index stage over the pages; returns the entry dicts, seconds and stats"""
+    stats = Counter()
+    start = time.perf_counter()
+    with EntryIndex(path) as index:
+        entries = index.index_entries(iter_business_entries(
+            index.track_pages(notebook(pages, modified), stats), com_scanner, com_extractor, stats
+        ))
+        entries = [entry.to_dict() for entry in entries]
+        stats['pruned_pages'] = index.prune()
+    return entries, time.perf_counter() - start, stats
+
+
+def rows(path):
+    with EntryIndex(path) as index:
+        return sorted(index.db.execute(
+            'SELECT page_key, raw_content, underwriter, company, broker, primary_day, metadata '
+            'FROM entries'
+        ))
+
+
+def percentile(times, share):
+    times = sorted(times)
+    return times[min(len(times) - 1, int(len(times) * share))] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pages', type=int, default=40_000)
+    parser.add_argument('--changed', type=float, default=0.01)
+    parser.add_argument('--repeat', type=int, default=50, help="runs of each query")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--max-ms', type=float, default=100.0, help="highest p99 per query")
+    args = parser.parse_args()
+
+    pages = generate_pages(args.pages, seed=args.seed)
+    failed = False
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'index.sqlite')
+        entries, elapsed, stats = build(path, pages)
+        print(f"build: {len(entries):,} entries from {stats['indexed_pages']:,} pages in {elapsed:.2f} s")
+
+        json_path = os.path.join(directory, 'entries.json')
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(entries, f, ensure_ascii=False)
+        del entries
+
+        with EntryIndex(path) as index:
+            for label, query, condition in QUERIES:
+                times = []
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    index.search(**query)
+                    times.append(time.perf_counter() - start)
+                found = index.search(**query, limit=len(pages) * 10)
+
+                start = time.perf_counter()
+                with open(json_path, encoding='utf-8') as f:
+                    expected = [entry for entry in json.load(f) if condition(entry)]
+                scan = time.perf_counter() - start
+
+                same = sorted(map(json.dumps, found)) == sorted(map(json.dumps, expected))
+                p99 = percentile(times, 0.99)
+                print(f"{label:>22}: {len(found):6,} entries  p50 {percentile(times, 0.5):7.2f} ms  "
+                      f"p99 {p99:7.2f} ms  load and scan {scan * 1000:8.1f} ms"
+                      f"{'' if same else '  DIFFERENT RESULTS'}")
+                failed |= not same or p99 > args.max_ms
+
+        step = max(1, round(1 / args.changed)) if args.changed else len(pages) + 1
+        modified = set(range(0, len(pages), step))
+        for index in modified:
+            pages[index]['content'] += '\n\nUnderwriter: Zebulon Quill\nEffective date 2/3/25'
+        _, elapsed, stats = build(path, pages, modified)
+        print(f"update: {stats['indexed_pages']:,} changed pages in {elapsed:.2f} s")
+
+        fresh = os.path.join(directory, 'fresh.sqlite')
+        build(fresh, pages, modified)
+        if rows(path) != rows(fresh):
+            print("Updated index differs from one built from scratch")
+            failed = True
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
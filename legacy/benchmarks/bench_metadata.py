@@ -0,0 +1,126 @@
+"""
+Benchmark for business entry validation and metadata extraction
+
+Compares the original per-pattern regex scans against the fused
+BusinessEntryExtractor on a synthetic underwriting corpus and checks that
+both produce the same results.
+
+Usage: python benchmarks/bench_metadata.py [--chunks N] [--repeat N]
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from onenote_parsing import com_extractor, powershell_extractor
+from synthetic import generate_chunks
+
+
+def legacy_com(chunk):
+    """The original is_valid_business_entry + extract_business_metadata (COM)"""
+    lower_chunk = chunk.lower()
+    has_underwriter = 'underwriter' in lower_chunk and 'n/a' not in lower_chunk
+    has_broker = 'broker' in lower_chunk and 'n/a' not in lower_chunk
+    has_company = bool(re.search(r'(?:company|business|client|account):\s*[a-z]', chunk, re.IGNORECASE))
+    has_date = bool(re.search(r'\d{1,2}[/-]\d{1,2}[/-]\d{2,4}', chunk))
+    if not (has_underwriter or ((has_broker or has_company) and has_date)):
+        return False, None
+
+    metadata = {}
+    underwriter_match = re.search(r'underwriter:\s*([A-Za-z\s&,.\'-]+)', chunk, re.IGNORECASE)
+    if underwriter_match:
+        metadata['underwriter'] = underwriter_match.group(1).strip()
+    company_match = re.search(r'(?:company|business|client|account):\s*([A-Za-z\s&,.\'-]+)', chunk, re.IGNORECASE)
+    if company_match:
+        metadata['company'] = company_match.group(1).strip()
+    broker_match = re.search(r'broker:\s*([A-Za-z\s&,.\'-]+)', chunk, re.IGNORECASE)
+    if broker_match:
+        metadata['broker'] = broker_match.group(1).strip()
+    dates = re.findall(r'\d{1,2}[/-]\d{1,2}[/-]\d{2,4}', chunk)
+    if dates:
+        metadata['dates'] = ', '.join(dates)
+        metadata['primary_date'] = dates[0]
+    amounts = re.findall(r'\$[\d,]+(?:\.\d{2})?', chunk)
+    if amounts:
+        metadata['amounts'] = ', '.join(amounts)
+    return True, metadata
+
+
+def legacy_powershell(chunk):
+    """The original is_valid_business_entry + extract_business_metadata (PowerShell)"""
+    lower_chunk = chunk.lower()
+    has_underwriter = ('underwriter' in lower_chunk or 'underwritten' in lower_chunk) and 'n/a' not in lower_chunk
+    has_broker = 'broker' in lower_chunk and 'n/a' not in lower_chunk
+    has_company = bool(re.search(r'(?:company|business|client|account)[:\s]*[a-z]', chunk, re.IGNORECASE))
+    has_date = bool(re.search(r'\d{1,2}[/-]\d{1,2}[/-]\d{2,4}', chunk))
+    has_business_name = bool(re.search(r'[A-Z][a-z]+\s+[A-Z][a-z]+\s+(?:LLC|INC|CORP|COMPANY)', chunk))
+    if not (has_underwriter or ((has_broker or has_company or has_business_name) and has_date)):
+        return False, None
+
+    metadata = {}
+    for pattern in [r'underwriter:?\s*([A-Za-z\s&,.\'-]+)', r'underwritten\s+by\s*([A-Za-z\s&,.\'-]+)']:
+        match = re.search(pattern, chunk, re.IGNORECASE)
+        if match:
+            metadata['underwriter'] = match.group(1).strip()
+            break
+    company_match = re.search(r'(?:company|business|client|account):?\s*([A-Za-z\s&,.\'-]+)', chunk, re.IGNORECASE)
+    if company_match:
+        metadata['company'] = company_match.group(1).strip()
+    broker_match = re.search(r'broker:?\s*([A-Za-z\s&,.\'-]+)', chunk, re.IGNORECASE)
+    if broker_match:
+        metadata['broker'] = broker_match.group(1).strip()
+    business_name_match = re.search(r'([A-Z][a-z]+\s+[A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)\s*(?:LLC|INC|CORP|COMPANY)', chunk)
+    if business_name_match and 'company' not in metadata:
+        metadata['company'] = business_name_match.group(1).strip()
+    dates = re.findall(r'\d{1,2}[/-]\d{1,2}[/-]\d{2,4}', chunk)
+    if dates:
+        metadata['dates'] = ', '.join(dates)
+        metadata['primary_date'] = dates[0]
+    amounts = re.findall(r'\$[\d,]+(?:\.\d{2})?', chunk)
+    if amounts:
+        metadata['amounts'] = ', '.join(amounts)
+    return True, metadata
+
+
+def best_rate(func, chunks, repeat):
+    """Best chunks/second over several runs"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for chunk in chunks:
+            func(chunk)
+        best = min(best, time.perf_counter() - start)
+    return len(chunks) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--chunks', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    chunks = generate_chunks(args.chunks, seed=args.seed)
+    print(f"Synthetic corpus: {len(chunks)} chunks, {sum(map(len, chunks))} characters")
+
+    for name, before, after in [
+        ('com', legacy_com, com_extractor.analyze),
+        ('powershell', legacy_powershell, powershell_extractor.analyze),
+    ]:
+        mismatches = sum(1 for chunk in chunks if before(chunk) != after(chunk))
+        if mismatches:
+            print(f"{name}: {mismatches} chunks differ from the original extractor")
+            sys.exit(1)
+
+        before_rate = best_rate(before, chunks, args.repeat)
+        after_rate = best_rate(after, chunks, args.repeat)
+        print(f"{name:>10}: before {before_rate:,.0f} chunks/s, "
+              f"after {after_rate:,.0f} chunks/s ({after_rate / before_rate:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Benchmark for normalizing entry fields by column batch against per row
+
+Generates --entries entries with joined dates, amounts and company names in
+the shapes the extractors produce, and times normalize_entries against the
+same normalization written row by row with strptime and re. The columns
+line times normalize_columns alone on ready-made arrays, which is what is
+left once the rows don't have to be turned into columns and back. Fails if
+the batched and per-row results disagree on any entry.
+
+Usage: python benchmarks/bench_normalize.py [--entries 1000000] [--batch-size 65536]
+"""
+
+import argparse
+import datetime
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from onenote_normalize import (NAME_FIELDS, NAME_SUFFIX, NORMALIZE_BATCH_SIZE, NORMALIZED_FIELDS,
+                               normalize_columns, normalize_entries)
+
+COMPANIES = ['Acme Widgets LLC', 'ACME WIDGETS, Inc.', 'Northwind  Traders Corp', 'Contoso Company',
+             'Fabrikam Ltd.', 'Litware', None]
+
+
+def generate_entries(count, seed):
+    rng = random.Random(seed)
+
+    def date():
+        separator = rng.choice('/-')
+        year = rng.choice([f'{rng.randrange(0, 100):02d}', str(rng.randrange(1990, 2030))])
+        return f'{rng.randrange(1, 14)}{separator}{rng.randrange(1, 32)}{separator}{year}'
+
+    def amount():
+        return f'${rng.randrange(1, 10_000_000):,}' + rng.choice(['', '.50', '.00'])
+
+    entries = []
+    for _ in range(count):
+        dates = [date() for _ in range(rng.randrange(0, 4))]
+        amounts = [amount() for _ in range(rng.randrange(0, 3))]
+        entries.append({
+            'dates': ', '.join(dates) or None,
+            'amounts': ', '.join(amounts) or None,
+            'underwriter': rng.choice(['John Smith', 'JANE  DOE', None]),
+            'company': rng.choice(COMPANIES),
+            'broker': rng.choice(['Marsh', None]),
+        })
+    return entries
+
+
+def normalize_row(entry, name_suffix=re.compile(NAME_SUFFIX)):
+    """The same normalization as onenote_normalize, one entry at a time"""
+    row = {}
+    dates = []
+    for text in (entry.get('dates') or '').split(', '):
+        for fmt in ('%m/%d/%Y', '%m-%d-%Y', '%m/%d/%y', '%m-%d-%y'):
+            try:
+                dates.append(datetime.datetime.strptime(text, fmt).date())
+                break
+            except ValueError:
+                pass
+    row['first_date'] = dates[0] if dates else None
+    row['latest_date'] = max(dates) if dates else None
+    row['date_count'] = len(dates) if entry.get('dates') is not None else None
+
+    amounts = []
+    for text in (entry.get('amounts') or '').split(', '):
+        digits = text.replace('$', '').replace(',', '')
+        if re.fullmatch(r'\d+(?:\.\d+)?', digits):
+            amounts.append(float(digits))
+    row['amount_total'] = sum(amounts) if amounts else None
+    row['amount_max'] = max(amounts) if amounts else None
+    row['amount_count'] = len(amounts) if entry.get('amounts') is not None else None
+
+    for field in NAME_FIELDS:
+        name = entry.get(field)
+        if name is not None:
+            name = name_suffix.sub('', re.sub(r'\s+', ' ', name.lower())).strip(' ,.') or None
+        row[f'{field}_name'] = name
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--entries', type=int, default=1_000_000)
+    parser.add_argument('--batch-size', type=int, default=NORMALIZE_BATCH_SIZE)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    entries = generate_entries(args.entries, args.seed)
+
+    start = time.perf_counter()
+    expected = [normalize_row(entry) for entry in entries]
+    per_row = time.perf_counter() - start
+    print(f"per row: {per_row:7.2f} s  {args.entries / per_row:12,.0f} entries/s")
+
+    import pyarrow as pa
+    columns = {
+        field: pa.array([entry.get(field) for entry in entries], pa.string())
+        for field in ('dates', 'amounts') + NAME_FIELDS
+    }
+    start = time.perf_counter()
+    normalize_columns(columns)
+    elapsed = time.perf_counter() - start
+    print(f"columns: {elapsed:7.2f} s  {args.entries / elapsed:12,.0f} entries/s  "
+          f"({per_row / elapsed:.1f}x)")
+
+    start = time.perf_counter()
+    normalized = list(normalize_entries(entries, args.batch_size))
+    batched = time.perf_counter() - start
+    print(f"batched: {batched:7.2f} s  {args.entries / batched:12,.0f} entries/s  "
+          f"({per_row / batched:.1f}x)")
+
+    mismatches = [
+        index for index, (entry, row) in enumerate(zip(normalized, expected))
+        if any(entry[field] != row[field] for field in NORMALIZED_FIELDS)
+    ]
+    if mismatches:
+        index = mismatches[0]
+        print(f"{len(mismatches)} entries differ, first: {entries[index]}")
+        print(f"  batched: {[normalized[index][field] for field in NORMALIZED_FIELDS]}")
+        print(f"  per row: {[expected[index][field] for field in NORMALIZED_FIELDS]}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Benchmark for page XML text extraction
+
+Builds a page the way OneNote returns it, with business text in nested
+outlines and an embedded image of --image-mb megabytes, and extracts its
+text with the original tree-walking function and the streaming one. Reports
+time and peak traced memory for each, and checks the streaming version
+returns every T once in the same order.
+
+Usage: python benchmarks/bench_page_xml.py [--entries N] [--image-mb 20]
+"""
+
+import argparse
+import base64
+import os
+import random
+import re
+import sys
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from onenote_parsing import extract_text_from_page_xml
+from synthetic import ONENOTE_NS, underwriting_chunk
+
+
+def legacy_extract_text_from_page_xml(page_xml):
+    """The original implementation: whole tree, two traversals"""
+    try:
+        root = ET.fromstring(page_xml)
+        text_elements = []
+        for text_elem in root.findall(f'.//{{{ONENOTE_NS}}}T'):
+            if text_elem.text:
+                text_elements.append(text_elem.text.strip())
+        for outline in root.findall(f'.//{{{ONENOTE_NS}}}Outline'):
+            for oe in outline.findall(f'.//{{{ONENOTE_NS}}}OE'):
+                for t in oe.findall(f'.//{{{ONENOTE_NS}}}T'):
+                    if t.text:
+                        text_elements.append(t.text.strip())
+        return '\n'.join(text_elements)
+    except Exception as e:
+        print(f"Error parsing page XML: {e}")
+        return ""
+
+
+def large_page_xml(entries, image_mb, seed=0):
+    rng = random.Random(seed)
+    outline = []
+    for _ in range(entries):
+        first, *rest = underwriting_chunk(rng).split('\n')
+        children = ''.join(f'<one:OE><one:T><![CDATA[{line}]]></one:T></one:OE>' for line in rest)
+        outline.append(f'<one:OE><one:T><![CDATA[{first}]]></one:T>'
+                       f'<one:OEChildren>{children}</one:OEChildren></one:OE>')
+    image = base64.b64encode(rng.randbytes(image_mb * 1024 * 1024 * 3 // 4)).decode()
+    return (
+        f'<?xml version="1.0"?>\n<one:Page xmlns:one="{ONENOTE_NS}" name="Large page">'
+        f'<one:Title><one:OE><one:T><![CDATA[Large page]]></one:T></one:OE></one:Title>'
+        f'<one:Outline><one:OEChildren>{"".join(outline)}</one:OEChildren></one:Outline>'
+        f'<one:Image><one:Data>{image}</one:Data></one:Image></one:Page>'
+    )
+
+
+def measure(function, page_xml):
+    tracemalloc.start()
+    start = time.perf_counter()
+    text = function(page_xml)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return text, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--entries', type=int, default=500)
+    parser.add_argument('--image-mb', type=int, default=20)
+    args = parser.parse_args()
+
+    page_xml = large_page_xml(args.entries, args.image_mb)
+    print(f"Page XML: {len(page_xml) / 1024 / 1024:.1f} MB")
+
+    old_text, old_time, old_peak = measure(legacy_extract_text_from_page_xml, page_xml)
+    new_text, new_time, new_peak = measure(extract_text_from_page_xml, page_xml)
+
+    # The original repeats outline text once per enclosing OE after a full
+    # pass over every T; the streaming version should match that first pass
+    once = '\n'.join(
+        t.text.strip() for t in ET.fromstring(page_xml).iter(f'{{{ONENOTE_NS}}}T')
+        if t.text and t.text.strip()
+    )
+    if re.sub(r'^\t+', '', new_text, flags=re.M) != once:
+        print("Streaming extractor text differs from the original's first pass")
+        sys.exit(1)
+
+    for name, elapsed, peak in (('before', old_time, old_peak), ('after', new_time, new_peak)):
+        print(f"{name:>7}: {elapsed * 1000:8.1f} ms, peak {peak / 1024 / 1024:7.1f} MB")
+    print(f"speedup {old_time / new_time:.2f}x, {len(new_text.splitlines())} lines "
+          f"(was {len(old_text.splitlines())})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Benchmark for parallel page parsing
+
+Parses a synthetic notebook serially and with increasing worker counts,
+checks that every run produces the same entries in the same order, and
+reports pages/second and speedup per worker count.
+
+Usage: python benchmarks/bench_parallel.py [--pages N] [--workers 1,2,4,8,16]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from onenote_parsing import com_extractor, com_scanner, iter_business_entries
+from synthetic import generate_pages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pages', type=int, default=5000)
+    parser.add_argument('--workers', default='1,2,4,8,16')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    pages = generate_pages(args.pages, entries_per_page=8, noise_lines=40, seed=args.seed)
+    print(f"Synthetic notebook: {len(pages)} pages, "
+          f"{sum(len(page['content']) for page in pages)} characters")
+
+    reference = None
+    serial_time = None
+    for workers in [int(count) for count in args.workers.split(',')]:
+        start = time.perf_counter()
+        entries = list(iter_business_entries(pages, com_scanner, com_extractor, workers=workers))
+        elapsed = time.perf_counter() - start
+
+        if reference is None:
+            reference = entries
+            serial_time = elapsed
+        elif entries != reference:
+            print(f"workers={workers}: output differs from the first run")
+            sys.exit(1)
+
+        print(f"workers={workers:>3}: {len(pages) / elapsed:,.0f} pages/s, "
+              f"speedup {serial_time / elapsed:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
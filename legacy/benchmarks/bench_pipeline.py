@@ -0,0 +1,238 @@
+"""
+Benchmark for every stage of the parsing pipeline, alone and end to end
+
+Generates a synthetic notebook (--pages pages of underwriter, broker and
+company lines, dates, amounts and noise) and times each stage on it:
+
+    page_xml      extract_text_from_page_xml on each page's XML
+    chunk         chunk_by_business_entities on each page's text
+    validate      is_valid_business_entry on each chunk of a page
+    metadata      extract_business_metadata on each valid chunk of a page
+    write_<fmt>   one output writer on each page's entries
+    end_to_end    page XML to text, entries and every --formats output
+
+Each stage runs in a fresh interpreter so its peak RSS is its own. Reports
+throughput, p50/p99 per-page latency and peak RSS per stage, and writes them
+as JSON with --json. With --baseline, fails if a stage's throughput dropped
+by more than --tolerance against an earlier --json report.
+
+Usage: python benchmarks/bench_pipeline.py [--pages 2000] [--rules com] [--json report.json]
+                                           [--baseline old.json] [--tolerance 0.2]
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+LEGACY_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, LEGACY_DIR)
+
+from synthetic import generate_pages, page_xml
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows; peak RSS is reported as null there
+    resource = None
+
+SCRIPTS = {'com': 'onenote_extractor', 'powershell': 'onenote_extractor_fixed'}
+PARSE_STAGES = ['page_xml', 'chunk', 'validate', 'metadata']
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+def consumer_time(items, latencies):
+    """Yield items, recording how long the consumer spends on each one"""
+    for item in items:
+        start = time.perf_counter()
+        yield item
+        latencies.append(time.perf_counter() - start)
+
+
+def run_stage(stage, args):
+    """Run one stage in this process and return its measurements"""
+    import importlib
+    from onenote_batch import RULES
+    from onenote_parsing import extract_text_from_page_xml, iter_business_entries
+    from onenote_writers import ENTRY_COLUMNS, WRITERS, write_entries, write_outputs
+
+    script = importlib.import_module(SCRIPTS[args.rules])
+    pages = generate_pages(args.pages, args.entries_per_page, args.noise_lines, args.seed)
+    latencies = []
+
+    if stage == 'page_xml':
+        items = [page_xml(page, index) for index, page in enumerate(pages)]
+        work = extract_text_from_page_xml
+    elif stage == 'chunk':
+        items = [page['content'] for page in pages]
+        work = script.chunk_by_business_entities
+    elif stage == 'validate':
+        items = [script.chunk_by_business_entities(page['content']) for page in pages]
+        work = lambda chunks: [script.is_valid_business_entry(chunk) for chunk in chunks]
+    elif stage == 'metadata':
+        items = [
+            [chunk for chunk in script.chunk_by_business_entities(page['content'])
+             if script.is_valid_business_entry(chunk)]
+            for page in pages
+        ]
+        work = lambda chunks: [script.extract_business_metadata(chunk) for chunk in chunks]
+    else:
+        items = None
+
+    directory = tempfile.mkdtemp()
+    baseline_rss = peak_rss_mb()
+    start = time.perf_counter()
+
+    if items is not None:
+        for item in consumer_time(items, latencies):
+            work(item)
+        entries = None
+    elif stage.startswith('write_'):
+        name = stage[len('write_'):]
+        scanner, extractor = RULES[args.rules]
+        by_page = [list(iter_business_entries([page], scanner, extractor)) for page in pages]
+        # Keep setup out of the baseline RSS
+        baseline_rss = peak_rss_mb()
+        start = time.perf_counter()
+        path = os.path.join(directory, f'entries{WRITERS[name][0]}')
+        entries = write_entries(
+            (entry for group in consumer_time(by_page, latencies) for entry in group),
+            [lambda: WRITERS[name][1](path, ENTRY_COLUMNS)]
+        )['entries']
+    elif stage == 'end_to_end':
+        scanner, extractor = RULES[args.rules]
+        xml_pages = [(page, page_xml(page, index)) for index, page in enumerate(pages)]
+        del pages
+        baseline_rss = peak_rss_mb()
+        start = time.perf_counter()
+        records = (
+            {**page, 'content': extract_text_from_page_xml(xml)}
+            for page, xml in consumer_time(xml_pages, latencies)
+        )
+        formats = [name for name in args.formats.split(',') if name]
+        entries = write_outputs(iter_business_entries(records, scanner, extractor), formats,
+                                os.path.join(directory, 'entries'))[0]['entries']
+    else:
+        raise SystemExit(f"unknown stage {stage!r}")
+
+    elapsed = time.perf_counter() - start
+    for name in os.listdir(directory):
+        os.remove(os.path.join(directory, name))
+    os.rmdir(directory)
+
+    milliseconds = sorted(latency * 1000 for latency in latencies)
+    result = {
+        'pages': len(milliseconds),
+        'seconds': round(elapsed, 4),
+        'pages_per_second': round(len(milliseconds) / elapsed, 1),
+        'p50_ms': round(statistics.median(milliseconds), 4),
+        'p99_ms': round(milliseconds[min(len(milliseconds) - 1, int(len(milliseconds) * 0.99))], 4),
+        'peak_rss_mb': peak_rss_mb(),
+        'baseline_rss_mb': baseline_rss,
+    }
+    if entries is not None:
+        result['entries'] = entries
+        result['entries_per_second'] = round(entries / elapsed, 1)
+    return result
+
+
+def stage_command(stage, args):
+    return [
+        sys.executable, os.path.abspath(__file__), '--stage', stage,
+        '--pages', str(args.pages), '--entries-per-page', str(args.entries_per_page),
+        '--noise-lines', str(args.noise_lines), '--seed', str(args.seed),
+        '--rules', args.rules, '--formats', args.formats,
+    ]
+
+
+def compare(report, baseline, tolerance):
+    """Return a message for every stage that got slower than baseline by more than tolerance"""
+    regressions = []
+    for stage, result in report['stages'].items():
+        before = baseline.get('stages', {}).get(stage)
+        if not before:
+            continue
+        ratio = result['pages_per_second'] / before['pages_per_second']
+        if ratio < 1 - tolerance:
+            regressions.append(f"{stage}: {result['pages_per_second']:,.0f} pages/s, "
+                               f"{(1 - ratio) * 100:.0f}% below baseline {before['pages_per_second']:,.0f}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pages', type=int, default=2000)
+    parser.add_argument('--entries-per-page', type=int, default=5)
+    parser.add_argument('--noise-lines', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--rules', choices=tuple(SCRIPTS), default='com')
+    parser.add_argument('--formats', default='xlsx,json',
+                        help="writers to time alone and in end_to_end (default: xlsx,json)")
+    parser.add_argument('--stages', help="comma-separated stages to run (default: all)")
+    parser.add_argument('--json', metavar='PATH', help="write the report as JSON to PATH")
+    parser.add_argument('--baseline', metavar='PATH', help="earlier --json report to compare with")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="allowed throughput drop against --baseline (default: 0.2)")
+    parser.add_argument('--stage', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.stage:
+        # Child process: measure one stage and hand the result back as JSON
+        print(json.dumps(run_stage(args.stage, args)))
+        return
+
+    stages = PARSE_STAGES + [f'write_{name}' for name in args.formats.split(',') if name] + ['end_to_end']
+    if args.stages:
+        stages = [stage for stage in args.stages.split(',') if stage]
+
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'config': {
+            'pages': args.pages, 'entries_per_page': args.entries_per_page,
+            'noise_lines': args.noise_lines, 'seed': args.seed,
+            'rules': args.rules, 'formats': args.formats,
+        },
+        'stages': {},
+    }
+    print(f"{args.pages} pages, {args.rules} rules")
+    for stage in stages:
+        result = subprocess.run(stage_command(stage, args), capture_output=True, text=True,
+                                cwd=LEGACY_DIR)
+        if result.returncode:
+            print(f"{stage} failed:\n{result.stderr}")
+            sys.exit(1)
+        measured = report['stages'][stage] = json.loads(result.stdout.strip().splitlines()[-1])
+        rss = measured['peak_rss_mb']
+        print(f"{stage:>12}: {measured['pages_per_second']:10,.0f} pages/s  "
+              f"p50 {measured['p50_ms']:7.3f} ms  p99 {measured['p99_ms']:7.3f} ms  "
+              f"peak RSS {'n/a' if rss is None else f'{rss:,.0f} MB'}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Report saved to: {args.json}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"Regression: {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
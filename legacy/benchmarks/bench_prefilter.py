@@ -0,0 +1,86 @@
+"""
+Benchmark for the keyword prefilter of page parsing
+
+Parses a synthetic notebook of which --business-share of the pages are
+underwriting pages and the rest meeting notes, once with page_entries and
+once chunking and analyzing every page the way it did before the
+prefilter. Reports parse CPU seconds for both, checks they find the same
+entries and prints the prefilter's counters.
+
+Usage: python benchmarks/bench_prefilter.py [--pages 2000] [--business-share 0.1] [--repeat 3]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from onenote_metrics import metrics
+from onenote_parsing import page_entries, rule_pack
+from onenote_records import Entry, PageText
+from synthetic import generate_notebook
+
+
+def unfiltered_entries(page_data, scanner, extractor):
+    """page_entries without the prefilter"""
+    text, spans = scanner.chunk_spans(page_data['content'])
+    source = PageText(text, extractor.dates, extractor.amounts)
+    entries = []
+    for start, end in spans:
+        is_valid, metadata = extractor.analyze(text[start:end])
+        if is_valid:
+            entries.append(Entry(source, start, end, metadata))
+    return entries
+
+
+def parse(parse_page, pages, scanner, extractor, repeat):
+    """Entries of every page and the best CPU seconds over several runs"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.process_time()
+        entries = [parse_page(page_data, scanner, extractor) for page_data in pages]
+        best = min(best, time.process_time() - start)
+    return [[entry.page_dict() for entry in page] for page in entries], best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pages', type=int, default=2000)
+    parser.add_argument('--business-share', type=float, default=0.1)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    pages = generate_notebook(args.pages, args.business_share, seed=args.seed)
+    print(f"Synthetic notebook: {len(pages)} pages, {sum(len(page['content']) for page in pages)} characters")
+
+    failed = False
+    for name in ('com', 'powershell'):
+        scanner, extractor = rule_pack(name)
+        before, before_seconds = parse(unfiltered_entries, pages, scanner, extractor, args.repeat)
+        after, after_seconds = parse(page_entries, pages, scanner, extractor, args.repeat)
+
+        metrics.reset()
+        metrics.enabled = True
+        for page_data in pages:
+            page_entries(page_data, scanner, extractor)
+        metrics.enabled = False
+        counters = metrics.report()['counters']
+
+        differ = sum(1 for old, new in zip(before, after) if old != new)
+        print(f"{name:>10}: without prefilter {before_seconds:6.3f}s, with {after_seconds:6.3f}s "
+              f"({before_seconds / after_seconds:.1f}x), {sum(map(len, after))} entries"
+              f"{f'  {differ} PAGES DIFFER' if differ else ''}")
+        print(f"{'':>10}  skipped {counters.get('prefiltered_pages', 0)} pages, "
+              f"{counters.get('prefiltered_chunks', 0)} more chunks, "
+              f"{counters.get('prefiltered_chars', 0)} characters")
+        failed |= bool(differ)
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Benchmark for the memory held by parsed entries: dicts against Entry records
+
+Builds a synthetic notebook in the form OneNote hands the pages over (one
+line per paragraph, every page with its own copy of the notebook and
+section names), keeps it loaded, parses every page and holds on to all the
+entries, once as the dicts page_entries used to build and once as Entry
+records. Each representation is measured in a fresh interpreter; the report
+is the RSS added by the entries on top of the loaded notebook. Fails if the
+records don't save at least --min-ratio.
+
+Usage: python benchmarks/bench_records.py [--entries 500000] [--rules com] [--min-ratio 3]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+LEGACY_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, LEGACY_DIR)
+
+from synthetic import generate_pages
+
+# Pages per entry the synthetic generator averages with its defaults
+PAGES_PER_ENTRY = 0.4
+
+
+def rss_mb():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+
+
+def load_notebook(entries, seed):
+    pages = generate_pages(int(entries * PAGES_PER_ENTRY), seed=seed)
+    for page in pages:
+        page['content'] = '\n'.join(line for line in page['content'].split('\n') if line.strip())
+        # Names parsed out of each page's XML are separate strings
+        page['notebook'] = page['notebook'].encode().decode()
+        page['section'] = page['section'].encode().decode()
+    return pages
+
+
+def dict_entries(pages, scanner, extractor):
+    """Entries the way page_entries and _with_source built them before Entry records"""
+    for page in pages:
+        for chunk in scanner.chunk(page['content']):
+            is_valid, metadata = extractor.analyze(chunk)
+            if is_valid:
+                yield {
+                    'source_notebook': page.get('notebook', ''),
+                    'source_section': page.get('section', ''),
+                    'source_page': page.get('page', ''),
+                    'raw_content': chunk, **metadata,
+                }
+
+
+def measure(representation, args):
+    from onenote_batch import RULES
+    from onenote_parsing import iter_business_entries
+
+    scanner, extractor = RULES[args.rules]
+    pages = load_notebook(args.entries, args.seed)
+    before = rss_mb()
+    start = time.perf_counter()
+    if representation == 'dict':
+        entries = list(dict_entries(pages, scanner, extractor))
+    else:
+        entries = list(iter_business_entries(pages, scanner, extractor))
+    elapsed = time.perf_counter() - start
+    held = rss_mb() - before
+    return {
+        'entries': len(entries),
+        'seconds': round(elapsed, 3),
+        'rss_mb': round(held, 1),
+        'bytes_per_entry': round(held * 1024 * 1024 / max(len(entries), 1)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--entries', type=int, default=500_000,
+                        help="roughly how many entries the notebook holds")
+    parser.add_argument('--rules', choices=('com', 'powershell'), default='com')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--min-ratio', type=float, default=3.0)
+    parser.add_argument('--representation', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.representation:
+        print(json.dumps(measure(args.representation, args)))
+        return
+
+    results = {}
+    for representation in ('dict', 'record'):
+        command = [sys.executable, os.path.abspath(__file__), '--representation', representation,
+                   '--entries', str(args.entries), '--rules', args.rules, '--seed', str(args.seed)]
+        output = subprocess.run(command, capture_output=True, text=True, cwd=LEGACY_DIR, check=True)
+        result = results[representation] = json.loads(output.stdout.strip().splitlines()[-1])
+        print(f"{representation:>7}: {result['entries']:,} entries  {result['rss_mb']:8.1f} MB  "
+              f"{result['bytes_per_entry']:5,} bytes/entry  parsed in {result['seconds']:.2f} s")
+
+    ratio = results['dict']['rss_mb'] / max(results['record']['rss_mb'], 0.1)
+    print(f"Records hold {ratio:.1f}x less memory than dicts")
+    if ratio < args.min_ratio:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Benchmark for rule pack extraction against the hard-coded parsing path
+
+Runs the validity check and metadata extraction of the built-in rule packs
+(rules/com.json, rules/powershell.json) and the original hard-coded
+functions of bench_metadata.py on a synthetic corpus, checks they agree and
+reports chunks/s. Then adds --extra-fields fields on keywords the packs
+already have, once to a copy of each pack and once to the hard-coded path
+as one more ``re.search`` per field, to show what a new field costs.
+
+Usage: python benchmarks/bench_rules.py [--chunks 20000] [--repeat 3] [--extra-fields 4]
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_metadata import best_rate, legacy_com, legacy_powershell
+from onenote_parsing import FIELD_VALUE, compile_rule_pack
+from onenote_rules import check_rule_pack, pack_path
+from synthetic import generate_chunks
+
+# (field, keyword, pattern, a line it matches)
+EXTRA_FIELDS = [
+    ('broker_contact', 'broker', r'broker\s+contact:\s*{value}', 'Broker contact: Dana Reyes'),
+    ('account_number', 'account', r'account\s+(?:no|number)\.?:?\s*(\d+)', 'Account number: 4471902'),
+    ('underwriter_email', 'underwriter', r'underwriter\s+email:\s*(\S+@\S+)',
+     'Underwriter email: jdoe@example.com'),
+    ('client_since', 'client', r'client\s+since\s*(\d{4})', 'Client since 2011'),
+    ('business_type', 'business', r'business\s+type:\s*{value}', 'Business type: Warehousing'),
+    ('company_phone', 'company', r'company\s+phone:\s*([\d() -]+\d)', 'Company phone: (555) 010-4477'),
+]
+
+
+def with_extra_lines(chunks, seed):
+    """Every third chunk gets one of the extra fields' lines"""
+    rng = random.Random(seed)
+    return [chunk + '\n' + rng.choice(EXTRA_FIELDS)[3] if index % 3 == 0 else chunk
+            for index, chunk in enumerate(chunks)]
+
+
+def hard_coded(analyze, fields):
+    """The original function plus one re.search per extra field"""
+    patterns = [(field, re.compile(pattern.replace('{value}', FIELD_VALUE), re.IGNORECASE))
+                for field, keyword, pattern, line in fields]
+
+    def analyze_extra(chunk):
+        valid, metadata = analyze(chunk)
+        if valid:
+            for field, pattern in patterns:
+                match = pattern.search(chunk)
+                if match:
+                    metadata[field] = match.group(1).strip()
+        return valid, metadata
+    return analyze_extra
+
+
+def extended_pack(name, fields):
+    """A built-in pack with the extra fields appended"""
+    with open(pack_path(name), encoding='utf-8') as f:
+        pack = json.load(f)
+    pack['fields'].extend(
+        {'name': field, 'rules': [{'keywords': [keyword], 'pattern': pattern}]}
+        for field, keyword, pattern, line in fields
+    )
+    return check_rule_pack(pack, name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--chunks', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--extra-fields', type=int, default=4, choices=range(len(EXTRA_FIELDS) + 1))
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    chunks = with_extra_lines(generate_chunks(args.chunks, seed=args.seed), args.seed)
+    print(f"Synthetic corpus: {len(chunks)} chunks, {sum(map(len, chunks))} characters")
+    extra = EXTRA_FIELDS[:args.extra_fields]
+
+    failed = False
+    for name, original in [('com', legacy_com), ('powershell', legacy_powershell)]:
+        for label, fields in [('', []), (f' +{len(extra)} fields', extra)]:
+            scanner, extractor = compile_rule_pack(extended_pack(name, fields))
+            before = hard_coded(original, fields)
+            mismatches = sum(1 for chunk in chunks if before(chunk) != extractor.analyze(chunk))
+            before_rate = best_rate(before, chunks, args.repeat)
+            after_rate = best_rate(extractor.analyze, chunks, args.repeat)
+            print(f"{name + label:>20}: hard-coded {before_rate:9,.0f} chunks/s, "
+                  f"rule pack {after_rate:9,.0f} chunks/s ({after_rate / before_rate:.1f}x)"
+                  f"{f'  {mismatches} CHUNKS DIFFER' if mismatches else ''}")
+            failed |= bool(mismatches)
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Benchmark for hierarchy snapshot diffing against re-walking every page
+
+Records a synthetic notebook as hierarchy/page XML and extracts it through
+a replay backend, once in full and once to create a hierarchy snapshot.
+Then --changed of the pages are edited, --deleted of them removed and
+--emptied of them replaced by meeting notes, and the notebook is extracted
+again in full and against the snapshot. Each GetPageContent call sleeps
+--latency milliseconds to stand in for the COM round-trip. Checks that the
+snapshot run finds exactly the entries of the changed pages that the full
+run finds, one empty row per changed page left without entries and one
+tombstone per deleted page.
+
+Usage: python benchmarks/bench_snapshot.py [--pages 2000] [--changed 0.02] [--deleted 0.01]
+                                           [--emptied 0.01] [--latency 5]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from onenote_backends import ComBackend, LatencyBackend, RecordedOneNote
+from onenote_extractor import iter_onenote_data
+from onenote_parsing import com_extractor, com_scanner, iter_business_entries
+from onenote_snapshot import HierarchySnapshot
+from synthetic import generate_pages, meeting_notes, page_id, record_notebook
+
+
+def run(directory, latency, snapshot=None):
+    """Entry dicts, seconds and GetPageContent calls for one extraction"""
+    one_note = RecordedOneNote(directory)
+    start = time.perf_counter()
+    pages = iter_onenote_data('notebook.one', LatencyBackend(ComBackend(one_note), latency),
+                              snapshot=snapshot)
+    entries = iter_business_entries(pages, com_scanner, com_extractor, Counter())
+    if snapshot is None:
+        entries = [dict(entry.to_dict(), page_id=entry.source.page_id) for entry in entries]
+    else:
+        entries = [entry.to_dict() for entry in snapshot.kept(snapshot.label(entries))]
+        entries.extend(snapshot.cleared())
+        entries.extend(snapshot.tombstones())
+        snapshot.save()
+    return entries, time.perf_counter() - start, one_note.calls['GetPageContent']
+
+
+def every(share, pages, offset=0):
+    return set(range(offset, pages, max(1, round(1 / share)))) if share else set()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pages', type=int, default=2000)
+    parser.add_argument('--changed', type=float, default=0.02)
+    parser.add_argument('--deleted', type=float, default=0.01)
+    parser.add_argument('--emptied', type=float, default=0.01)
+    parser.add_argument('--latency', type=float, default=5, help="milliseconds per page")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    pages = generate_pages(args.pages, seed=args.seed)
+    latency = args.latency / 1000
+    deleted = every(args.deleted, args.pages, offset=1)
+    emptied = every(args.emptied, args.pages, offset=2) - deleted
+    changed = every(args.changed, args.pages) - deleted - emptied
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        record_notebook(pages, directory)
+        # The extractor's progress prints would drown the results
+        stdout, sys.stdout = sys.stdout, open(os.devnull, 'w')
+        try:
+            with HierarchySnapshot(os.path.join(directory, 'snapshot.sqlite')) as snapshot:
+                results['full'] = run(directory, latency)
+                results['first snapshot'] = run(directory, latency, snapshot)
+            for index in changed:
+                pages[index]['content'] += '\n\nUnderwriter: Zebulon Quill\nEffective date 2/3/25'
+            rng = random.Random(args.seed)
+            for index in emptied:
+                pages[index]['content'] = meeting_notes(rng, 20)
+            record_notebook(pages, directory, {index: '2025-02-01T00:00:00.000Z'
+                                               for index in changed | emptied}, deleted)
+            with HierarchySnapshot(os.path.join(directory, 'snapshot.sqlite')) as snapshot:
+                results['full after edits'] = run(directory, latency)
+                results['snapshot diff'] = run(directory, latency, snapshot)
+        finally:
+            sys.stdout.close()
+            sys.stdout = stdout
+
+    for name, (entries, elapsed, calls) in results.items():
+        print(f"{name:>17}: {elapsed:6.2f}s, {calls:5} GetPageContent calls, {len(entries):6} entries")
+
+    delta = results['snapshot diff'][0]
+    changed_ids = {page_id(index) for index in changed | emptied}
+    expected = [entry for entry in results['full after edits'][0] if entry['page_id'] in changed_ids]
+    # Every changed page the full run finds no entries on, the emptied ones among them
+    expected_cleared = changed_ids - {entry['page_id'] for entry in expected}
+    found = [{key: value for key, value in entry.items() if key != 'change'}
+             for entry in delta if entry['change'] != 'deleted' and entry['raw_content']]
+    cleared = {entry['page_id'] for entry in delta if entry['change'] == 'changed' and not entry['raw_content']}
+    tombstones = {entry['page_id'] for entry in delta if entry['change'] == 'deleted'}
+    print(f"Snapshot run: {len(found)} entries of {len(changed_ids)} changed pages, "
+          f"{len(cleared)} of them left without entries, {len(tombstones)} tombstones")
+    if (found != expected or cleared != expected_cleared
+            or tombstones != {page_id(index) for index in deleted}):
+        print("Snapshot run differs from the changed, emptied and deleted pages of the full run")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
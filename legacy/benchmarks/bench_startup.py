@@ -0,0 +1,78 @@
+"""
+Benchmark for extractor script startup
+
+Imports each extractor script in a fresh interpreter under -X importtime
+and reports the median cumulative import time over --runs runs, with the
+slowest modules it pulled in. Fails if a script's median goes over
+--threshold milliseconds, or if startup imports any of HEAVY_MODULES,
+which belong on the code paths that need them.
+
+Usage: python benchmarks/bench_startup.py [--runs 7] [--threshold 100] [--top 5]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+LEGACY_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCRIPTS = ['onenote_extractor', 'onenote_extractor_fixed', 'onenote_extractor_simple', 'onenote_batch']
+
+# Modules only some runs need: writers, COM, the page cache, parallel parsing, --offline and deadlines
+HEAVY_MODULES = [
+    'pandas', 'numpy', 'openpyxl', 'pyarrow', 'win32com', 'pythoncom', 'sqlite3', 'multiprocessing',
+    'concurrent.futures', 'asyncio', 'onenote_onestore', 'onenote_cache',
+]
+
+
+def import_times(module):
+    """Return {module name: (self us, cumulative us)} for one fresh import of module"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=LEGACY_DIR, capture_output=True, text=True
+    )
+    if result.returncode:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr}")
+
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=7)
+    parser.add_argument('--threshold', type=float, default=100, help="milliseconds per script")
+    parser.add_argument('--top', type=int, default=5, help="slowest imports to list per script")
+    args = parser.parse_args()
+
+    failures = []
+    for script in SCRIPTS:
+        runs = [import_times(script) for _ in range(args.runs)]
+        median_ms = statistics.median(times[script][1] for times in runs) / 1000
+        print(f"{script:>26}: {median_ms:6.1f} ms")
+
+        slowest = sorted(runs[-1].items(), key=lambda item: item[1][0], reverse=True)
+        for name, (self_us, _) in slowest[:args.top]:
+            print(f"{'':>28}{self_us / 1000:5.1f} ms  {name}")
+
+        if median_ms > args.threshold:
+            failures.append(f"{script} takes {median_ms:.1f} ms to import (threshold {args.threshold} ms)")
+        heavy = [module for module in HEAVY_MODULES
+                 if any(name == module or name.startswith(module + '.') for name in runs[-1])]
+        if heavy:
+            failures.append(f"{script} imports {', '.join(heavy)} at startup")
+
+    for failure in failures:
+        print(failure)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Benchmark for the output writers
+
+Streams the entries of a synthetic notebook into each writer and reports
+entries/second and file size, plus the cost of converting the Parquet file
+to xlsx afterwards.
+
+Usage: python benchmarks/bench_writers.py [--entries N] [--formats xlsx,json,parquet]
+"""
+
+import argparse
+import itertools
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from onenote_parsing import com_extractor, com_scanner, iter_business_entries
+from onenote_writers import WRITERS, parquet_to_xlsx, write_entries
+from synthetic import generate_pages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--entries', type=int, default=100000)
+    parser.add_argument('--formats', default='xlsx,json,parquet')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    sample = list(iter_business_entries(generate_pages(500, seed=args.seed), com_scanner, com_extractor))
+    entries = list(itertools.islice(itertools.cycle(sample), args.entries))
+    print(f"{len(entries)} entries")
+
+    with tempfile.TemporaryDirectory() as directory:
+        for name in args.formats.split(','):
+            extension, writer = WRITERS[name]
+            path = os.path.join(directory, f'entries{extension}')
+            start = time.perf_counter()
+            write_entries(entries, [lambda: writer(path)])
+            elapsed = time.perf_counter() - start
+            print(f"{name:>8}: {len(entries) / elapsed:10,.0f} entries/s, "
+                  f"{os.path.getsize(path) / 1024 / 1024:6.1f} MB")
+
+            if name == 'parquet':
+                start = time.perf_counter()
+                parquet_to_xlsx(path, os.path.join(directory, 'converted.xlsx'))
+                print(f"parquet to xlsx: {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Stand-in for PowerShell that answers PowerShellBackend's scripts
+
+Given the extraction script, emits synthetic pages as NDJSON records the
+way it does, pausing --delay milliseconds before each page as if it were
+calling GetPageContent. Given a GetHierarchy or GetPageContent script (the
+per-call scripts, as onenote_async runs them), prints the hierarchy XML or
+the XML of the one page after the same pause. Every --slow-every'th page
+takes --slow-delay milliseconds instead, to stand in for a page that hangs.
+
+Usage: PowerShellBackend(command=[sys.executable, 'benchmarks/powershell_stub.py', '--pages', '100'])
+"""
+
+import argparse
+import json
+import re
+import sys
+import time
+
+from synthetic import generate_pages, hierarchy_xml, page_id, page_xml
+
+
+def emit(record):
+    sys.stdout.write(json.dumps(record) + '\n')
+    sys.stdout.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pages', type=int, default=100)
+    parser.add_argument('--delay', type=float, default=0, help="milliseconds per page")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--stop-after', type=int, help="exit without a done record after N pages")
+    parser.add_argument('--slow-every', type=int, help="make every Nth page slow")
+    parser.add_argument('--slow-delay', type=float, default=60_000, help="milliseconds per slow page")
+    args, rest = parser.parse_known_args()
+    script = rest[-1] if rest else ''
+
+    def pause(index):
+        slow = args.slow_every and (index + 1) % args.slow_every == 0
+        time.sleep((args.slow_delay if slow else args.delay) / 1000)
+
+    pages = generate_pages(args.pages, seed=args.seed)
+    # The per-call scripts fetch into $xml, the extraction script into other variables
+    if re.search(r'GetHierarchy\([^)]*\[ref\]\$xml\)', script):
+        time.sleep(args.delay / 1000)
+        print(hierarchy_xml(pages))
+        return
+    requested = re.search(r"GetPageContent\('([^']*)', \[ref\]\$xml\)", script)
+    if requested:
+        index = int(requested.group(1)[-8:-1])
+        pause(index)
+        print(page_xml(pages[index], index))
+        return
+
+    sys.stdout.reconfigure(encoding='utf-8')
+    emit({'type': 'log', 'message': 'Processing OneNote file: stub'})
+    print('Host output that is not JSON')
+    for index, page in enumerate(pages):
+        if index == args.stop_after:
+            sys.exit(1)
+        pause(index)
+        emit({'type': 'log', 'level': 'debug', 'message': f"    Page: {page['page']}"})
+        emit({
+            'type': 'page',
+            'notebook': page['notebook'],
+            'section': page['section'],
+            'page': page['page'],
+            'page_id': page_id(index),
+            'last_modified': '2025-01-01T00:00:00.000Z',
+            'content': page['content'],
+        })
+    emit({'type': 'done', 'pages': args.pages})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""
+Synthetic underwriting notebook content for the extractor benchmarks
+"""
+
+import random
+from pathlib import Path
+from xml.sax.saxutils import escape, quoteattr
+
+ONENOTE_NS = 'http://schemas.microsoft.com/office/onenote/2013/onenote'
+
+UNDERWRITERS = [
+    'Jane Doe', 'Steven Burmeister', 'Maria Lopez', 'Tom O\'Neil', 'Priya Shah',
+    'Alex Kim', 'Chris Walker', 'Dana Whitfield',
+]
+BROKERS = [
+    'Marsh McLennan', 'Aon Risk Services', 'Willis Towers Watson', 'Lockton',
+    'Gallagher', 'USI Insurance Services', 'Brown & Brown',
+]
+COMPANIES = [
+    'Acme Widgets', 'Total Security Solutions', 'American Containers',
+    'Qualfon Data Services', 'Farbman Group', 'Blue Ridge Logistics',
+    'Northwind Traders', 'Contoso Pharmaceuticals',
+]
+SUFFIXES = ['LLC', 'INC', 'CORP', 'COMPANY', 'Group']
+NOISE = [
+    'Discussed renewal timeline with the team',
+    'Follow up on loss runs next week',
+    'Needs updated financials before binding',
+    'Meeting notes: agenda items reviewed, nothing actionable',
+    'Sent quote request to markets, awaiting responses',
+    'Call scheduled to review exposures and limits',
+    'Waiting on signed application',
+    'Loss history looks clean for the last five years',
+]
+
+# Meeting notes with dates and amounts but none of the business keywords
+MEETING_NOTES = [
+    'Team sync {date}: roadmap review, hiring plan and Q3 offsite',
+    'Offsite budget of {amount} approved, venue shortlist due Friday',
+    'Action items: update the wiki, clean up the shared drive, book rooms',
+    'IT: laptop refresh starts {date}, bring chargers to the help desk',
+    'Vendor call moved to Thursday, Sam to send the new invite',
+    'Expense reports over {amount} need a second approval from now on',
+    'Retro: standups run long, try a fifteen minute timebox',
+    'Reminder that the password policy changes on {date}',
+    'Parking garage closed for repairs until {date}',
+    'Lunch and learn on spreadsheet shortcuts, slides in the team folder',
+]
+
+
+def random_date(rng):
+    return f'{rng.randint(1, 12)}/{rng.randint(1, 28)}/{rng.choice(["24", "2024", "2025"])}'
+
+
+def random_amount(rng):
+    return f'${rng.randint(1, 999)},{rng.randint(0, 999):03d}' + rng.choice(['', '.00', '.50'])
+
+
+def underwriting_chunk(rng):
+    """One business entry the way underwriters write them in OneNote"""
+    company = f'{rng.choice(COMPANIES)} {rng.choice(SUFFIXES)}'
+    lines = []
+    if rng.random() < 0.7:
+        lines.append(f'Underwriter: {rng.choice(UNDERWRITERS)}')
+    elif rng.random() < 0.5:
+        lines.append(f'Underwritten by {rng.choice(UNDERWRITERS)}')
+    lines.append(rng.choice([f'Company: {company}', f'Client: {company}', company]))
+    if rng.random() < 0.8:
+        lines.append(f'Broker: {rng.choice(BROKERS)}')
+    lines.append(f'Effective date {random_date(rng)}, expiring {random_date(rng)}')
+    for _ in range(rng.randint(0, 3)):
+        lines.append(f'Premium {random_amount(rng)} on limit {random_amount(rng)}')
+    for _ in range(rng.randint(1, 4)):
+        lines.append(rng.choice(NOISE))
+    if rng.random() < 0.05:
+        lines.append('Prior carrier: N/A')
+    return '\n'.join(lines)
+
+
+def noise_chunk(rng):
+    """A chunk with no business content at all"""
+    return '\n'.join(rng.choice(NOISE) for _ in range(rng.randint(2, 8)))
+
+
+def meeting_notes(rng, lines):
+    """Page content of meeting notes unrelated to underwriting"""
+    return '\n'.join(
+        rng.choice(MEETING_NOTES).format(date=random_date(rng), amount=random_amount(rng))
+        + ('\n' if rng.random() < 0.2 else '')
+        for _ in range(lines)
+    )
+
+
+def generate_chunks(count, seed=0, noise_ratio=0.3):
+    """Generate a mix of business and noise chunks"""
+    rng = random.Random(seed)
+    return [
+        noise_chunk(rng) if rng.random() < noise_ratio else underwriting_chunk(rng)
+        for _ in range(count)
+    ]
+
+
+def generate_pages(count, entries_per_page=5, noise_lines=10, seed=0):
+    """Generate page records shaped like the extractor's content_list"""
+    rng = random.Random(seed)
+    pages = []
+    for index in range(count):
+        parts = [noise_chunk(rng) for _ in range(max(1, noise_lines // 5))]
+        parts += [underwriting_chunk(rng) for _ in range(rng.randint(0, entries_per_page))]
+        rng.shuffle(parts)
+        pages.append({
+            'notebook': 'NewBusiness',
+            'section': f'Section {index // 50}',
+            'page': f'{rng.choice(COMPANIES)} {index}',
+            'content': '\n\n'.join(parts),
+        })
+    return pages
+
+
+def generate_notebook(count, business_share=0.1, meeting_lines=40, seed=0):
+    """Page records of which business_share are underwriting pages, the rest meeting notes"""
+    rng = random.Random(seed)
+    business = generate_pages(count, seed=seed)
+    pages = []
+    for index in range(count):
+        if rng.random() < business_share:
+            pages.append(business[index])
+        else:
+            pages.append({
+                'notebook': 'Team',
+                'section': f'Meetings {index // 50}',
+                'page': f'Meeting {index}',
+                'content': meeting_notes(rng, rng.randint(meeting_lines // 2, meeting_lines * 3 // 2)),
+            })
+    return pages
+
+
+def page_id(index):
+    return f'{{3D67B65E-EF7F-03F0-019B-2ED975D459E0}}{{1}}{{E18305561134322896622201753724876029409{index:07d}}}'
+
+
+def page_xml(page, index):
+    """OneNote page XML for a page record, one OE per line"""
+    lines = [line for line in page['content'].split('\n') if line.strip()]
+    body = ''.join(f'<one:OE><one:T><![CDATA[{line}]]></one:T></one:OE>' for line in lines)
+    return (
+        f'<?xml version="1.0"?>\n<one:Page xmlns:one="{ONENOTE_NS}" ID="{page_id(index)}" '
+        f'name={quoteattr(page["page"])}><one:Title><one:OE><one:T><![CDATA[{escape(page["page"])}]]>'
+        f'</one:T></one:OE></one:Title><one:Outline><one:OEChildren>{body}'
+        f'</one:OEChildren></one:Outline></one:Page>'
+    )
+
+
+def hierarchy_xml(pages, modified=None, deleted=()):
+    """Hierarchy XML for page records; modified maps page index to lastModifiedTime,
+    and the pages at the deleted indexes are left out"""
+    modified = modified or {}
+    sections = {}
+    for index, page in enumerate(pages):
+        if index in deleted:
+            continue
+        sections.setdefault((page['notebook'], page['section']), []).append(
+            f'<one:Page ID="{page_id(index)}" name={quoteattr(page["page"])} '
+            f'lastModifiedTime="{modified.get(index, "2025-01-01T00:00:00.000Z")}" pageLevel="1"/>'
+        )
+
+    notebooks = {}
+    for (notebook, section), page_elements in sections.items():
+        notebooks.setdefault(notebook, []).append(
+            f'<one:Section name={quoteattr(section)}>{"".join(page_elements)}</one:Section>'
+        )
+    body = ''.join(
+        f'<one:Notebook name={quoteattr(notebook)}>{"".join(section_elements)}</one:Notebook>'
+        for notebook, section_elements in notebooks.items()
+    )
+    return f'<?xml version="1.0"?>\n<one:Notebooks xmlns:one="{ONENOTE_NS}">{body}</one:Notebooks>'
+
+
+def record_notebook(pages, directory, modified=None, deleted=()):
+    """Write page records in the layout onenote_backends.RecordedOneNote replays"""
+    from onenote_backends import page_file_name
+
+    directory = Path(directory)
+    (directory / 'pages').mkdir(parents=True, exist_ok=True)
+    (directory / 'hierarchy.xml').write_text(hierarchy_xml(pages, modified, deleted), encoding='utf-8')
+    for index, page in enumerate(pages):
+        (directory / 'pages' / page_file_name(page_id(index))).write_text(
+            page_xml(page, index), encoding='utf-8'
+        )
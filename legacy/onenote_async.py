@@ -0,0 +1,237 @@
+"""
+Asyncio extraction core: page fetches with deadlines, cancellation and partial results
+
+PowerShellBackend's streaming script extracts a whole notebook in one
+process, so a slow GetPageContent holds up every later page and a hung one
+ends the run. AsyncExtractor gets the hierarchy first and then fetches each
+page on its own, ``concurrency`` at a time, each in a subprocess started
+with asyncio.create_subprocess_exec (other backends' fetch_page runs in a
+thread instead):
+
+    page_timeout   a page that takes longer is killed and skipped; only its
+                   own time budget is lost
+    deadline       seconds for the whole run; pages not fetched by then are
+                   skipped and the run ends normally
+    cancel()       stops the run from any thread, as do Ctrl+C, closing the
+                   page iterator and an exception in the consumer
+
+Pages fetched before a timeout, the deadline or a cancellation are still
+delivered, in hierarchy order, so the writers finish a partial output
+instead of losing the run. ``stats`` counts pages, page_timeouts,
+page_errors, skipped_pages (including every page of the hierarchy not yet
+scheduled when the run stopped), hierarchy_timeouts and run_errors; after
+a cancellation or any of those but pages, incomplete() is True.
+
+Starting a process per page costs more than the streaming script's one
+process, so PowerShell runs only use this when a timeout or deadline is
+asked for. The rest of the pipeline is synchronous, so iter_pages() is a
+plain generator fed by an event loop running in a background thread.
+"""
+
+import asyncio
+import logging
+import queue
+import threading
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+
+from onenote_backends import PowerShellBackend, hierarchy_records
+from onenote_metrics import metrics
+from onenote_parsing import extract_text_from_page_xml
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONCURRENCY = 4
+
+
+async def run_script(command, script, timeout=None):
+    """stdout of command + [script]; the process is killed on timeout or cancellation"""
+    process = await asyncio.create_subprocess_exec(
+        *command, script, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+    )
+    try:
+        stdout, stderr = await asyncio.wait_for(process.communicate(), timeout)
+    finally:
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+    # The scripts set PowerShell's output encoding to UTF-8 (UTF8_OUTPUT)
+    if process.returncode != 0:
+        raise RuntimeError(f"PowerShell error: {stderr.decode('utf-8', 'replace')}")
+    return stdout.decode('utf-8', 'replace')
+
+
+class AsyncExtractor:
+    """Fetches a backend's pages concurrently, each within page_timeout, the run within deadline"""
+
+    def __init__(self, backend, concurrency=DEFAULT_CONCURRENCY, page_timeout=None, deadline=None,
+                 hierarchy_timeout=None):
+        self.backend = backend
+        self.concurrency = max(1, concurrency)
+        self.page_timeout = page_timeout
+        self.deadline = deadline
+        self.hierarchy_timeout = hierarchy_timeout or getattr(backend, 'timeout', None)
+        self.stats = Counter()
+        self.cancelled = threading.Event()
+        self.loop = None
+        self.task = None
+        self.executor = None
+
+    def cancel(self):
+        """Stop fetching; pages already fetched are still delivered. Safe from any thread."""
+        self.cancelled.set()
+        loop, task = self.loop, self.task
+        if loop is not None and task is not None:
+            loop.call_soon_threadsafe(task.cancel)
+
+    def incomplete(self):
+        """Whether pages of the hierarchy were left out of the run"""
+        return self.cancelled.is_set() or any(
+            self.stats[key] for key in ('page_timeouts', 'page_errors', 'skipped_pages',
+                                        'hierarchy_timeouts', 'run_errors')
+        )
+
+    def iter_pages(self, start_node_id=''):
+        """Yield page records with content in hierarchy order, as they are fetched"""
+        # Only a couple of windows of pages wait for the consumer
+        pages = queue.Queue(maxsize=self.concurrency * 2)
+        thread = threading.Thread(target=self._run_loop, args=(pages, start_node_id), daemon=True)
+        thread.start()
+        finished = False
+        try:
+            while True:
+                try:
+                    # A timeout, so Ctrl+C gets through on Windows too
+                    page_data = pages.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+                except KeyboardInterrupt:
+                    logger.warning("Interrupted, finishing with the pages fetched so far")
+                    self.cancel()
+                    continue
+                if page_data is None:
+                    finished = True
+                    break
+                yield page_data
+        finally:
+            if not finished:
+                self.cancel()
+                # Unblock the loop if it is waiting on a full queue
+                while pages.get() is not None:
+                    pass
+            thread.join()
+
+    def _run_loop(self, pages, start_node_id):
+        try:
+            asyncio.run(self._main(pages, start_node_id))
+        except asyncio.CancelledError:
+            # Cancelled again while handing over the pages already fetched
+            pass
+        except Exception as e:
+            logger.error(f"Error in OneNote extraction: {e}")
+        finally:
+            pages.put(None)
+
+    async def _main(self, pages, start_node_id):
+        self.loop = asyncio.get_running_loop()
+        self.task = asyncio.current_task()
+        if self.cancelled.is_set():
+            return
+        stop_at = self.loop.time() + self.deadline if self.deadline else None
+        pending = deque()
+        records = ()
+        # Fetch threads of other backends, not waited for once their budget is spent
+        self.executor = None if isinstance(self.backend, PowerShellBackend) else ThreadPoolExecutor(self.concurrency)
+        try:
+            hierarchy = await self._hierarchy(start_node_id, self._budget(self.hierarchy_timeout, stop_at))
+            semaphore = asyncio.Semaphore(self.concurrency)
+            records = hierarchy_records(hierarchy)
+            for page_data in records:
+                if stop_at is not None and self.loop.time() >= stop_at:
+                    self.stats['skipped_pages'] += 1
+                    continue
+                pending.append((page_data, asyncio.create_task(
+                    self._fetch(page_data, semaphore, stop_at)
+                )))
+                while len(pending) >= self.concurrency * 2:
+                    await self._deliver(pages, *pending.popleft())
+            while pending:
+                await self._deliver(pages, *pending.popleft())
+        except asyncio.CancelledError:
+            logger.warning("Extraction cancelled, keeping the pages fetched so far")
+        except asyncio.TimeoutError:
+            logger.error("OneNote hierarchy was not retrieved in time")
+            self.stats['hierarchy_timeouts'] += 1
+        except Exception as e:
+            logger.error(f"Error in OneNote extraction: {e}")
+            self.stats['run_errors'] += 1
+        finally:
+            # Pages of the hierarchy the run stopped before scheduling
+            try:
+                self.stats['skipped_pages'] += sum(1 for _ in records)
+            except Exception:
+                pass
+            for page_data, task in pending:
+                task.cancel()
+            # Pages that finished before the cancellation are still delivered
+            for page_data, task in pending:
+                try:
+                    await self._deliver(pages, page_data, task)
+                except asyncio.CancelledError:
+                    self.stats['skipped_pages'] += 1
+            if self.executor is not None:
+                self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def _budget(self, timeout, stop_at):
+        """Seconds allowed for a step: its own timeout, cut short by the deadline"""
+        if stop_at is None:
+            return timeout
+        remaining = max(0, stop_at - self.loop.time())
+        return remaining if timeout is None else min(timeout, remaining)
+
+    async def _hierarchy(self, start_node_id, timeout):
+        backend = self.backend
+        if isinstance(backend, PowerShellBackend):
+            script = backend.hierarchy_script(start_node_id, open_file=bool(backend.onenote_file))
+            return await run_script(backend.command, script, timeout)
+        return await asyncio.wait_for(
+            self.loop.run_in_executor(self.executor, backend.get_hierarchy, start_node_id), timeout
+        )
+
+    async def _fetch(self, page_data, semaphore, stop_at):
+        """A page's text, or None if it failed, timed out or ran past the deadline"""
+        async with semaphore:
+            # The page's own budget starts once it is actually being fetched
+            timeout = self._budget(self.page_timeout, stop_at)
+            backend = self.backend
+            try:
+                if isinstance(backend, PowerShellBackend):
+                    page_xml = await run_script(backend.command, backend.page_script(page_data['page_id']),
+                                                timeout)
+                    return extract_text_from_page_xml(page_xml)
+                # A thread can't be killed; past its budget its result is dropped
+                return await asyncio.wait_for(
+                    self.loop.run_in_executor(self.executor, backend.fetch_page, page_data['page_id']),
+                    timeout
+                )
+            except asyncio.TimeoutError:
+                if timeout == self.page_timeout:
+                    logger.warning(f"      Page {page_data['page']} took longer than {timeout:g}s, skipped")
+                    self.stats['page_timeouts'] += 1
+                    if metrics.enabled:
+                        metrics.count('page_timeouts')
+                else:
+                    self.stats['skipped_pages'] += 1
+            except Exception as e:
+                logger.warning(f"      Error extracting page content: {e}")
+                self.stats['page_errors'] += 1
+                if metrics.enabled:
+                    metrics.count('fetch_errors')
+            return None
+
+    async def _deliver(self, pages, page_data, task):
+        content = await task
+        if content and content.strip():
+            page_data['content'] = content
+            self.stats['pages'] += 1
+            await asyncio.to_thread(pages.put, page_data)
@@ -0,0 +1,584 @@
+"""
+Extraction backends: where hierarchy and page XML come from
+
+Every backend offers the same three calls:
+
+    get_hierarchy()              hierarchy XML down to pages
+    get_page_xml(page_id)        the XML of one page
+    iter_pages(cache, fetchers)  page records {'notebook', 'section', 'page', 'content', ...}
+
+ComBackend talks to OneNote.Application through win32com, PowerShellBackend
+drives the same COM object from a PowerShell subprocess, and ReplayBackend
+serves XML recorded earlier, so extraction and benchmarks can run on Linux
+against captured notebooks. LatencyBackend wraps any of them and delays each
+page fetch, to stand in for COM round-trips. A replay directory looks like:
+
+    <directory>/hierarchy.xml
+    <directory>/pages/<page id>.xml
+
+RecordedOneNote and RecordingOneNote are stand-ins for the COM object itself:
+the first replays a directory, the second wraps a live OneNote and records it.
+"""
+
+import json
+import logging
+import queue
+import re
+import subprocess
+import threading
+import time
+import xml.etree.ElementTree as ET
+from collections import Counter, deque
+from contextlib import nullcontext
+from pathlib import Path
+
+from onenote_metrics import metrics
+from onenote_parsing import ONENOTE_NS, extract_text_from_page_xml
+
+logger = logging.getLogger(__name__)
+
+# HierarchyScope.hsPages; hsNotebooks (1) stops at notebooks, without sections or pages
+HS_PAGES = 4
+
+
+def powershell_literal(value):
+    """value as a single-quoted PowerShell string, which expands no $ or backtick"""
+    # PowerShell also ends single-quoted strings at the typographic single quotes
+    return "'" + re.sub("(['\u2018\u2019\u201a\u201b])", r'\1\1', str(value)) + "'"
+
+
+def page_file_name(page_id):
+    """File name for a page ID, which contains braces"""
+    return re.sub(r'[^A-Za-z0-9-]', '_', page_id) + '.xml'
+
+
+class Backend:
+    """Base class for sources of OneNote hierarchy and page XML
+
+    ``stats`` counts what the backend's runs left out: fetch_errors for
+    pages that could not be fetched and unfinished_runs for extractions
+    that stopped before the end of the hierarchy.
+    """
+
+    def __init__(self):
+        self.stats = Counter()
+
+    def incomplete(self):
+        """Whether pages of the hierarchy were left out of a run so far"""
+        return any(self.stats[key] for key in ('fetch_errors', 'unfinished_runs'))
+
+    def open(self, path):
+        """Ask OneNote to open a notebook or section file; returns its ID if known"""
+        return ''
+
+    def get_hierarchy(self, start_node_id=''):
+        raise NotImplementedError
+
+    def get_page_xml(self, page_id):
+        raise NotImplementedError
+
+    def fetch_page(self, page_id):
+        """Fetch one page and extract its text; called from fetch threads"""
+        with metrics.timer('fetch'):
+            page_xml = self.get_page_xml(page_id)
+        with metrics.timer('xml_parse'):
+            return extract_text_from_page_xml(page_xml)
+
+    def hierarchy_pages(self, start_node_id=''):
+        """Yield (notebook name, section name, page element) in hierarchy order"""
+        yield from hierarchy_pages(self.get_hierarchy(start_node_id))
+
+    def page_records(self, start_node_id=''):
+        """Yield a record without content for every page, in hierarchy order"""
+        yield from hierarchy_records(self.get_hierarchy(start_node_id))
+
+    def iter_file_pages(self, path, cache=None, fetchers=1, snapshot=None):
+        """Open one notebook or section file and yield its pages only"""
+        node_id = self.open(path)
+        yield from self.iter_pages(cache, fetchers, node_id or '', snapshot)
+
+    def iter_pages(self, cache=None, fetchers=1, start_node_id='', snapshot=None):
+        """Yield a record for every page with text, walking the hierarchy
+
+        Pages unchanged since they were cached are not fetched. With fetchers
+        > 1, a pool of that many threads fetches pages ahead while the caller
+        parses earlier ones. At most two fetches per thread are in flight, so
+        a slow consumer stalls fetching instead of piling up page XML, and
+        pages are still yielded in hierarchy order. The cache is only used
+        from the calling thread. With a HierarchySnapshot only the pages
+        added or changed since it was saved are fetched (see onenote_snapshot).
+        """
+        records = self.page_records(start_node_id)
+        if snapshot is not None:
+            records = snapshot.diff(records, start_node_id)
+
+        window = fetchers * 2 if fetchers > 1 else 1
+        if fetchers > 1:
+            from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(fetchers) if fetchers > 1 else nullcontext() as pool:
+            submit = pool.submit if pool else ImmediateResult
+            pending = deque()
+            for page_data in records:
+                cached = None
+                if cache is not None and page_data['last_modified']:
+                    cached = cache.lookup(page_data['page_id'], page_data['last_modified'])
+                if cached is not None:
+                    page_data['content'], page_data['entries'] = cached
+                    pending.append((page_data, None))
+                else:
+                    pending.append((page_data, submit(self.fetch_page, page_data['page_id'])))
+
+                while len(pending) >= window:
+                    yield from self._finish_page(*pending.popleft(), cache, snapshot)
+            while pending:
+                yield from self._finish_page(*pending.popleft(), cache, snapshot)
+
+    def _finish_page(self, page_data, fetch, cache, snapshot=None):
+        if fetch is not None:
+            try:
+                page_data['content'] = fetch.result()
+            except Exception as e:
+                logger.warning(f"      Error extracting page content: {e}")
+                self.stats['fetch_errors'] += 1
+                metrics.count('fetch_errors')
+                if snapshot is not None:
+                    snapshot.fetch_failed(page_data['page_id'])
+                return
+
+            # Empty pages never reach the parser, so remember them here
+            if cache is not None and page_data['last_modified'] and not page_data['content'].strip():
+                cache.store(page_data['page_id'], page_data['last_modified'], '', [])
+
+        if page_data['content'].strip():
+            yield page_data
+
+
+def hierarchy_pages(hierarchy_xml):
+    """Yield (notebook name, section name, page element) of hierarchy XML in order"""
+    root = ET.fromstring(hierarchy_xml)
+    logger.info("OneNote hierarchy retrieved successfully")
+
+    for notebook_name, section in _sections(root, ''):
+        section_name = section.get('name', '')
+        logger.debug(f"  Section: {section_name}")
+
+        for page in section.findall(f'.//{ONENOTE_NS}Page'):
+            logger.debug(f"    Page: {page.get('name', '')}")
+            yield notebook_name, section_name, page
+
+
+def hierarchy_records(hierarchy_xml):
+    """Yield a page record without content for every page of hierarchy XML"""
+    for notebook_name, section_name, page in hierarchy_pages(hierarchy_xml):
+        yield {
+            'notebook': notebook_name,
+            'section': section_name,
+            'page': page.get('name', ''),
+            'content': '',
+            'page_id': page.get('ID', ''),
+            'last_modified': page.get('lastModifiedTime', ''),
+        }
+
+
+def _sections(element, notebook_name):
+    """Yield (notebook name, section element) below element, through section groups"""
+    if element.tag == f'{ONENOTE_NS}Notebook':
+        notebook_name = element.get('name', '')
+        logger.info(f"Found notebook: {notebook_name} (ID: {element.get('ID', '')})")
+    elif element.tag == f'{ONENOTE_NS}Section':
+        yield notebook_name, element
+        return
+    for child in element:
+        yield from _sections(child, notebook_name)
+
+
+class ImmediateResult:
+    """Future-like wrapper around a call made on the spot, for fetching without threads"""
+
+    def __init__(self, fn, *args):
+        try:
+            self.value = fn(*args)
+            self.error = None
+        except Exception as e:
+            self.value = None
+            self.error = e
+
+    def result(self):
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+class ComBackend(Backend):
+    """OneNote.Application through win32com, or any object with the same methods
+
+    COM objects belong to the thread that created them, so without an
+    explicit one_note every fetch thread dispatches its own OneNote.Application.
+    """
+
+    def __init__(self, one_note=None):
+        super().__init__()
+        self.shared_one_note = one_note
+        self.local = threading.local()
+
+    @property
+    def one_note(self):
+        if self.shared_one_note is not None:
+            return self.shared_one_note
+
+        one_note = getattr(self.local, 'one_note', None)
+        if one_note is None:
+            # Imported here so the other backends work without pywin32
+            import pythoncom
+            import win32com.client
+            pythoncom.CoInitialize()
+            one_note = self.local.one_note = win32com.client.Dispatch("OneNote.Application")
+        return one_note
+
+    def open(self, path):
+        # pywin32 returns the out parameter (the opened node's ID) when it knows the signature
+        node_id = self.one_note.OpenHierarchy(str(Path(path).resolve()), "", "", 0)
+        return node_id if isinstance(node_id, str) else ''
+
+    def get_hierarchy(self, start_node_id=''):
+        return self.one_note.GetHierarchy(start_node_id, HS_PAGES)
+
+    def get_page_xml(self, page_id):
+        return self.one_note.GetPageContent(page_id)
+
+
+class ReplayBackend(ComBackend):
+    """Hierarchy and page XML recorded into a directory, see RecordedOneNote"""
+
+    def __init__(self, directory):
+        super().__init__(RecordedOneNote(directory))
+
+
+class PowerShellBackend(Backend):
+    """OneNote.Application driven from PowerShell, for machines without pywin32
+
+    Each call starts one PowerShell process, so iter_pages extracts a whole
+    notebook in a single script instead of one process per page. The script
+    writes one compressed JSON record per line as it goes (see
+    EXTRACT_SCRIPT), and pages are yielded while PowerShell is still
+    fetching later ones. Instead of a deadline for the whole run, ``timeout``
+    is the longest the script may go without writing a line.
+
+    ``command`` is the command line the script is appended to; point it at a
+    stub that writes the same records to run without PowerShell.
+    """
+
+    def __init__(self, onenote_file=None, timeout=120, command=None):
+        super().__init__()
+        self.onenote_file = onenote_file
+        self.timeout = timeout
+        self.command = command or POWERSHELL_COMMAND
+
+    def open(self, path):
+        self.onenote_file = path
+        return ''
+
+    def _run(self, script):
+        result = subprocess.run(
+            self.command + [script],
+            capture_output=True,
+            encoding='utf-8',
+            errors='replace',
+            timeout=self.timeout
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"PowerShell error: {result.stderr}")
+        return result.stdout
+
+    def hierarchy_script(self, start_node_id='', open_file=False):
+        """Script printing the hierarchy XML, opening onenote_file first if asked"""
+        opening = ''
+        if open_file:
+            opening = OPEN_SCRIPT.replace('__ONENOTE_FILE__', powershell_literal(self.onenote_file))
+        return f'''{UTF8_OUTPUT}
+$oneNote = New-Object -ComObject OneNote.Application
+{opening}$xml = ""
+$oneNote.GetHierarchy({powershell_literal(start_node_id)}, {HS_PAGES}, [ref]$xml)
+$xml
+'''
+
+    def page_script(self, page_id):
+        """Script printing the XML of one page"""
+        return f'''{UTF8_OUTPUT}
+$oneNote = New-Object -ComObject OneNote.Application
+$xml = ""
+$oneNote.GetPageContent({powershell_literal(page_id)}, [ref]$xml)
+$xml
+'''
+
+    def get_hierarchy(self, start_node_id=''):
+        return self._run(self.hierarchy_script(start_node_id))
+
+    def get_page_xml(self, page_id):
+        return self._run(self.page_script(page_id))
+
+    def iter_pages(self, cache=None, fetchers=1, start_node_id='', snapshot=None):
+        """Yield page records as the script emits them; cache and fetchers do not apply
+
+        The script extracts every page, so with a snapshot the hierarchy is
+        diffed first and only the added and changed pages are fetched, one
+        GetPageContent process each.
+        """
+        if snapshot is not None:
+            yield from super().iter_pages(cache, fetchers, start_node_id, snapshot)
+            return
+        script = EXTRACT_SCRIPT.replace('__ONENOTE_FILE__', powershell_literal(self.onenote_file))
+        process = subprocess.Popen(self.command + [script], stdout=subprocess.PIPE,
+                                   encoding='utf-8', errors='replace')
+
+        # A bounded queue lets a slow consumer stall the script through the pipe
+        lines = queue.Queue(maxsize=POWERSHELL_LINE_QUEUE)
+        reader = threading.Thread(target=_pump_lines, args=(process.stdout, lines), daemon=True)
+        reader.start()
+
+        finished = False
+        completed = False
+        try:
+            while True:
+                waited = time.perf_counter()
+                try:
+                    line = lines.get(timeout=self.timeout)
+                except queue.Empty:
+                    logger.error(f"PowerShell wrote nothing for {self.timeout} seconds, stopping")
+                    break
+                if metrics.enabled:
+                    metrics.add_time('fetch', time.perf_counter() - waited)
+                if line is None:
+                    finished = True
+                    break
+
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    record = None
+                if not isinstance(record, dict):
+                    # Host output that is not part of the protocol
+                    if line.strip():
+                        logger.info(line.rstrip())
+                    continue
+
+                kind = record.get('type')
+                if kind == 'page':
+                    yield {
+                        'notebook': record.get('notebook') or '',
+                        'section': record.get('section') or '',
+                        'page': record.get('page') or '',
+                        'content': record.get('content') or '',
+                        'page_id': record.get('page_id') or '',
+                        'last_modified': record.get('last_modified') or '',
+                    }
+                elif kind == 'done':
+                    completed = True
+                elif kind == 'error':
+                    logger.error(f"PowerShell error: {record.get('message', '')}")
+                    self.stats['fetch_errors'] += 1
+                else:
+                    level = logging.DEBUG if record.get('level') == 'debug' else logging.INFO
+                    logger.log(level, record.get('message', line.rstrip()))
+        finally:
+            if process.poll() is None:
+                process.kill()
+            # Unblock the reader if it is waiting on a full queue
+            while not finished:
+                finished = lines.get() is None
+            process.wait()
+
+        if not completed:
+            logger.error(f"PowerShell script ended early (exit code {process.returncode})")
+            self.stats['unfinished_runs'] += 1
+
+
+def _pump_lines(stream, lines):
+    for line in stream:
+        lines.put(line)
+    lines.put(None)
+
+
+# Command line the extraction script is appended to
+POWERSHELL_COMMAND = ["powershell", "-NoProfile", "-NonInteractive", "-Command"]
+# Lines of script output read ahead of the consumer
+POWERSHELL_LINE_QUEUE = 64
+
+# Heads the per-call scripts; PowerShell otherwise writes redirected output in the OEM code page
+UTF8_OUTPUT = '[Console]::OutputEncoding = [System.Text.Encoding]::UTF8'
+
+# Opens the notebook or section file, as EXTRACT_SCRIPT does before walking the hierarchy
+OPEN_SCRIPT = '''try {
+    $oneNote.OpenHierarchy((Resolve-Path -LiteralPath __ONENOTE_FILE__).Path, "", "", 0)
+    Start-Sleep -Seconds 2
+} catch {}
+'''
+
+# Writes one JSON object per line to stdout, each with a "type":
+#   {"type": "page", "notebook", "section", "page", "page_id", "last_modified", "content"}
+#   {"type": "log", "message", "level"}
+#                                  progress, logged at INFO, or at DEBUG with
+#                                  level "debug" (the section and page lines)
+#   {"type": "error", "message"}   a page or the whole run failed
+#   {"type": "done", "pages"}      last line of a complete run
+EXTRACT_SCRIPT = '''
+[Console]::OutputEncoding = [System.Text.Encoding]::UTF8
+
+function Emit($record) {
+    [Console]::Out.WriteLine(($record | ConvertTo-Json -Compress -Depth 2))
+    [Console]::Out.Flush()
+}
+
+function Log($message, $level = "info") {
+    Emit ([ordered]@{ type = "log"; message = $message; level = $level })
+}
+
+try {
+    # Create OneNote Application
+    $oneNote = New-Object -ComObject OneNote.Application
+
+    # Get the absolute path
+    $filePath = (Resolve-Path -LiteralPath __ONENOTE_FILE__).Path
+    Log "Processing OneNote file: $filePath"
+
+    # Try to open the file first
+    try {
+        $oneNote.OpenHierarchy($filePath, "", "", 0)
+        Log "OneNote file opened successfully"
+        Start-Sleep -Seconds 2
+    } catch {
+        Log "Warning: Could not open file directly: $($_.Exception.Message)"
+    }
+
+    # Get notebook hierarchy down to pages
+    $notebookXml = ""
+    $oneNote.GetHierarchy("", 4, [ref]$notebookXml)
+
+    # Parse XML and stream out each page as soon as it is extracted
+    [xml]$xml = $notebookXml
+    $pageCount = 0
+
+    foreach ($notebook in $xml.Notebooks.Notebook) {
+        $notebookName = $notebook.name
+        Log "Found notebook: $notebookName"
+
+        foreach ($section in $notebook.Section) {
+            $sectionName = $section.name
+            Log "  Section: $sectionName" "debug"
+
+            foreach ($page in $section.Page) {
+                $pageName = $page.name
+                $pageId = $page.ID
+                Log "    Page: $pageName" "debug"
+
+                try {
+                    # Get page content
+                    $pageXml = ""
+                    $oneNote.GetPageContent($pageId, [ref]$pageXml)
+
+                    # Extract text from XML
+                    [xml]$pageContent = $pageXml
+                    $textElements = $pageContent.SelectNodes("//*[local-name()='T']")
+
+                    $allText = New-Object System.Collections.Generic.List[string]
+                    foreach ($textElement in $textElements) {
+                        if ($textElement.InnerText -and $textElement.InnerText.Trim()) {
+                            $allText.Add($textElement.InnerText.Trim())
+                        }
+                    }
+
+                    $content = $allText -join "`n"
+
+                    if ($content.Trim()) {
+                        Emit ([ordered]@{
+                            type = "page"
+                            notebook = $notebookName
+                            section = $sectionName
+                            page = $pageName
+                            page_id = $pageId
+                            last_modified = $page.lastModifiedTime
+                            content = $content
+                        })
+                        $pageCount++
+                    }
+                } catch {
+                    Emit ([ordered]@{ type = "error"; message = "Error extracting page ${pageName}: $($_.Exception.Message)" })
+                }
+            }
+        }
+    }
+
+    Emit ([ordered]@{ type = "done"; pages = $pageCount })
+
+} catch {
+    Emit ([ordered]@{ type = "error"; message = "Error: $($_.Exception.Message)" })
+    exit 1
+}
+'''
+
+
+class LatencyBackend(Backend):
+    """Wraps another backend and delays every page fetch, to stand in for COM round-trips"""
+
+    def __init__(self, backend, latency):
+        super().__init__()
+        self.backend = backend
+        self.latency = latency
+
+    def open(self, path):
+        return self.backend.open(path)
+
+    def get_hierarchy(self, start_node_id=''):
+        return self.backend.get_hierarchy(start_node_id)
+
+    def get_page_xml(self, page_id):
+        time.sleep(self.latency)
+        return self.backend.get_page_xml(page_id)
+
+
+class RecordedOneNote:
+    """Serves recorded hierarchy/page XML through the OneNote.Application methods we use"""
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.calls = Counter()
+
+    def GetHierarchy(self, start_node_id, scope):
+        self.calls['GetHierarchy'] += 1
+        return (self.directory / 'hierarchy.xml').read_text(encoding='utf-8')
+
+    def GetPageContent(self, page_id, *args):
+        self.calls['GetPageContent'] += 1
+        path = self.directory / 'pages' / page_file_name(page_id)
+        if not path.exists():
+            raise KeyError(f"No recorded content for page {page_id}")
+        return path.read_text(encoding='utf-8')
+
+    def OpenHierarchy(self, path, relative_to_object_id, object_id, create_file_type):
+        self.calls['OpenHierarchy'] += 1
+        return ''
+
+
+class RecordingOneNote:
+    """Passes calls through to OneNote and records the XML it returns"""
+
+    def __init__(self, one_note, directory):
+        self.one_note = one_note
+        self.directory = Path(directory)
+        (self.directory / 'pages').mkdir(parents=True, exist_ok=True)
+
+    def GetHierarchy(self, start_node_id, scope):
+        hierarchy_xml = self.one_note.GetHierarchy(start_node_id, scope)
+        (self.directory / 'hierarchy.xml').write_text(hierarchy_xml, encoding='utf-8')
+        return hierarchy_xml
+
+    def GetPageContent(self, page_id, *args):
+        page_xml = self.one_note.GetPageContent(page_id, *args)
+        path = self.directory / 'pages' / page_file_name(page_id)
+        path.write_text(page_xml, encoding='utf-8')
+        return page_xml
+
+    def OpenHierarchy(self, path, relative_to_object_id, object_id, create_file_type):
+        return self.one_note.OpenHierarchy(path, relative_to_object_id, object_id,
+                                           create_file_type)
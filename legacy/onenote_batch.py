@@ -0,0 +1,342 @@
+"""
+Batch extraction of many OneNote files in one run
+
+Takes .one files, notebook folders or glob patterns and extracts every file
+in a pool of worker processes. Each worker keeps one backend session for
+all the files it handles (one OneNote.Application per process for COM) and
+writes a part file of JSON lines per input file, tagged with source_file.
+Finished files are appended to a manifest in the output folder, so an
+interrupted run picks up where it stopped: files already in the manifest
+with the same size and modification time, extracted with the same backend
+and rule pack (by its rules_id), are not extracted again. Once
+every file is done the parts are merged, in input order, into one output
+per format.
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import logging
+import os
+import sys
+from collections import Counter
+from pathlib import Path
+
+from onenote_parsing import com_scanner, com_extractor, powershell_scanner, powershell_extractor
+from onenote_parsing import iter_business_entries, rule_pack
+from onenote_rules import BUILTIN_PACKS, RulePackError
+from onenote_writers import ENTRY_COLUMNS, WRITERS, write_outputs
+from onenote_dedupe import DEDUPE_FIELDS, DEFAULT_THRESHOLD, dedupe_entries
+from onenote_normalize import NORMALIZED_FIELDS, normalize_entries
+from onenote_metrics import add_arguments, instrumented, metrics
+
+logger = logging.getLogger(__name__)
+
+BATCH_COLUMNS = ['source_file'] + ENTRY_COLUMNS
+MANIFEST_NAME = 'manifest.jsonl'
+PARTS_DIR = 'parts'
+OUTPUT_STEM = 'onenote_extracted'
+
+RULES = {
+    'com': (com_scanner, com_extractor),
+    'powershell': (powershell_scanner, powershell_extractor),
+}
+
+
+class OfflineSession:
+    """Reads .one files directly; nothing to keep open between files"""
+
+    def iter_file_pages(self, path, cache=None, fetchers=1):
+        from onenote_onestore import iter_offline_pages
+        return iter_offline_pages(path)
+
+
+def open_session(backend_name):
+    """Create the backend a worker uses for all of its files"""
+    if backend_name == 'offline':
+        return OfflineSession()
+    from onenote_backends import ComBackend
+    return ComBackend()
+
+
+def expand_inputs(patterns):
+    """Turn files, folders and glob patterns into a list of .one paths, in order, without repeats"""
+    files = []
+    for pattern in patterns:
+        if glob.has_magic(pattern):
+            matches = sorted(glob.glob(pattern, recursive=True))
+        else:
+            matches = [pattern]
+
+        for match in map(Path, matches):
+            if match.is_dir():
+                files.extend(sorted(
+                    section for section in match.rglob('*.one')
+                    if 'OneNote_RecycleBin' not in section.parts
+                ))
+            elif match.suffix.lower() == '.one' and match.is_file():
+                files.append(match)
+            else:
+                logger.warning(f"Skipping {match}: not a .one file or folder")
+
+    seen = set()
+    unique = []
+    for path in files:
+        path = path.resolve()
+        if path not in seen:
+            seen.add(path)
+            unique.append(path)
+    return unique
+
+
+def file_signature(path):
+    """Size and mtime recorded in the manifest to notice files changed since"""
+    status = os.stat(path)
+    return status.st_size, status.st_mtime_ns
+
+
+class Manifest:
+    """Append-only JSON lines record of finished files, one line per file"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.done = {}
+        if self.path.exists():
+            with open(self.path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # A line cut short by a crash; that file is redone
+                        continue
+                    if record.get('status') == 'done':
+                        self.done[record['file']] = record
+                    else:
+                        self.done.pop(record.get('file'), None)
+        self.file = open(self.path, 'a', encoding='utf-8')
+
+    def finished(self, path, settings):
+        """The manifest record for path if it was done with these settings and has not changed since"""
+        record = self.done.get(str(path))
+        if record is None or not Path(record['part']).exists():
+            return None
+        size, mtime_ns = file_signature(path)
+        if (record['size'], record['mtime_ns']) != (size, mtime_ns):
+            return None
+        # Parts parsed by another backend or rule pack would mix into the merged output
+        if any(record.get(key) != value for key, value in settings.items()):
+            return None
+        return record
+
+    def add(self, record):
+        self.file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        if record['status'] == 'done':
+            self.done[record['file']] = record
+        else:
+            self.done.pop(record['file'], None)
+
+    def close(self):
+        self.file.close()
+
+
+# Backend session, scanner and extractor of a batch worker process
+_worker_state = None
+
+
+def _init_batch_worker(backend_name, rules, measure=False):
+    global _worker_state
+    _worker_state = (open_session(backend_name),) + rule_pack(rules)
+    # Forked workers start with a copy of the parent's numbers
+    metrics.reset()
+    metrics.enabled = measure
+
+
+def part_name(path):
+    """Part file name, stable for a path whatever else is in the batch"""
+    digest = hashlib.sha1(str(path).encode('utf-8')).hexdigest()[:12]
+    return f"{path.stem}-{digest}.jsonl"
+
+
+def extract_file(path, part_path):
+    """Extract one file into a JSON lines part; runs in a batch worker.
+
+    Returns the manifest record, and the file's metrics when they are recorded.
+    """
+    session, scanner, extractor = _worker_state
+    size, mtime_ns = file_signature(path)
+    stats = Counter()
+    pages = session.iter_file_pages(path)
+
+    temporary = f"{part_path}.tmp"
+    try:
+        with open(temporary, 'w', encoding='utf-8') as part:
+            for entry in iter_business_entries(pages, scanner, extractor, stats):
+                part.write(json.dumps({'source_file': str(path), **entry}, ensure_ascii=False) + '\n')
+                stats['entries'] += 1
+    except BaseException:
+        os.remove(temporary)
+        raise
+    os.replace(temporary, part_path)
+
+    record = {
+        'file': str(path), 'status': 'done', 'part': str(part_path),
+        'size': size, 'mtime_ns': mtime_ns,
+        'pages': stats['pages'], 'entries': stats['entries'],
+    }
+    if not metrics.enabled:
+        return record, None
+    snapshot = metrics.snapshot()
+    metrics.reset()
+    return record, snapshot
+
+
+def iter_part_entries(part_paths):
+    for part_path in part_paths:
+        with open(part_path, encoding='utf-8') as part:
+            for line in part:
+                yield json.loads(line)
+
+
+def run_batch(files, output_dir, formats, backend_name='offline', rules='com', workers=1,
+              dedupe=None, normalize=False):
+    """Extract every file not finished yet, then merge all parts into one output per format.
+
+    With dedupe (a similarity), near-duplicate entries across all files are
+    merged; normalize adds the onenote_normalize columns. Returns (stats,
+    paths, failed): the write_outputs stats and paths, and the list of
+    files that raised.
+    """
+    output_dir = Path(output_dir)
+    parts_dir = output_dir / PARTS_DIR
+    parts_dir.mkdir(parents=True, exist_ok=True)
+    manifest = Manifest(output_dir / MANIFEST_NAME)
+    settings = {'backend': backend_name, 'rules_id': rule_pack(rules)[1].rules_id}
+
+    part_paths = {path: parts_dir / part_name(path) for path in files}
+    todo = []
+    for path in files:
+        if manifest.finished(path, settings):
+            logger.debug(f"Already extracted: {path}")
+        else:
+            todo.append(path)
+    logger.info(f"{len(files) - len(todo)} of {len(files)} files already extracted, {len(todo)} to go")
+
+    failed = []
+
+    def finished(path, result=None, error=None):
+        if error is not None:
+            logger.error(f"Error extracting {path}: {error}")
+            failed.append(path)
+            manifest.add({'file': str(path), 'status': 'failed', 'error': str(error)})
+            return
+
+        record, snapshot = result
+        logger.info(f"Extracted {record['entries']} entries from {record['pages']} pages: {path}")
+        manifest.add({**record, **settings})
+        if snapshot is not None:
+            metrics.merge(snapshot)
+
+    try:
+        if workers > 1 and len(todo) > 1:
+            from concurrent.futures import ProcessPoolExecutor, as_completed
+            with ProcessPoolExecutor(min(workers, len(todo)), initializer=_init_batch_worker,
+                                     initargs=(backend_name, rules, metrics.enabled)) as pool:
+                futures = {pool.submit(extract_file, path, part_paths[path]): path for path in todo}
+                for future in as_completed(futures):
+                    try:
+                        finished(futures[future], future.result())
+                    except Exception as e:
+                        finished(futures[future], error=e)
+        elif todo:
+            _init_batch_worker(backend_name, rules, metrics.enabled)
+            for path in todo:
+                try:
+                    finished(path, extract_file(path, part_paths[path]))
+                except Exception as e:
+                    finished(path, error=e)
+
+        done_parts = [manifest.done[str(path)]['part'] for path in files
+                      if str(path) in manifest.done]
+    finally:
+        manifest.close()
+
+    entries = iter_part_entries(done_parts)
+    columns = BATCH_COLUMNS
+    duplicates = Counter()
+    if dedupe:
+        entries = dedupe_entries(entries, dedupe, stats=duplicates)
+        columns = BATCH_COLUMNS + DEDUPE_FIELDS
+    if normalize:
+        entries = normalize_entries(entries)
+        columns = columns + NORMALIZED_FIELDS
+    stats, paths = write_outputs(entries, formats, output_dir / OUTPUT_STEM, columns)
+    stats.update(duplicates)
+    return stats, paths, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract business entries from many OneNote files")
+    parser.add_argument('inputs', nargs='+',
+                        help=".one files, notebook folders or glob patterns (quote them)")
+    parser.add_argument('--output', default='onenote_batch',
+                        help="folder for the outputs, parts and manifest (default: onenote_batch)")
+    parser.add_argument('--backend', choices=('offline', 'com'), default='offline',
+                        help="read files directly or through OneNote over COM (default: offline)")
+    parser.add_argument('--rules', default='com', metavar='PACK',
+                        help=f"rule pack to parse with: {', '.join(BUILTIN_PACKS)} or a JSON/YAML file "
+                             "(default: com)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="extract files in N worker processes (default: CPU count)")
+    parser.add_argument('--formats', default='xlsx,json',
+                        help=f"comma-separated outputs from {', '.join(WRITERS)} (default: xlsx,json)")
+    parser.add_argument('--dedupe', type=float, nargs='?', const=DEFAULT_THRESHOLD, metavar='SIMILARITY',
+                        help="merge near-duplicate entries across all files, keeping every source "
+                             f"(default similarity: {DEFAULT_THRESHOLD})")
+    parser.add_argument('--normalize', action='store_true',
+                        help="add typed date, amount and normalized name columns (needs pyarrow)")
+    parser.add_argument('--restart', action='store_true',
+                        help="ignore the manifest and extract every file again")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    formats = [name.strip() for name in args.formats.split(',') if name.strip()]
+    unknown = [name for name in formats if name not in WRITERS]
+    if unknown or not formats:
+        parser.error(f"unknown output format: {', '.join(unknown) or repr(args.formats)}")
+    try:
+        rule_pack(args.rules)
+    except (OSError, RulePackError) as e:
+        parser.error(f"--rules: {e}")
+
+    with instrumented(args):
+        files = expand_inputs(args.inputs)
+        if not files:
+            print("No .one files found")
+            sys.exit(1)
+
+        manifest_path = Path(args.output) / MANIFEST_NAME
+        if args.restart and manifest_path.exists():
+            manifest_path.unlink()
+
+        print(f"Extracting {len(files)} files with {args.workers} workers into {args.output}")
+        stats, paths, failed = run_batch(files, args.output, formats, args.backend, args.rules,
+                                         args.workers, args.dedupe, args.normalize)
+
+        print(f"\nFound {stats['entries']} valid business entries")
+        if args.dedupe:
+            print(f"Merged {stats['duplicates']} near-duplicate entries")
+        for path in paths.values():
+            print(f"Results saved to: {path}")
+
+        if failed:
+            print(f"{len(failed)} files failed; run again to retry them:")
+            for path in failed:
+                print(f"  {path}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Persistent page cache for incremental re-extraction
+
+Stores each page's extracted text and parsed business entries in SQLite,
+keyed by the page ID and the hierarchy's lastModifiedTime for that page. A
+page whose lastModifiedTime has not changed since the last run is served
+from the cache, so neither GetPageContent nor the parser runs for it.
+Entries parsed with a different rule pack (``rules_id``) don't count.
+The least recently used pages are evicted once the cache grows past
+max_bytes, and a cache written by an older CACHE_VERSION starts out empty.
+"""
+
+import json
+import sqlite3
+import time
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+# Bump whenever text extraction or parsing changes what would be cached
+CACHE_VERSION = 3
+COMMIT_EVERY = 200
+# Seconds a write waits for another connection's transaction to finish
+BUSY_TIMEOUT_SECONDS = 30
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    page_id TEXT PRIMARY KEY,
+    last_modified TEXT NOT NULL,
+    content TEXT NOT NULL,
+    entries TEXT NOT NULL,
+    rules_id TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS pages_last_used ON pages (last_used);
+"""
+
+
+class PageCache:
+    """SQLite cache of page text and entries, evicting least recently used pages"""
+
+    def __init__(self, path, max_bytes=DEFAULT_MAX_BYTES, rules_id='', commit_every=COMMIT_EVERY):
+        self.path = path
+        self.max_bytes = max_bytes
+        # The rule pack the cached entries have to come from
+        self.rules_id = rules_id
+        # Changes per transaction; 1 where other connections write to the same file,
+        # since a transaction stays open while the next pages are fetched
+        self.commit_every = commit_every
+        self.db = sqlite3.connect(path, timeout=BUSY_TIMEOUT_SECONDS)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        if self.db.execute('PRAGMA user_version').fetchone()[0] != CACHE_VERSION:
+            self.db.execute('DROP TABLE IF EXISTS pages')
+            self.db.execute(f'PRAGMA user_version = {CACHE_VERSION}')
+        self.db.executescript(SCHEMA)
+        self.size = self.db.execute('SELECT COALESCE(SUM(size), 0) FROM pages').fetchone()[0]
+        self.hits = 0
+        self.misses = 0
+        self.pending = 0
+
+    def lookup(self, page_id, last_modified):
+        """Return (content, entries) if the page is cached at this version, else None"""
+        row = self.db.execute(
+            'SELECT content, entries FROM pages WHERE page_id = ? AND last_modified = ? AND rules_id = ?',
+            (page_id, last_modified, self.rules_id)
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.db.execute('UPDATE pages SET last_used = ? WHERE page_id = ?', (time.time(), page_id))
+        self._changed()
+        return row[0], json.loads(row[1])
+
+    def store(self, page_id, last_modified, content, entries):
+        """Cache a page version; entries are the page's entry dicts without source columns"""
+        entries_json = json.dumps(entries, ensure_ascii=False)
+        size = len(content.encode('utf-8')) + len(entries_json.encode('utf-8'))
+
+        old = self.db.execute('SELECT size FROM pages WHERE page_id = ?', (page_id,)).fetchone()
+        if old is not None:
+            self.size -= old[0]
+        self.db.execute(
+            'INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (page_id, last_modified, content, entries_json, self.rules_id, size, time.time())
+        )
+        self.size += size
+
+        if self.size > self.max_bytes:
+            self.evict()
+        self._changed()
+
+    def evict(self):
+        """Drop least recently used pages until the cache fits in max_bytes"""
+        rows = self.db.execute('SELECT page_id, size FROM pages ORDER BY last_used')
+        evicted = []
+        for page_id, size in rows:
+            if self.size <= self.max_bytes:
+                break
+            evicted.append((page_id,))
+            self.size -= size
+        self.db.executemany('DELETE FROM pages WHERE page_id = ?', evicted)
+        return len(evicted)
+
+    def _changed(self):
+        self.pending += 1
+        if self.pending >= self.commit_every:
+            self.db.commit()
+            self.pending = 0
+
+    def commit(self):
+        self.db.commit()
+        self.pending = 0
+
+    def close(self):
+        self.commit()
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
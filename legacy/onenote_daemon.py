@@ -0,0 +1,301 @@
+"""
+Long-running extraction service on localhost
+
+Keeps the interpreter, the compiled parsing rules, a backend session per
+job thread (one OneNote.Application attach for COM) and the page cache warm
+between extractions, so callers don't pay process start, imports and COM
+attach for every file.
+
+    POST /extract  {"file": "C:/Notebooks/Deals.one", "rules": "com", "content": false}
+    GET  /health
+    GET  /metrics  (OpenMetrics text, when started with --metrics)
+
+/extract streams newline-delimited JSON as the pages are parsed: one
+{"type": "page", ...} record per page with its entries, then a single
+{"type": "done", ...} or {"type": "error", ...} record. Up to --jobs
+extractions run at once; further requests wait for a free job thread.
+
+The service only listens on loopback, and since a web page can still send
+requests there, it only answers requests whose Host is 127.0.0.1:<port> or
+localhost:<port> (not a rebound DNS name) and /extract only takes a body
+sent as application/json, which a page can't send without CORS consent.
+"""
+
+import argparse
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from onenote_parsing import iter_page_entries
+from onenote_batch import RULES, open_session
+from onenote_metrics import add_arguments, instrumented, metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORT = 8765
+# Page records buffered per request before the job waits for the client
+DAEMON_QUEUE_PAGES = 64
+PUT_POLL_SECONDS = 0.5
+DEFAULT_RULES = {'com': 'com', 'offline': 'com', 'powershell': 'powershell'}
+LOCAL_HOST_NAMES = ('127.0.0.1', 'localhost')
+
+
+class JobCancelled(Exception):
+    """The client went away before its extraction finished"""
+
+
+class ExtractionService:
+    """Runs extraction jobs on a fixed pool of threads with warm per-thread state"""
+
+    def __init__(self, backend_name='com', jobs=2, cache_path=None, cache_bytes=None, replay=None):
+        self.backend_name = backend_name
+        self.cache_path = cache_path
+        self.cache_bytes = cache_bytes
+        self.replay = replay
+        self.pool = ThreadPoolExecutor(jobs, thread_name_prefix='extract')
+        self.local = threading.local()
+        self.stats = Counter()
+        self.lock = threading.Lock()
+
+    def _session(self):
+        """Backend and page cache of the calling job thread, created on its first job"""
+        if not hasattr(self.local, 'session'):
+            if self.replay:
+                from onenote_backends import ReplayBackend
+                self.local.session = ReplayBackend(self.replay)
+            elif self.backend_name == 'powershell':
+                from onenote_backends import PowerShellBackend
+                self.local.session = PowerShellBackend()
+            else:
+                self.local.session = open_session(self.backend_name)
+
+            self.local.cache = None
+            if self.cache_path:
+                from onenote_cache import DEFAULT_MAX_BYTES, PageCache
+                # Job threads share the file, so each change is committed right away
+                self.local.cache = PageCache(self.cache_path, self.cache_bytes or DEFAULT_MAX_BYTES,
+                                             commit_every=1)
+        return self.local.session, self.local.cache
+
+    def submit(self, path, rules, include_content, emit):
+        return self.pool.submit(self.extract, path, rules, include_content, emit)
+
+    def extract(self, path, rules, include_content, emit):
+        """Extract one file on a job thread, passing every record to emit"""
+        start = time.perf_counter()
+        stats = Counter()
+        try:
+            session, cache = self._session()
+            scanner, extractor = RULES[rules]
+            if cache is not None:
+                cache.rules_id = extractor.rules_id
+            pages = session.iter_file_pages(path, cache)
+            for page_data, entries in iter_page_entries(pages, scanner, extractor, stats, cache):
+                record = {
+                    'type': 'page',
+                    'notebook': page_data.get('notebook', ''),
+                    'section': page_data.get('section', ''),
+                    'page': page_data.get('page', ''),
+                    'page_id': page_data.get('page_id', ''),
+                    'entries': [entry.to_dict() for entry in entries],
+                }
+                if include_content:
+                    record['content'] = page_data.get('content', '')
+                stats['entries'] += len(entries)
+                emit(record)
+        except JobCancelled:
+            stats['cancelled'] += 1
+            return stats
+        except Exception as e:
+            logger.error(f"Error extracting {path}: {e}")
+            stats['errors'] += 1
+            emit({'type': 'error', 'message': str(e)})
+            return stats
+        finally:
+            if getattr(self.local, 'cache', None) is not None:
+                self.local.cache.commit()
+            with self.lock:
+                self.stats['jobs'] += 1
+                self.stats.update(stats)
+
+        emit({
+            'type': 'done', 'pages': stats['pages'], 'entries': stats['entries'],
+            'cached_pages': stats['cached_pages'],
+            'seconds': round(time.perf_counter() - start, 3),
+        })
+        return stats
+
+    def health(self):
+        with self.lock:
+            return {'status': 'ok', 'backend': self.backend_name, **self.stats}
+
+    def close(self):
+        self.pool.shutdown(wait=True)
+
+
+class ExtractionHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        logger.info(f"{self.address_string()} {format % args}")
+
+    def send_json(self, status, body):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def local_request(self):
+        """Whether the Host header names this server on loopback, else answers 403"""
+        port = self.server.server_address[1]
+        hosts = {f'{name}:{port}' for name in LOCAL_HOST_NAMES}
+        if port == 80:
+            hosts.update(LOCAL_HOST_NAMES)
+        if self.headers.get('Host', '').lower() in hosts:
+            return True
+        self.send_json(403, {'error': f"requests must be sent to 127.0.0.1:{port} or localhost:{port}"})
+        return False
+
+    def do_GET(self):
+        if not self.local_request():
+            return
+        if self.path == '/health':
+            self.send_json(200, self.server.service.health())
+        elif self.path == '/metrics' and metrics.enabled:
+            data = metrics.openmetrics().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/openmetrics-text; version=1.0.0; charset=utf-8')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        else:
+            self.send_json(404, {'error': f"unknown path {self.path}"})
+
+    def do_POST(self):
+        if not self.local_request():
+            return
+        if self.path != '/extract':
+            self.send_json(404, {'error': f"unknown path {self.path}"})
+            return
+        if self.headers.get_content_type() != 'application/json':
+            self.send_json(415, {'error': "request body must be sent as application/json"})
+            return
+
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            job = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            self.send_json(400, {'error': "request body must be a JSON object"})
+            return
+
+        service = self.server.service
+        if not isinstance(job, dict):
+            self.send_json(400, {'error': "request body must be a JSON object"})
+            return
+        path = job.get('file')
+        rules = job.get('rules') or DEFAULT_RULES[service.backend_name]
+        if not isinstance(path, str) or not isinstance(rules, str):
+            self.send_json(400, {'error': "file and rules must be strings"})
+            return
+        if not path or not (service.replay or os.path.exists(path)):
+            self.send_json(400, {'error': f"file not found: {path!r}"})
+            return
+        if rules not in RULES:
+            self.send_json(400, {'error': f"unknown rules {rules!r}, expected one of {', '.join(RULES)}"})
+            return
+
+        records = queue.Queue(maxsize=DAEMON_QUEUE_PAGES)
+        cancelled = threading.Event()
+
+        def emit(record):
+            # Blocks while the client is slow, and gives up once it has gone away
+            while True:
+                try:
+                    records.put(record, timeout=PUT_POLL_SECONDS)
+                    return
+                except queue.Full:
+                    if cancelled.is_set():
+                        raise JobCancelled()
+
+        service.submit(path, rules, bool(job.get('content')), emit)
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        try:
+            while True:
+                record = records.get()
+                data = (json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8')
+                self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+                if record['type'] != 'page':
+                    break
+            self.wfile.write(b'0\r\n\r\n')
+        except OSError:
+            logger.warning(f"Client went away while extracting {path}")
+            cancelled.set()
+            self.close_connection = True
+
+
+def iter_daemon_records(path, host='127.0.0.1', port=DEFAULT_PORT, rules=None, content=False):
+    """Ask a running daemon to extract path and yield its records as they arrive"""
+    import http.client
+
+    job = {'file': str(path), 'content': content}
+    if rules:
+        job['rules'] = rules
+    connection = http.client.HTTPConnection(host, port)
+    try:
+        connection.request('POST', '/extract', json.dumps(job),
+                           {'Content-Type': 'application/json'})
+        response = connection.getresponse()
+        if response.status != 200:
+            raise RuntimeError(f"Daemon error {response.status}: {response.read().decode('utf-8')}")
+        for line in response:
+            yield json.loads(line)
+    finally:
+        connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve OneNote extraction requests on localhost")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--backend', choices=tuple(DEFAULT_RULES), default='com',
+                        help="how files are read (default: com)")
+    parser.add_argument('--jobs', type=int, default=2,
+                        help="extractions served at once, each with its own backend session (default: 2)")
+    parser.add_argument('--cache', metavar='PATH',
+                        help="SQLite page cache shared by all jobs")
+    parser.add_argument('--cache-size', type=int, default=512, metavar='MB')
+    parser.add_argument('--replay', metavar='DIR',
+                        help="serve recorded hierarchy/page XML from DIR instead of OneNote")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    with instrumented(args):
+        service = ExtractionService(args.backend, args.jobs, args.cache,
+                                    args.cache_size * 1024 * 1024, args.replay)
+        # Bound to loopback only: requests name arbitrary local files
+        server = ThreadingHTTPServer(('127.0.0.1', args.port), ExtractionHandler)
+        server.daemon_threads = True
+        server.service = service
+        logger.info(f"Serving extraction requests on http://127.0.0.1:{args.port} "
+                    f"({args.backend} backend, {args.jobs} jobs)")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            logger.info("Shutting down")
+        finally:
+            server.server_close()
+            service.close()
+
+if __name__ == "__main__":
+    main()
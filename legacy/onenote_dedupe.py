@@ -0,0 +1,195 @@
+"""
+Near-duplicate detection for extracted business entries
+
+Copied-forward meeting notes and templated pages repeat the same entry with
+small edits. dedupe_entries merges entries whose raw_content is similar
+enough, keeping the first one and recording every page the merged entries
+came from.
+
+Each entry gets a MinHash signature over word shingles of its normalized
+raw_content. Signatures are split into bands for an LSH index, so an entry
+is only compared with earlier entries that share a band, and buckets are
+capped, which keeps the work per entry bounded. Candidates are confirmed by
+the share of equal signature values (an estimate of Jaccard similarity).
+
+Memory is bounded: the index holds at most max_index representatives and
+forgets the oldest first, while representatives and their sources are
+spilled to a temporary SQLite file and read back in order at the end.
+"""
+
+import hashlib
+import json
+import os
+import re
+from array import array
+from collections import deque
+
+from onenote_writers import ENTRY_COLUMNS
+
+NUM_PERM = 64
+BANDS = 8
+SHINGLE_WORDS = 3
+DEFAULT_THRESHOLD = 0.8
+DEFAULT_MAX_INDEX = 100_000
+BUCKET_LIMIT = 8
+
+# Columns dedupe_entries adds to every entry it yields
+DEDUPE_FIELDS = ['duplicates', 'sources']
+DEDUPE_COLUMNS = ENTRY_COLUMNS + DEDUPE_FIELDS
+PROVENANCE_KEYS = ('source_file', 'source_notebook', 'source_section', 'source_page')
+
+WORDS = re.compile(r'\w+')
+
+SCHEMA = """
+CREATE TABLE representatives (id INTEGER PRIMARY KEY, entry TEXT NOT NULL);
+CREATE TABLE sources (
+    rep_id INTEGER NOT NULL,
+    source TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (rep_id, source)
+);
+"""
+
+
+def shingles(text):
+    """Every SHINGLE_WORDS-word window of the lowercased text, as bytes"""
+    words = WORDS.findall(text.lower())
+    if len(words) <= SHINGLE_WORDS:
+        return {' '.join(words).encode('utf-8')}
+    return {
+        ' '.join(words[i:i + SHINGLE_WORDS]).encode('utf-8')
+        for i in range(len(words) - SHINGLE_WORDS + 1)
+    }
+
+
+def minhash(shingle_set):
+    """MinHash signature of a set of shingles, as NUM_PERM 32-bit values.
+
+    One SHAKE-128 digest per shingle stands in for NUM_PERM independent
+    hash functions, so the minimum of each value is taken in C instead of
+    hashing every shingle NUM_PERM times in Python.
+    """
+    return array('I', map(min, zip(*(
+        array('I', hashlib.shake_128(shingle).digest(NUM_PERM * 4)) for shingle in shingle_set
+    ))))
+
+
+def similarity(signature, other):
+    """Share of equal signature values, an estimate of the Jaccard similarity"""
+    return sum(x == y for x, y in zip(signature, other)) / len(signature)
+
+
+def provenance(entry):
+    return ' / '.join(str(entry[key]) for key in PROVENANCE_KEYS if entry.get(key))
+
+
+class LshIndex:
+    """Banded MinHash index over at most max_size representatives, oldest forgotten first"""
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD, max_size=DEFAULT_MAX_INDEX,
+                 bands=BANDS, bucket_limit=BUCKET_LIMIT):
+        self.threshold = threshold
+        self.max_size = max_size
+        self.rows = NUM_PERM // bands
+        self.buckets = [{} for _ in range(bands)]
+        self.bucket_limit = bucket_limit
+        self.signatures = {}
+        self.exact = {}
+        self.digests = {}
+        self.order = deque()
+
+    def _band_keys(self, signature):
+        rows = self.rows
+        return [hash(tuple(signature[i * rows:(i + 1) * rows])) for i in range(len(self.buckets))]
+
+    def find(self, signature):
+        """Id of an indexed representative similar enough to signature, or None"""
+        checked = set()
+        for bucket, key in zip(self.buckets, self._band_keys(signature)):
+            for candidate in bucket.get(key, ()):
+                if candidate in checked:
+                    continue
+                checked.add(candidate)
+                if similarity(signature, self.signatures[candidate]) >= self.threshold:
+                    return candidate
+        return None
+
+    def add(self, rep_id, digest, signature):
+        self.signatures[rep_id] = signature
+        self.exact[digest] = rep_id
+        self.digests[rep_id] = digest
+        for bucket, key in zip(self.buckets, self._band_keys(signature)):
+            members = bucket.setdefault(key, [])
+            if len(members) < self.bucket_limit:
+                members.append(rep_id)
+        self.order.append(rep_id)
+
+        while len(self.order) > self.max_size:
+            self._forget(self.order.popleft())
+
+    def _forget(self, rep_id):
+        signature = self.signatures.pop(rep_id)
+        del self.exact[self.digests.pop(rep_id)]
+        for bucket, key in zip(self.buckets, self._band_keys(signature)):
+            members = bucket.get(key)
+            if members and rep_id in members:
+                members.remove(rep_id)
+                if not members:
+                    del bucket[key]
+
+
+def dedupe_entries(entries, threshold=DEFAULT_THRESHOLD, max_index=DEFAULT_MAX_INDEX, stats=None):
+    """Merge near-duplicate entries, yielding the first of each group in order.
+
+    Every yielded entry gains ``duplicates`` (how many entries were merged
+    into it) and ``sources`` (each distinct source of the group, separated
+    by ``; ``). The entries are consumed completely before the first one is
+    yielded. ``stats`` (a Counter) counts the duplicates removed.
+    """
+    import sqlite3
+    import tempfile
+
+    index = LshIndex(threshold, max_index)
+    handle, path = tempfile.mkstemp(suffix='.sqlite')
+    os.close(handle)
+    db = sqlite3.connect(path)
+    try:
+        db.executescript(SCHEMA)
+        add_source = (
+            'INSERT INTO sources VALUES (?, ?, 1) '
+            'ON CONFLICT (rep_id, source) DO UPDATE SET count = count + 1'
+        )
+
+        next_id = 0
+        for entry in entries:
+            text = ' '.join(WORDS.findall(entry.get('raw_content', '').lower()))
+            digest = hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+            rep_id = index.exact.get(digest)
+            signature = None
+            if rep_id is None:
+                signature = minhash(shingles(text))
+                rep_id = index.find(signature)
+
+            if rep_id is None:
+                rep_id = next_id
+                next_id += 1
+                db.execute('INSERT INTO representatives VALUES (?, ?)',
+                           (rep_id, json.dumps(dict(entry), ensure_ascii=False)))
+                index.add(rep_id, digest, signature)
+            elif stats is not None:
+                stats['duplicates'] += 1
+            db.execute(add_source, (rep_id, provenance(entry)))
+
+        rows = db.execute(
+            'SELECT r.entry, SUM(s.count), GROUP_CONCAT(s.source, \'; \') '
+            'FROM representatives r JOIN sources s ON s.rep_id = r.id '
+            'GROUP BY r.id ORDER BY r.id'
+        )
+        for entry_json, count, sources in rows:
+            entry = json.loads(entry_json)
+            entry['duplicates'] = count - 1
+            entry['sources'] = sources
+            yield entry
+    finally:
+        db.close()
+        os.remove(path)
@@ -3,312 +3,246 @@ OneNote to Excel Converter using COM automation
 This script extracts data from OneNote files and converts to Excel
 """
 
+import argparse
+import logging
 import os
 import sys
-import json
-import re
-from pathlib import Path
-import win32com.client
-import pandas as pd
+from collections import Counter
+from itertools import chain
 from datetime import datetime
+from onenote_parsing import com_scanner as entity_scanner, com_extractor as entry_extractor, iter_business_entries, rule_pack
+from onenote_rules import BUILTIN_PACKS, RulePackError
+from onenote_parsing import extract_text_from_page_xml
+from onenote_writers import ENTRY_COLUMNS, WRITERS, write_outputs
+from onenote_dedupe import DEDUPE_COLUMNS, DEFAULT_THRESHOLD, dedupe_entries
+from onenote_normalize import NORMALIZED_FIELDS, normalize_entries
+from onenote_backends import ComBackend, ReplayBackend, RecordingOneNote
+from onenote_metrics import add_arguments, instrumented
 
-def extract_onenote_data(onenote_file):
-    """Extract data from OneNote file using COM automation"""
+logger = logging.getLogger(__name__)
+
+def iter_onenote_data(onenote_file, backend=None, cache=None, fetchers=1, snapshot=None):
+    """Yield page records from a OneNote file using COM automation, one at a time
+    
+    backend defaults to a ComBackend on a live OneNote.Application; pass a
+    ReplayBackend to run against recorded XML. With a PageCache, unchanged
+    pages come from the cache together with their parsed entries. With
+    fetchers > 1, that many threads fetch pages ahead of the parser. With a
+    HierarchySnapshot only pages added or changed since it was saved are
+    yielded.
+    """
+    if backend is None:
+        backend = ComBackend()
     try:
-        # Create OneNote application
-        one_note = win32com.client.Dispatch("OneNote.Application")
-        
-        # Get hierarchy of all notebooks
-        hierarchy_xml = one_note.GetHierarchy("", 1)  # 1 = hsNotebooks
-        
-        print(f"OneNote hierarchy retrieved successfully")
-        
-        # Since .one files are individual notebook files, we need to open the specific file
-        # Try to find or open the notebook
-        notebook_id = None
-        
-        # Parse the XML to find notebooks
-        import xml.etree.ElementTree as ET
-        root = ET.fromstring(hierarchy_xml)
-        
-        # Look for the notebook by filename
-        onenote_filename = Path(onenote_file).stem
-        
-        # Get all pages content
-        all_pages_content = []
-        
-        # For each notebook
-        for notebook in root.findall('.//{http://schemas.microsoft.com/office/onenote/2013/onenote}Notebook'):
-            notebook_name = notebook.get('name', '')
-            notebook_id = notebook.get('ID', '')
-            
-            print(f"Found notebook: {notebook_name} (ID: {notebook_id})")
-            
-            # Get sections
-            for section in notebook.findall('.//{http://schemas.microsoft.com/office/onenote/2013/onenote}Section'):
-                section_name = section.get('name', '')
-                section_id = section.get('ID', '')
-                
-                print(f"  Section: {section_name}")
-                
-                # Get pages in this section
-                for page in section.findall('.//{http://schemas.microsoft.com/office/onenote/2013/onenote}Page'):
-                    page_name = page.get('name', '')
-                    page_id = page.get('ID', '')
-                    
-                    print(f"    Page: {page_name}")
-                    
-                    try:
-                        # Get page content
-                        page_xml = one_note.GetPageContent(page_id)
-                        content = extract_text_from_page_xml(page_xml)
-                        
-                        if content.strip():
-                            all_pages_content.append({
-                                'notebook': notebook_name,
-                                'section': section_name,
-                                'page': page_name,
-                                'content': content,
-                                'page_id': page_id
-                            })
-                            
-                    except Exception as e:
-                        print(f"      Error extracting page content: {e}")
-        
-        if not all_pages_content:
+        # Pages are yielded as soon as their content is extracted
+        found_content = False
+        for page_data in backend.iter_pages(cache, fetchers, snapshot=snapshot):
+            found_content = True
+            yield page_data
+        
+        # Nothing changed since the snapshot is not the same as finding no pages
+        if not found_content and not (snapshot is not None and snapshot.pages):
             # Try alternative approach - open the .one file directly
-            print(f"No content found in open notebooks, trying to open {onenote_file} directly...")
+            logger.info(f"No content found in open notebooks, trying to open {onenote_file} directly...")
             
             try:
-                # Try to open the .one file
-                one_note.OpenHierarchy(onenote_file, "", "", 0)
-                
-                # Get updated hierarchy
-                hierarchy_xml = one_note.GetHierarchy("", 1)
-                root = ET.fromstring(hierarchy_xml)
-                
-                # Try again to extract content
-                for notebook in root.findall('.//{http://schemas.microsoft.com/office/onenote/2013/onenote}Notebook'):
-                    notebook_name = notebook.get('name', '')
-                    
-                    for section in notebook.findall('.//{http://schemas.microsoft.com/office/onenote/2013/onenote}Section'):
-                        section_name = section.get('name', '')
-                        
-                        for page in section.findall('.//{http://schemas.microsoft.com/office/onenote/2013/onenote}Page'):
-                            page_name = page.get('name', '')
-                            page_id = page.get('ID', '')
-                            
-                            try:
-                                page_xml = one_note.GetPageContent(page_id)
-                                content = extract_text_from_page_xml(page_xml)
-                                
-                                if content.strip():
-                                    all_pages_content.append({
-                                        'notebook': notebook_name,
-                                        'section': section_name,
-                                        'page': page_name,
-                                        'content': content,
-                                        'page_id': page_id
-                                    })
-                                    
-                            except Exception as e:
-                                print(f"Error extracting page content: {e}")
-                                
+                # Only the opened notebook or section is walked again, when OneNote gives its ID
+                yield from backend.iter_file_pages(onenote_file, cache, fetchers, snapshot)
             except Exception as e:
-                print(f"Error opening OneNote file: {e}")
-        
-        return all_pages_content
+                logger.error(f"Error opening OneNote file: {e}")
+                backend.stats['unfinished_runs'] += 1
         
     except Exception as e:
-        print(f"Error in OneNote extraction: {e}")
-        return []
+        logger.error(f"Error in OneNote extraction: {e}")
+        backend.stats['unfinished_runs'] += 1
 
-def extract_text_from_page_xml(page_xml):
-    """Extract plain text from OneNote page XML"""
-    try:
-        import xml.etree.ElementTree as ET
-        root = ET.fromstring(page_xml)
-        
-        # Find all text elements
-        text_elements = []
-        
-        # Look for T elements (text) in the OneNote namespace
-        for text_elem in root.findall('.//{http://schemas.microsoft.com/office/onenote/2013/onenote}T'):
-            if text_elem.text:
-                text_elements.append(text_elem.text.strip())
-        
-        # Also look for other text containers
-        for outline in root.findall('.//{http://schemas.microsoft.com/office/onenote/2013/onenote}Outline'):
-            for oe in outline.findall('.//{http://schemas.microsoft.com/office/onenote/2013/onenote}OE'):
-                for t in oe.findall('.//{http://schemas.microsoft.com/office/onenote/2013/onenote}T'):
-                    if t.text:
-                        text_elements.append(t.text.strip())
-        
-        return '\n'.join(text_elements)
-        
-    except Exception as e:
-        print(f"Error parsing page XML: {e}")
-        return ""
+def extract_onenote_data(onenote_file):
+    """Extract data from OneNote file using COM automation"""
+    return list(iter_onenote_data(onenote_file))
 
-def parse_business_entries(content_list):
+def parse_business_entries(content_list, workers=1):
     """Parse extracted content into business entries"""
-    business_entries = []
-    
-    for page_data in content_list:
-        content = page_data['content']
-        if not content.strip():
-            continue
-            
-        # Split content into potential business entries
-        entries = chunk_by_business_entities(content)
-        
-        for entry in entries:
-            if is_valid_business_entry(entry):
-                metadata = extract_business_metadata(entry)
-                
-                business_entry = {
-                    'source_notebook': page_data['notebook'],
-                    'source_section': page_data['section'], 
-                    'source_page': page_data['page'],
-                    'raw_content': entry,
-                    **metadata
-                }
-                
-                business_entries.append(business_entry)
-    
-    return business_entries
+    return list(iter_business_entries(content_list, entity_scanner, entry_extractor, workers=workers))
 
 def chunk_by_business_entities(content):
     """Chunk content based on business entity markers"""
-    chunks = []
-    
-    lines = content.split('\n')
-    entity_markers = [
-        r'(?:underwriter|broker|agent):\s*([A-Za-z\s&,.\'-]+)',
-        r'(?:company|business|client|account):\s*([A-Za-z\s&,.\'-]+)', 
-        r'^([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)\s*(?:LLC|INC|CORP|COMPANY|GROUP)',
-    ]
-    
-    current_chunk = ''
-    found_entity = False
-    
-    for line in lines:
-        line = line.strip()
-        if not line:
-            continue
-            
-        # Check if this line starts a new business entity
-        for pattern in entity_markers:
-            if re.search(pattern, line, re.IGNORECASE):
-                # Save current chunk if it has content
-                if current_chunk.strip() and found_entity:
-                    chunks.append(current_chunk.strip())
-                    current_chunk = ''
-                found_entity = True
-                break
-        
-        current_chunk += line + '\n'
-        
-        # If chunk gets too long without entity, split it
-        if len(current_chunk) > 1000 and not found_entity:
-            chunks.append(current_chunk.strip())
-            current_chunk = ''
-    
-    # Add final chunk
-    if current_chunk.strip():
-        chunks.append(current_chunk.strip())
-    
-    return [chunk for chunk in chunks if len(chunk.strip()) > 50]
+    return entity_scanner.chunk(content)
 
 def is_valid_business_entry(chunk):
     """Check if chunk is a valid business entry"""
-    lower_chunk = chunk.lower()
-    
-    # Must have underwriter (and not N/A)
-    has_underwriter = 'underwriter' in lower_chunk and 'n/a' not in lower_chunk
-    
-    # Or have broker/company AND date
-    has_broker = 'broker' in lower_chunk and 'n/a' not in lower_chunk
-    has_company = bool(re.search(r'(?:company|business|client|account):\s*[a-z]', chunk, re.IGNORECASE))
-    has_date = bool(re.search(r'\d{1,2}[/-]\d{1,2}[/-]\d{2,4}', chunk))
-    
-    return has_underwriter or ((has_broker or has_company) and has_date)
+    return entry_extractor.analyze(chunk)[0]
 
 def extract_business_metadata(chunk):
     """Extract business metadata from chunk"""
-    metadata = {}
-    
-    # Extract underwriter
-    underwriter_match = re.search(r'underwriter:\s*([A-Za-z\s&,.\'-]+)', chunk, re.IGNORECASE)
-    if underwriter_match:
-        metadata['underwriter'] = underwriter_match.group(1).strip()
-    
-    # Extract company  
-    company_match = re.search(r'(?:company|business|client|account):\s*([A-Za-z\s&,.\'-]+)', chunk, re.IGNORECASE)
-    if company_match:
-        metadata['company'] = company_match.group(1).strip()
-    
-    # Extract broker
-    broker_match = re.search(r'broker:\s*([A-Za-z\s&,.\'-]+)', chunk, re.IGNORECASE)
-    if broker_match:
-        metadata['broker'] = broker_match.group(1).strip()
-    
-    # Extract dates
-    dates = re.findall(r'\d{1,2}[/-]\d{1,2}[/-]\d{2,4}', chunk)
-    if dates:
-        metadata['dates'] = ', '.join(dates)
-        metadata['primary_date'] = dates[0]
-    
-    # Extract money amounts
-    amounts = re.findall(r'\$[\d,]+(?:\.\d{2})?', chunk)
-    if amounts:
-        metadata['amounts'] = ', '.join(amounts)
-    
-    return metadata
+    return entry_extractor.metadata(chunk)
 
 def main():
-    if len(sys.argv) != 2:
-        print("Usage: python onenote_extractor.py <onenote_file>")
-        sys.exit(1)
-    
-    onenote_file = sys.argv[1]
+    parser = argparse.ArgumentParser(description="Extract business entries from a OneNote file")
+    parser.add_argument('onenote_file')
+    parser.add_argument('--workers', type=int, default=1,
+                        help="parse pages in N worker processes (default: 1)")
+    parser.add_argument('--rules', default='com', metavar='PACK',
+                        help=f"rule pack to parse with: {', '.join(BUILTIN_PACKS)} or a JSON/YAML file "
+                             "(default: com)")
+    parser.add_argument('--formats', default='xlsx,json',
+                        help=f"comma-separated outputs from {', '.join(WRITERS)} (default: xlsx,json); "
+                             "with parquet, xlsx is converted from it at the end")
+    parser.add_argument('--fetchers', type=int, default=1,
+                        help="fetch pages from OneNote in N threads ahead of parsing (default: 1)")
+    parser.add_argument('--offline', action='store_true',
+                        help="read .one files directly instead of through OneNote")
+    parser.add_argument('--cache', metavar='PATH',
+                        help="SQLite page cache; unchanged pages are not fetched or parsed again")
+    parser.add_argument('--cache-size', type=int, default=512, metavar='MB',
+                        help="evict least recently used pages above this size (default: 512)")
+    parser.add_argument('--replay', metavar='DIR',
+                        help="serve recorded hierarchy/page XML from DIR instead of OneNote")
+    parser.add_argument('--record', metavar='DIR',
+                        help="record the XML OneNote returns into DIR for --replay")
+    parser.add_argument('--dedupe', type=float, nargs='?', const=DEFAULT_THRESHOLD, metavar='SIMILARITY',
+                        help="merge near-duplicate entries, keeping every source page "
+                             f"(default similarity: {DEFAULT_THRESHOLD})")
+    parser.add_argument('--normalize', action='store_true',
+                        help="add typed date, amount and normalized name columns (needs pyarrow)")
+    parser.add_argument('--snapshot', metavar='PATH',
+                        help="SQLite hierarchy snapshot; extract only pages added or changed since "
+                             "the last run, with a tombstone entry per deleted page")
+    parser.add_argument('--index', metavar='PATH',
+                        help="keep a full-text and field index of the entries in this SQLite file, "
+                             "updated for changed pages only (query it with onenote_index.py)")
+    add_arguments(parser)
+    args = parser.parse_args()
+    
+    formats = [name.strip() for name in args.formats.split(',') if name.strip()]
+    unknown = [name for name in formats if name not in WRITERS]
+    if unknown or not formats:
+        parser.error(f"unknown output format: {', '.join(unknown) or repr(args.formats)}")
+    try:
+        rule_pack(args.rules)
+    except (OSError, RulePackError) as e:
+        parser.error(f"--rules: {e}")
+    if args.snapshot and args.offline:
+        parser.error("--snapshot diffs the hierarchy OneNote reports, it can't be used with --offline")
+    
+    with instrumented(args):
+        extract(args, formats)
+
+def extract(args, formats):
+    """Run one extraction from main's parsed arguments"""
+    onenote_file = args.onenote_file
     
     if not os.path.exists(onenote_file):
         print(f"Error: OneNote file not found: {onenote_file}")
         sys.exit(1)
     
     print(f"Extracting data from OneNote file: {onenote_file}")
-    
-    # Extract OneNote content
-    content_list = extract_onenote_data(onenote_file)
-    
-    if not content_list:
+    entity_scanner, entry_extractor = rule_pack(args.rules)
+    
+    # Pages flow through chunking, validation and metadata straight to disk
+    output_stem = f"onenote_extracted_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    
+    cache = None
+    if args.cache:
+        from onenote_cache import PageCache
+        cache = PageCache(args.cache, args.cache_size * 1024 * 1024, entry_extractor.rules_id)
+    
+    backend = None
+    if args.replay:
+        backend = ReplayBackend(args.replay)
+    elif args.record:
+        import win32com.client
+        backend = ComBackend(RecordingOneNote(win32com.client.Dispatch("OneNote.Application"), args.record))
+    
+    snapshot = None
+    if args.snapshot:
+        from onenote_snapshot import CHANGE_FIELDS, HierarchySnapshot
+        snapshot = HierarchySnapshot(args.snapshot)
+    
+    page_stats = Counter()
+    if args.offline:
+        from onenote_onestore import iter_offline_pages
+        pages = iter_offline_pages(onenote_file)
+    else:
+        # Kept here to tell whether the run left pages out
+        backend = backend or ComBackend()
+        pages = iter_onenote_data(onenote_file, backend, cache, args.fetchers, snapshot)
+    index = None
+    if args.index:
+        from onenote_index import EntryIndex
+        index = EntryIndex(args.index)
+        pages = index.track_pages(pages, page_stats)
+    entries = iter_business_entries(
+        pages, entity_scanner, entry_extractor, page_stats, workers=args.workers, cache=cache
+    )
+    if index is not None:
+        entries = index.index_entries(entries)
+    if snapshot is not None:
+        entries = snapshot.label(entries)
+    columns = ENTRY_COLUMNS
+    if args.dedupe:
+        entries = dedupe_entries(entries, args.dedupe, stats=page_stats)
+        columns = DEDUPE_COLUMNS
+    if args.normalize:
+        entries = normalize_entries(entries)
+        columns = columns + NORMALIZED_FIELDS
+    if snapshot is not None:
+        # Emptied and deleted pages are known once all pages went by; a page
+        # whose entries dedupe merged into other pages' counts as emptied
+        entries = chain(snapshot.kept(entries), snapshot.cleared(), snapshot.tombstones())
+        columns = columns + CHANGE_FIELDS
+    try:
+        entry_stats, output_paths = write_outputs(entries, formats, output_stem, columns)
+        if snapshot is not None:
+            if index is not None:
+                page_stats['pruned_pages'] = index.remove_pages(page_id for page_id, *_ in snapshot.deleted)
+            snapshot.save()
+        # Pages a failed fetch or an aborted walk left out are not gone from the notebook
+        elif index is not None and not (backend and backend.incomplete()):
+            page_stats['pruned_pages'] = index.prune()
+    except BaseException:
+        # Pages committed so far are complete; drop the ones stored since
+        if index is not None:
+            index.rollback()
+        raise
+    finally:
+        if cache is not None:
+            cache.close()
+        if index is not None:
+            index.close()
+        if snapshot is not None:
+            snapshot.close()
+    
+    # With a snapshot, a run where nothing changed has no pages to extract
+    if not page_stats['pages'] and not (snapshot is not None and snapshot.pages):
         print("No content extracted from OneNote file")
         sys.exit(1)
     
-    print(f"Extracted content from {len(content_list)} pages")
-    
-    # Parse into business entries
-    business_entries = parse_business_entries(content_list)
-    
-    print(f"Found {len(business_entries)} valid business entries")
-    
-    if business_entries:
-        # Create DataFrame and save to Excel
-        df = pd.DataFrame(business_entries)
-        
-        # Save to Excel with timestamp
-        output_file = f"onenote_extracted_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-        df.to_excel(output_file, index=False)
-        
-        print(f"Results saved to: {output_file}")
-        
-        # Also save as JSON for debugging
-        json_file = output_file.replace('.xlsx', '.json')
-        with open(json_file, 'w', encoding='utf-8') as f:
-            json.dump(business_entries, f, indent=2, ensure_ascii=False)
-        
-        print(f"Debug data saved to: {json_file}")
+    if snapshot is not None:
+        added = sum(1 for change in snapshot.changes.values() if change == 'added')
+        print(f"Hierarchy has {snapshot.pages} pages: {added} added, {len(snapshot.changes) - added} "
+              f"changed and {len(snapshot.deleted)} deleted since the last snapshot")
+    print(f"Extracted content from {page_stats['pages']} pages")
+    if cache is not None:
+        print(f"Served {page_stats['cached_pages']} unchanged pages from {args.cache}")
+    if index is not None:
+        print(f"Indexed {page_stats['indexed_pages']} changed pages into {args.index}, "
+              f"dropped {page_stats['pruned_pages']} removed pages")
+    tombstones = len(snapshot.deleted) if snapshot is not None else 0
+    cleared = snapshot.cleared_pages if snapshot is not None else 0
+    print(f"Found {entry_stats['entries'] - tombstones - cleared} valid business entries")
+    if args.dedupe:
+        print(f"Merged {page_stats['duplicates']} near-duplicate entries")
+    if cleared:
+        print(f"Marked {cleared} changed pages that have no entries left with an empty entry")
+    if tombstones:
+        print(f"Marked {tombstones} deleted pages with tombstone entries")
+    
+    if entry_stats['entries']:
+        for name, path in output_paths.items():
+            if name == 'json':
+                print(f"Debug data saved to: {path}")
+            else:
+                print(f"Results saved to: {path}")
     else:
         print("No valid business entries found")
 
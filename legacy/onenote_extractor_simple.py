@@ -2,320 +2,175 @@
 Simple OneNote extractor using direct PowerShell automation
 """
 
-import subprocess
-import json
-import re
-import pandas as pd
+import argparse
+from collections import Counter
 from datetime import datetime
 import sys
 import os
 
+from onenote_parsing import powershell_scanner as entity_scanner, powershell_extractor as entry_extractor, iter_business_entries, rule_pack
+from onenote_rules import BUILTIN_PACKS, RulePackError
+from onenote_writers import ENTRY_COLUMNS, WRITERS, write_outputs
+from onenote_dedupe import DEDUPE_COLUMNS, DEFAULT_THRESHOLD, dedupe_entries
+from onenote_normalize import NORMALIZED_FIELDS, normalize_entries
+from onenote_backends import PowerShellBackend, ReplayBackend
+from onenote_metrics import add_arguments, instrumented
+
 def extract_onenote_using_powershell(onenote_file):
     """Extract OneNote content using PowerShell COM automation"""
-    
-    powershell_script = f'''
-try {{
-    # Create OneNote Application
-    $oneNote = New-Object -ComObject OneNote.Application
-    
-    # Get the absolute path
-    $filePath = (Resolve-Path "{onenote_file}").Path
-    Write-Host "Processing OneNote file: $filePath"
-    
-    # Try to open the file first
-    try {{
-        $oneNote.OpenHierarchy($filePath, "", "", 0)
-        Write-Host "OneNote file opened successfully"
-        Start-Sleep -Seconds 2
-    }} catch {{
-        Write-Host "Warning: Could not open file directly: $($_.Exception.Message)"
-    }}
-    
-    # Get notebook hierarchy  
-    $notebookXml = ""
-    $oneNote.GetHierarchy("", 1, [ref]$notebookXml)
-    
-    # Parse XML and extract content
-    [xml]$xml = $notebookXml
-    $results = @()
-    
-    foreach ($notebook in $xml.Notebooks.Notebook) {{
-        $notebookName = $notebook.name
-        Write-Host "Found notebook: $notebookName"
-        
-        foreach ($section in $notebook.Section) {{
-            $sectionName = $section.name
-            Write-Host "  Section: $sectionName"
-            
-            foreach ($page in $section.Page) {{
-                $pageName = $page.name
-                $pageId = $page.ID
-                Write-Host "    Page: $pageName"
-                
-                try {{
-                    # Get page content
-                    $pageXml = ""
-                    $oneNote.GetPageContent($pageId, [ref]$pageXml)
-                    
-                    # Extract text from XML
-                    [xml]$pageContent = $pageXml
-                    $textElements = $pageContent.SelectNodes("//*[local-name()='T']")
-                    
-                    $allText = @()
-                    foreach ($textElement in $textElements) {{
-                        if ($textElement.InnerText -and $textElement.InnerText.Trim()) {{
-                            $allText += $textElement.InnerText.Trim()
-                        }}
-                    }}
-                    
-                    $content = $allText -join "`n"
-                    
-                    if ($content.Trim()) {{
-                        $result = @{{
-                            notebook = $notebookName
-                            section = $sectionName  
-                            page = $pageName
-                            content = $content
-                        }}
-                        $results += $result
-                        Write-Host "      Extracted $($content.Length) characters"
-                    }}
-                }} catch {{
-                    Write-Host "      Error extracting page: $($_.Exception.Message)"
-                }}
-            }}
-        }}
-    }}
-    
-    # Output results as JSON
-    Write-Host "RESULTS_START"
-    $results | ConvertTo-Json -Depth 10
-    Write-Host "RESULTS_END"
-    
-}} catch {{
-    Write-Error "Error: $($_.Exception.Message)"
-    exit 1
-}}
-'''
-    
-    try:
-        result = subprocess.run(
-            ["powershell", "-Command", powershell_script],
-            capture_output=True,
-            text=True,
-            timeout=120
-        )
-        
-        if result.returncode != 0:
-            print(f"PowerShell error: {result.stderr}")
-            return []
-        
-        output = result.stdout
-        print(f"PowerShell output: {output[:500]}...")
-        
-        # Extract JSON from output
-        if "RESULTS_START" in output and "RESULTS_END" in output:
-            start_idx = output.find("RESULTS_START") + len("RESULTS_START")
-            end_idx = output.find("RESULTS_END")
-            json_str = output[start_idx:end_idx].strip()
-            
-            if json_str:
-                try:
-                    data = json.loads(json_str)
-                    return data if isinstance(data, list) else [data]
-                except json.JSONDecodeError as e:
-                    print(f"JSON decode error: {e}")
-                    print(f"JSON string: {json_str[:200]}...")
-                    return []
-        
-        return []
-        
-    except subprocess.TimeoutExpired:
-        print("PowerShell script timed out")
-        return []
-    except Exception as e:
-        print(f"Error running PowerShell script: {e}")
-        return []
+    return list(PowerShellBackend(onenote_file).iter_pages())
 
 def chunk_by_business_entities(content):
     """Chunk content based on business entity markers"""
-    chunks = []
-    
-    lines = content.split('\\n')
-    entity_patterns = [
-        r'underwriter:?\\s*([A-Za-z\\s&,.\\'-]+)',
-        r'(?:company|business|client|account):?\\s*([A-Za-z\\s&,.\\'-]+)', 
-        r'^([A-Z][a-z]+(?:\\s+[A-Z][a-z]+)*)\\s*(?:LLC|INC|CORP|COMPANY|GROUP)',
-        r'\\b[A-Z][a-z]+\\s+[A-Z][a-z]+\\s+(?:LLC|INC|CORP|COMPANY)\\b'
-    ]
-    
-    current_chunk = ''
-    found_entity = False
-    
-    for line in lines:
-        line = line.strip()
-        if not line:
-            continue
-            
-        # Check if this line starts a new business entity
-        for pattern in entity_patterns:
-            if re.search(pattern, line, re.IGNORECASE):
-                # Save current chunk if it has content
-                if current_chunk.strip() and found_entity:
-                    chunks.append(current_chunk.strip())
-                    current_chunk = ''
-                found_entity = True
-                break
-        
-        current_chunk += line + '\\n'
-        
-        # If chunk gets too long without entity, split it
-        if len(current_chunk) > 800 and not found_entity:
-            chunks.append(current_chunk.strip())
-            current_chunk = ''
-    
-    # Add final chunk
-    if current_chunk.strip():
-        chunks.append(current_chunk.strip())
-    
-    return [chunk for chunk in chunks if len(chunk.strip()) > 30]
+    return entity_scanner.chunk(content)
 
 def is_valid_business_entry(chunk):
     """Check if chunk is a valid business entry"""
-    lower_chunk = chunk.lower()
-    
-    # Must have underwriter (and not N/A)
-    has_underwriter = ('underwriter' in lower_chunk or 'underwritten' in lower_chunk) and 'n/a' not in lower_chunk
-    
-    # Or have broker/company AND date
-    has_broker = 'broker' in lower_chunk and 'n/a' not in lower_chunk
-    has_company = bool(re.search(r'(?:company|business|client|account)[:\\s]*[a-z]', chunk, re.IGNORECASE))
-    has_date = bool(re.search(r'\\d{1,2}[/-]\\d{1,2}[/-]\\d{2,4}', chunk))
-    
-    # Also accept entries with company names ending in LLC, INC, etc
-    has_business_name = bool(re.search(r'[A-Z][a-z]+\\s+[A-Z][a-z]+\\s+(?:LLC|INC|CORP|COMPANY)', chunk))
-    
-    return has_underwriter or ((has_broker or has_company or has_business_name) and has_date)
+    return entry_extractor.analyze(chunk)[0]
 
 def extract_business_metadata(chunk):
     """Extract business metadata from chunk"""
-    metadata = {}
-    
-    # Extract underwriter
-    underwriter_patterns = [
-        r'underwriter:?\\s*([A-Za-z\\s&,.\\'-]+)',
-        r'underwritten\\s+by\\s*([A-Za-z\\s&,.\\'-]+)'
-    ]
-    
-    for pattern in underwriter_patterns:
-        match = re.search(pattern, chunk, re.IGNORECASE)
-        if match:
-            metadata['underwriter'] = match.group(1).strip()
-            break
-    
-    # Extract company  
-    company_match = re.search(r'(?:company|business|client|account):?\\s*([A-Za-z\\s&,.\\'-]+)', chunk, re.IGNORECASE)
-    if company_match:
-        metadata['company'] = company_match.group(1).strip()
-    
-    # Extract broker
-    broker_match = re.search(r'broker:?\\s*([A-Za-z\\s&,.\\'-]+)', chunk, re.IGNORECASE)
-    if broker_match:
-        metadata['broker'] = broker_match.group(1).strip()
-    
-    # Extract business names
-    business_name_match = re.search(r'([A-Z][a-z]+\\s+[A-Z][a-z]+(?:\\s+[A-Z][a-z]+)*)\\s*(?:LLC|INC|CORP|COMPANY)', chunk)
-    if business_name_match and 'company' not in metadata:
-        metadata['company'] = business_name_match.group(1).strip()
-    
-    # Extract dates
-    dates = re.findall(r'\\d{1,2}[/-]\\d{1,2}[/-]\\d{2,4}', chunk)
-    if dates:
-        metadata['dates'] = ', '.join(dates)
-        metadata['primary_date'] = dates[0]
-    
-    # Extract money amounts
-    amounts = re.findall(r'\\$[\\d,]+(?:\\.\\d{2})?', chunk)
-    if amounts:
-        metadata['amounts'] = ', '.join(amounts)
-    
-    return metadata
+    return entry_extractor.metadata(chunk)
 
 def main():
-    if len(sys.argv) != 2:
-        print("Usage: python onenote_extractor_simple.py <onenote_file>")
-        sys.exit(1)
-    
-    onenote_file = sys.argv[1]
+    parser = argparse.ArgumentParser(description="Extract business entries from a OneNote file")
+    parser.add_argument('onenote_file')
+    parser.add_argument('--workers', type=int, default=1,
+                        help="parse pages in N worker processes (default: 1)")
+    parser.add_argument('--rules', default='powershell', metavar='PACK',
+                        help=f"rule pack to parse with: {', '.join(BUILTIN_PACKS)} or a JSON/YAML file "
+                             "(default: powershell)")
+    parser.add_argument('--formats', default='xlsx,json',
+                        help=f"comma-separated outputs from {', '.join(WRITERS)} (default: xlsx,json); "
+                             "with parquet, xlsx is converted from it at the end")
+    parser.add_argument('--offline', action='store_true',
+                        help="read .one files directly instead of through OneNote")
+    parser.add_argument('--replay', metavar='DIR',
+                        help="serve recorded hierarchy/page XML from DIR instead of OneNote")
+    parser.add_argument('--dedupe', type=float, nargs='?', const=DEFAULT_THRESHOLD, metavar='SIMILARITY',
+                        help="merge near-duplicate entries, keeping every source page "
+                             f"(default similarity: {DEFAULT_THRESHOLD})")
+    parser.add_argument('--normalize', action='store_true',
+                        help="add typed date, amount and normalized name columns (needs pyarrow)")
+    parser.add_argument('--page-timeout', type=float, metavar='SECONDS',
+                        help="fetch pages one PowerShell process each and skip a page that takes longer")
+    parser.add_argument('--deadline', type=float, metavar='SECONDS',
+                        help="stop fetching after SECONDS and write out the pages fetched so far")
+    parser.add_argument('--fetchers', type=int, default=4,
+                        help="pages fetched at once with --page-timeout or --deadline (default: 4)")
+    parser.add_argument('--index', metavar='PATH',
+                        help="keep a full-text and field index of the entries in this SQLite file, "
+                             "updated for changed pages only (query it with onenote_index.py)")
+    add_arguments(parser)
+    args = parser.parse_args()
+    
+    formats = [name.strip() for name in args.formats.split(',') if name.strip()]
+    unknown = [name for name in formats if name not in WRITERS]
+    if unknown or not formats:
+        parser.error(f"unknown output format: {', '.join(unknown) or repr(args.formats)}")
+    try:
+        rule_pack(args.rules)
+    except (OSError, RulePackError) as e:
+        parser.error(f"--rules: {e}")
+    if args.offline and (args.page_timeout or args.deadline):
+        parser.error("--page-timeout and --deadline apply to fetching through OneNote, not --offline")
+    
+    with instrumented(args):
+        extract(args, formats)
+
+def extract(args, formats):
+    """Run one extraction from main's parsed arguments"""
+    onenote_file = args.onenote_file
     
     if not os.path.exists(onenote_file):
         print(f"Error: OneNote file not found: {onenote_file}")
         sys.exit(1)
     
     print(f"Extracting data from OneNote file: {onenote_file}")
-    
-    # Extract OneNote content
-    content_list = extract_onenote_using_powershell(onenote_file)
-    
-    if not content_list:
+    entity_scanner, entry_extractor = rule_pack(args.rules)
+    
+    # Pages are parsed while PowerShell is still extracting later ones
+    extractor = None
+    backend = None
+    if args.offline:
+        from onenote_onestore import iter_offline_pages
+        pages = iter_offline_pages(onenote_file)
+    else:
+        backend = ReplayBackend(args.replay) if args.replay else PowerShellBackend(onenote_file)
+        if args.page_timeout or args.deadline:
+            from onenote_async import AsyncExtractor
+            extractor = AsyncExtractor(backend, args.fetchers, args.page_timeout, args.deadline)
+            pages = extractor.iter_pages()
+        else:
+            pages = backend.iter_pages()
+    
+    output_stem = f"onenote_extracted_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    
+    page_stats = Counter()
+    index = None
+    if args.index:
+        from onenote_index import EntryIndex
+        index = EntryIndex(args.index)
+        pages = index.track_pages(pages, page_stats)
+    entries = iter_business_entries(
+        pages, entity_scanner, entry_extractor, page_stats, workers=args.workers
+    )
+    if index is not None:
+        entries = index.index_entries(entries)
+    columns = ENTRY_COLUMNS
+    if args.dedupe:
+        entries = dedupe_entries(entries, args.dedupe, stats=page_stats)
+        columns = DEDUPE_COLUMNS
+    if args.normalize:
+        entries = normalize_entries(entries)
+        columns = columns + NORMALIZED_FIELDS
+    try:
+        stats, output_paths = write_outputs(entries, formats, output_stem, columns)
+        # Pages skipped by a partial run are not gone from the notebook
+        run = extractor or backend
+        if index is not None and not (run and run.incomplete()):
+            page_stats['pruned_pages'] = index.prune()
+    except BaseException:
+        # Pages committed so far are complete; drop the ones stored since
+        if index is not None:
+            index.rollback()
+        raise
+    finally:
+        if index is not None:
+            index.close()
+    
+    if not page_stats['pages']:
         print("No content extracted from OneNote file")
         sys.exit(1)
     
-    print(f"Extracted content from {len(content_list)} pages")
-    
-    # Parse into business entries
-    business_entries = []
-    
-    for page_data in content_list:
-        content = page_data.get('content', '')
-        if not content.strip():
-            continue
-            
-        # Split content into potential business entries
-        entries = chunk_by_business_entities(content)
-        
-        for entry in entries:
-            if is_valid_business_entry(entry):
-                metadata = extract_business_metadata(entry)
-                
-                business_entry = {
-                    'source_notebook': page_data.get('notebook', ''),
-                    'source_section': page_data.get('section', ''), 
-                    'source_page': page_data.get('page', ''),
-                    'raw_content': entry,
-                    **metadata
-                }
-                
-                business_entries.append(business_entry)
-    
-    print(f"Found {len(business_entries)} valid business entries")
-    
-    if business_entries:
-        # Create DataFrame and save to Excel
-        df = pd.DataFrame(business_entries)
-        
-        # Save to Excel with timestamp
-        output_file = f"onenote_extracted_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-        df.to_excel(output_file, index=False)
-        
-        print(f"Results saved to: {output_file}")
-        
-        # Also save as JSON for debugging
-        json_file = output_file.replace('.xlsx', '.json')
-        with open(json_file, 'w', encoding='utf-8') as f:
-            json.dump(business_entries, f, indent=2, ensure_ascii=False)
-        
-        print(f"Debug data saved to: {json_file}")
+    print(f"Extracted content from {page_stats['pages']} pages")
+    if extractor is not None:
+        if extractor.stats['page_timeouts']:
+            print(f"Skipped {extractor.stats['page_timeouts']} pages that took longer than {args.page_timeout:g}s")
+        if extractor.stats['page_errors']:
+            print(f"Skipped {extractor.stats['page_errors']} pages that could not be fetched")
+        if extractor.stats['skipped_pages']:
+            print(f"Stopped before fetching {extractor.stats['skipped_pages']} pages, "
+                  "the output has the pages fetched until then")
+    if index is not None:
+        print(f"Indexed {page_stats['indexed_pages']} changed pages into {args.index}, "
+              f"dropped {page_stats['pruned_pages']} removed pages")
+    print(f"Found {stats['entries']} valid business entries")
+    if args.dedupe:
+        print(f"Merged {page_stats['duplicates']} near-duplicate entries")
+    
+    if stats['entries']:
+        for name, path in output_paths.items():
+            if name == 'json':
+                print(f"Debug data saved to: {path}")
+            else:
+                print(f"Results saved to: {path}")
         
         # Print summary
-        print("\\n=== SUMMARY ===")
-        underwriter_count = len([e for e in business_entries if e.get('underwriter')])
-        company_count = len([e for e in business_entries if e.get('company')])
-        broker_count = len([e for e in business_entries if e.get('broker')])
-        
-        print(f"Entries with underwriters: {underwriter_count}")
-        print(f"Entries with companies: {company_count}")
-        print(f"Entries with brokers: {broker_count}")
+        print("\n=== SUMMARY ===")
+        print(f"Entries with underwriters: {stats['underwriter']}")
+        print(f"Entries with companies: {stats['company']}")
+        print(f"Entries with brokers: {stats['broker']}")
         
     else:
         print("No valid business entries found")
@@ -0,0 +1,370 @@
+"""
+Persistent full-text index over extracted business entries
+
+Keeps every parsed entry in SQLite with an FTS5 index over its raw_content
+and plain indexes on underwriter, company, broker and primary_date (stored
+as an ISO day so ranges compare), so term and field queries are answered
+from the index instead of loading a whole extraction:
+
+    python onenote_index.py entries.db acme renewal --broker marsh --from 2024-07-01
+
+The extractor scripts fill it with --index PATH. It is updated page by
+page: a page whose lastModifiedTime matches what the index holds keeps its
+rows, a changed page has its rows replaced together with its
+lastModifiedTime once all of its entries are in (a failed run is rolled
+back, so no page is left marked as indexed without them), and once a run
+has finished the pages of the sections it walked that it no longer saw
+are dropped (with --snapshot, which passes on changed pages only, the
+pages the snapshot found deleted). Pruning by section rather than by
+notebook lets runs over single section files of a notebook share an
+index; the pages of a section deleted altogether stay until the section
+is extracted again or the index is rebuilt. Pages without a
+lastModifiedTime (offline .one files) are always indexed again.
+"""
+
+import argparse
+import datetime
+import json
+import re
+import sqlite3
+import sys
+import time
+from collections import deque
+
+from onenote_normalize import DATE_PARTS, TWO_DIGIT_YEAR_PIVOT
+
+# Bump whenever the schema or what is stored per entry changes
+INDEX_VERSION = 2
+# Pages between commits, each commit flushing the text index to disk, and rows per insert
+COMMIT_EVERY = 2000
+INSERT_BATCH = 1000
+DEFAULT_LIMIT = 20
+
+SOURCE_COLUMNS = ('source_notebook', 'source_section', 'source_page')
+FIELD_COLUMNS = ('underwriter', 'company', 'broker')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    page_key TEXT PRIMARY KEY,
+    last_modified TEXT NOT NULL,
+    notebook TEXT NOT NULL,
+    section TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS pages_section ON pages (notebook, section);
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY,
+    page_key TEXT NOT NULL,
+    source_notebook TEXT NOT NULL,
+    source_section TEXT NOT NULL,
+    source_page TEXT NOT NULL,
+    raw_content TEXT NOT NULL,
+    underwriter TEXT COLLATE NOCASE,
+    company TEXT COLLATE NOCASE,
+    broker TEXT COLLATE NOCASE,
+    primary_day TEXT,
+    metadata TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_page ON entries (page_key);
+CREATE INDEX IF NOT EXISTS entries_underwriter ON entries (underwriter);
+CREATE INDEX IF NOT EXISTS entries_company ON entries (company);
+CREATE INDEX IF NOT EXISTS entries_broker ON entries (broker);
+CREATE INDEX IF NOT EXISTS entries_primary_day ON entries (primary_day);
+CREATE VIRTUAL TABLE IF NOT EXISTS entries_text USING fts5(
+    raw_content, content='entries', content_rowid='id'
+);
+"""
+
+_date_parts = re.compile(DATE_PARTS)
+
+
+def iso_day(text):
+    """YYYY-MM-DD for a month-first date as the extractors match them, else None"""
+    match = _date_parts.match(text or '')
+    if match is None:
+        return None
+    year = int(match['year'])
+    if year < 100:
+        year += 2000 if year < TWO_DIGIT_YEAR_PIVOT else 1900
+    try:
+        return datetime.date(year, int(match['month']), int(match['day'])).isoformat()
+    except ValueError:
+        return None
+
+
+def parse_day(text):
+    """A query bound given as YYYY-MM-DD or month first; ValueError if it is neither"""
+    try:
+        return datetime.date.fromisoformat(text).isoformat()
+    except ValueError:
+        day = iso_day(text)
+        if day is None:
+            raise ValueError(f"not a date: {text!r}")
+        return day
+
+
+def page_key(page_id, notebook, section, page):
+    """The page ID, or the page's path when the backend gave it none"""
+    return page_id or '\x1f'.join((notebook, section, page))
+
+
+def match_words(words):
+    """An FTS5 query that needs every word; a trailing * matches by prefix"""
+    if isinstance(words, str):
+        words = words.split()
+    terms = []
+    for word in words:
+        prefix = word.endswith('*')
+        word = word.rstrip('*')
+        if word:
+            terms.append('"' + word.replace('"', '""') + '"' + ('*' if prefix else ''))
+    return ' '.join(terms)
+
+
+class EntryIndex:
+    """SQLite index of entries by page, with full-text and field lookups"""
+
+    def __init__(self, path):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        if self.db.execute('PRAGMA user_version').fetchone()[0] != INDEX_VERSION:
+            self.db.executescript("""
+                DROP TABLE IF EXISTS entries_text;
+                DROP TABLE IF EXISTS entries;
+                DROP TABLE IF EXISTS pages;
+            """)
+            self.db.execute(f'PRAGMA user_version = {INDEX_VERSION}')
+        self.db.executescript(SCHEMA)
+        self.next_id = self.db.execute('SELECT COALESCE(MAX(id), 0) + 1 FROM entries').fetchone()[0]
+        # Pages seen in this run, the ones whose entries are (re)indexed, and their (notebook, section)
+        self.seen = set()
+        self.changed = set()
+        self.sections = set()
+        # Pages passed on but not stored yet, in order: (key, last_modified, section, first)
+        self.unstored = deque()
+        self.stats = None
+        self.pending = 0
+
+    def track_pages(self, pages, stats=None):
+        """Pass pages through, noting which changed since they were indexed.
+
+        Nothing is written here: index_entries replaces a changed page's
+        rows once all of its entries have gone by, so a run that stops
+        half way never leaves a page marked as indexed without its entries.
+        """
+        self.stats = stats
+        for page_data in pages:
+            section = (page_data.get('notebook', ''), page_data.get('section', ''))
+            key = page_key(page_data.get('page_id'), *section, page_data.get('page', ''))
+            last_modified = page_data.get('last_modified') or ''
+            first = key not in self.seen
+            if first:
+                self.seen.add(key)
+                self.sections.add(section)
+                row = self.db.execute('SELECT last_modified FROM pages WHERE page_key = ?',
+                                      (key,)).fetchone()
+                if row is None or not last_modified or row[0] != last_modified:
+                    self.changed.add(key)
+            # Pages sharing a key (offline pages of the same name) add to its entries
+            self.unstored.append((key, last_modified, section, first))
+            yield page_data
+
+    def index_entries(self, entries):
+        """Pass Entry records through, storing each changed page with its entries in one go.
+
+        Entries come in page order, so a page is complete once an entry of
+        a later page shows up, or the entries run out. Pages the stream
+        stops before are left as they were.
+        """
+        rows = []
+        current = None
+        for entry in entries:
+            source = entry.source
+            key = page_key(source.page_id, source.notebook, source.section, source.page)
+            if key != current:
+                self._store_until(key, rows)
+                rows = []
+                current = key
+            rows.append(entry)
+            yield entry
+        self._store_until(None, rows)
+
+    def _store_until(self, key, entries):
+        """Store the tracked pages before key; entries belong to the first of them"""
+        while self.unstored and self.unstored[0][0] != key:
+            page, last_modified, section, first = self.unstored.popleft()
+            if page in self.changed:
+                self._store_page(page, last_modified, section, entries, first)
+            entries = []
+
+    def _store_page(self, key, last_modified, section, entries, replace=True):
+        if replace:
+            self._delete_entries([key])
+        rows = [self._row(key, entry.to_dict()) for entry in entries]
+        for start in range(0, len(rows), INSERT_BATCH):
+            self._insert(rows[start:start + INSERT_BATCH])
+        self.db.execute('INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?)', (key, last_modified, *section))
+        if replace and self.stats is not None:
+            self.stats['indexed_pages'] += 1
+        self._changed()
+
+    def _row(self, key, entry):
+        raw_content = entry.pop('raw_content')
+        sources = [entry.pop(column) for column in SOURCE_COLUMNS]
+        fields = [entry.get(column) for column in FIELD_COLUMNS]
+        return (key, *sources, raw_content, *fields, iso_day(entry.get('primary_date')),
+                json.dumps(entry, ensure_ascii=False))
+
+    def _insert(self, rows):
+        # Filling the text index directly is several times faster than from a trigger
+        ids = range(self.next_id, self.next_id + len(rows))
+        self.next_id += len(rows)
+        self.db.executemany(
+            'INSERT INTO entries (id, page_key, source_notebook, source_section, source_page, '
+            'raw_content, underwriter, company, broker, primary_day, metadata) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            [(entry_id, *row) for entry_id, row in zip(ids, rows)]
+        )
+        self.db.executemany('INSERT INTO entries_text (rowid, raw_content) VALUES (?, ?)',
+                            [(entry_id, row[4]) for entry_id, row in zip(ids, rows)])
+
+    def _delete_entries(self, keys):
+        for key in keys:
+            rows = self.db.execute('SELECT id, raw_content FROM entries WHERE page_key = ?',
+                                   (key,)).fetchall()
+            if rows:
+                # An external content table needs the old text to drop a row's terms
+                self.db.executemany(
+                    "INSERT INTO entries_text (entries_text, rowid, raw_content) VALUES ('delete', ?, ?)",
+                    rows
+                )
+                self.db.execute('DELETE FROM entries WHERE page_key = ?', (key,))
+
+    def remove_pages(self, keys):
+        """Drop pages and their entries from the index, e.g. pages known to be deleted"""
+        keys = list(keys)
+        self._delete_entries(keys)
+        self.db.executemany('DELETE FROM pages WHERE page_key = ?', [(key,) for key in keys])
+        self._changed()
+        return len(keys)
+
+    def prune(self):
+        """Drop the pages of this run's sections that the run didn't see; returns how many"""
+        removed = []
+        for section in self.sections:
+            rows = self.db.execute('SELECT page_key FROM pages WHERE notebook = ? AND section = ?', section)
+            removed.extend(key for key, in rows if key not in self.seen)
+        return self.remove_pages(removed)
+
+    def search(self, words=None, match=None, underwriter=None, company=None, broker=None,
+               date_from=None, date_to=None, limit=DEFAULT_LIMIT):
+        """Entry dicts matching all the given conditions, best text matches first.
+
+        ``words`` must all appear in raw_content, ``match`` is a raw FTS5
+        query; a field value ending in * matches by prefix, any other value
+        the whole field, ignoring case. Dates bound primary_date, inclusive.
+        """
+        query = match or (match_words(words) if words else '')
+        sql = ('SELECT e.source_notebook, e.source_section, e.source_page, e.raw_content, '
+               'e.metadata FROM entries e')
+        conditions = []
+        params = []
+        if query:
+            sql += ' JOIN entries_text ON entries_text.rowid = e.id'
+            conditions.append('entries_text MATCH ?')
+            params.append(query)
+        for column, value in zip(FIELD_COLUMNS, (underwriter, company, broker)):
+            if value and value.endswith('*'):
+                prefix = value.rstrip('*').replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+                conditions.append(f"e.{column} LIKE ? ESCAPE '\\'")
+                params.append(prefix + '%')
+            elif value:
+                conditions.append(f'e.{column} = ?')
+                params.append(value)
+        if date_from:
+            conditions.append('e.primary_day >= ?')
+            params.append(parse_day(date_from))
+        if date_to:
+            conditions.append('e.primary_day <= ?')
+            params.append(parse_day(date_to))
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        # bm25() rather than rank, which is only fast without the join
+        sql += ' ORDER BY bm25(entries_text)' if query else ' ORDER BY e.primary_day, e.id'
+        sql += ' LIMIT ?'
+        params.append(limit)
+
+        results = []
+        for notebook, section, page, raw_content, metadata in self.db.execute(sql, params):
+            entry = {'source_notebook': notebook, 'source_section': section,
+                     'source_page': page, 'raw_content': raw_content}
+            entry.update(json.loads(metadata))
+            results.append(entry)
+        return results
+
+    def _changed(self):
+        self.pending += 1
+        if self.pending >= COMMIT_EVERY:
+            self.db.commit()
+            self.pending = 0
+
+    def commit(self):
+        self.db.commit()
+        self.pending = 0
+
+    def rollback(self):
+        """Drop what the run wrote since the last commit, for a run that failed"""
+        self.db.rollback()
+        self.pending = 0
+
+    def close(self):
+        self.commit()
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc_info):
+        if exc_type is not None:
+            self.rollback()
+        self.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query an entry index written with --index")
+    parser.add_argument('index', help="index file written by an extractor's --index")
+    parser.add_argument('words', nargs='*', help="words that must all appear (word* for a prefix)")
+    parser.add_argument('--match', help="raw FTS5 query instead of words")
+    parser.add_argument('--underwriter')
+    parser.add_argument('--company')
+    parser.add_argument('--broker')
+    parser.add_argument('--from', dest='date_from', metavar='DATE', help="earliest primary_date")
+    parser.add_argument('--to', dest='date_to', metavar='DATE', help="latest primary_date")
+    parser.add_argument('--limit', type=int, default=DEFAULT_LIMIT)
+    parser.add_argument('--json', action='store_true', help="print matching entries as NDJSON")
+    args = parser.parse_intermixed_args()
+
+    with EntryIndex(args.index) as index:
+        start = time.perf_counter()
+        try:
+            entries = index.search(args.words, args.match, args.underwriter, args.company,
+                                   args.broker, args.date_from, args.date_to, args.limit)
+        except (ValueError, sqlite3.OperationalError) as e:
+            parser.error(str(e))
+        elapsed = time.perf_counter() - start
+
+    for entry in entries:
+        if args.json:
+            print(json.dumps(entry, ensure_ascii=False))
+            continue
+        source = ' / '.join(entry[column] for column in SOURCE_COLUMNS)
+        fields = '  '.join(f"{column}={entry[column]}" for column in ('primary_date',) + FIELD_COLUMNS
+                           if entry.get(column))
+        print(f"{source}  {fields}")
+        print(f"    {' '.join(entry['raw_content'].split())[:160]}")
+    print(f"{len(entries)} entries in {elapsed * 1000:.1f} ms", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
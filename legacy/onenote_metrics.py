@@ -0,0 +1,177 @@
+"""
+Stage timers, counters and profiling for the extractor scripts
+
+The shared modules record into the process-wide ``metrics`` object: time per
+stage (fetch, xml_parse, chunk, validate, metadata, write) and counters
+(pages, chunks, entries, rejects by reason). Recording is off unless a
+script is run with --metrics, so the hot loops only pay for an attribute
+check. Parse worker processes send their numbers back with their results.
+
+The report is written as JSON, or as OpenMetrics text for any other
+extension. --profile writes a cProfile dump and --trace-memory adds
+tracemalloc's peak and top allocation sites to the report.
+"""
+
+import json
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+LOG_LEVELS = ('DEBUG', 'INFO', 'WARNING', 'ERROR')
+TRACE_MEMORY_TOP = 10
+METRIC_PREFIX = 'onenote_extractor'
+
+
+class Metrics:
+    """Per-stage seconds and call counts plus named counters, safe to update from threads"""
+
+    def __init__(self):
+        self.enabled = False
+        self.seconds = Counter()
+        self.calls = Counter()
+        self.counters = Counter()
+        self.memory = None
+        self.lock = threading.Lock()
+
+    def add_time(self, stage, seconds, calls=1):
+        with self.lock:
+            self.seconds[stage] += seconds
+            self.calls[stage] += calls
+
+    def count(self, name, value=1):
+        with self.lock:
+            self.counters[name] += value
+
+    @contextmanager
+    def timer(self, stage):
+        """Time the block as one call of stage, if recording is on"""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(stage, time.perf_counter() - start)
+
+    def snapshot(self):
+        """Picklable copy of the numbers, for sending back from a worker process"""
+        with self.lock:
+            return dict(self.seconds), dict(self.calls), dict(self.counters)
+
+    def merge(self, snapshot):
+        seconds, calls, counters = snapshot
+        with self.lock:
+            self.seconds.update(seconds)
+            self.calls.update(calls)
+            self.counters.update(counters)
+
+    def reset(self):
+        with self.lock:
+            self.seconds.clear()
+            self.calls.clear()
+            self.counters.clear()
+
+    def report(self):
+        with self.lock:
+            report = {
+                'stages': {
+                    stage: {'seconds': round(self.seconds[stage], 6), 'calls': self.calls[stage]}
+                    for stage in sorted(self.seconds)
+                },
+                'counters': dict(sorted(self.counters.items())),
+            }
+        if self.memory is not None:
+            report['memory'] = self.memory
+        return report
+
+    def openmetrics(self):
+        """The report in OpenMetrics text exposition format"""
+        report = self.report()
+        lines = [
+            f'# TYPE {METRIC_PREFIX}_stage_seconds counter',
+            f'# UNIT {METRIC_PREFIX}_stage_seconds seconds',
+        ]
+        for stage, values in report['stages'].items():
+            lines.append(f'{METRIC_PREFIX}_stage_seconds_total{{stage="{stage}"}} {values["seconds"]}')
+        lines.append(f'# TYPE {METRIC_PREFIX}_stage_calls counter')
+        for stage, values in report['stages'].items():
+            lines.append(f'{METRIC_PREFIX}_stage_calls_total{{stage="{stage}"}} {values["calls"]}')
+        for name, value in report['counters'].items():
+            lines.append(f'# TYPE {METRIC_PREFIX}_{name} counter')
+            lines.append(f'{METRIC_PREFIX}_{name}_total {value}')
+        if self.memory is not None:
+            lines.append(f'# TYPE {METRIC_PREFIX}_traced_memory_peak_bytes gauge')
+            lines.append(f'{METRIC_PREFIX}_traced_memory_peak_bytes {self.memory["peak_bytes"]}')
+        lines.append('# EOF')
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path):
+        """Write the report to path: JSON for .json, OpenMetrics text otherwise"""
+        with open(path, 'w', encoding='utf-8') as f:
+            if str(path).lower().endswith('.json'):
+                json.dump(self.report(), f, indent=2)
+            else:
+                f.write(self.openmetrics())
+
+
+metrics = Metrics()
+
+
+def add_arguments(parser):
+    """Add the logging, metrics and profiling options every script takes"""
+    parser.add_argument('--log-level', default='INFO', choices=LOG_LEVELS, type=str.upper,
+                        help="DEBUG also lists every section and page (default: INFO)")
+    parser.add_argument('--metrics', metavar='PATH',
+                        help="write stage timings and counters to PATH (.json, else OpenMetrics text)")
+    parser.add_argument('--profile', metavar='PATH',
+                        help="write a cProfile dump of the run to PATH")
+    parser.add_argument('--trace-memory', action='store_true',
+                        help="add tracemalloc's peak and top allocation sites to --metrics")
+
+
+@contextmanager
+def instrumented(args):
+    """Set up logging, metrics and profiling from add_arguments' options for the run"""
+    logging.basicConfig(level=args.log_level, format='%(message)s')
+    metrics.enabled = bool(args.metrics)
+
+    profiler = None
+    if args.profile:
+        import cProfile
+        profiler = cProfile.Profile()
+    if args.trace_memory:
+        import tracemalloc
+        tracemalloc.start()
+
+    start = time.perf_counter()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield metrics
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        metrics.add_time('total', time.perf_counter() - start)
+
+        if profiler is not None:
+            profiler.dump_stats(args.profile)
+            logger.info(f"Profile saved to: {args.profile}")
+        if args.trace_memory:
+            snapshot = tracemalloc.take_snapshot()
+            metrics.memory = {
+                'peak_bytes': tracemalloc.get_traced_memory()[1],
+                'top': [
+                    {'site': str(stat.traceback), 'bytes': stat.size, 'blocks': stat.count}
+                    for stat in snapshot.statistics('lineno')[:TRACE_MEMORY_TOP]
+                ],
+            }
+            tracemalloc.stop()
+            logger.info(f"Peak traced memory: {metrics.memory['peak_bytes'] / 1024 / 1024:.1f} MB")
+        if args.metrics:
+            metrics.write(args.metrics)
+            logger.info(f"Metrics saved to: {args.metrics}")
@@ -0,0 +1,144 @@
+"""
+Typed, normalized columns for extracted business entries
+
+The metadata fields are the raw text that matched: ``dates`` is
+"3/4/24, 03-04-2024", ``amounts`` is "$1,200.00, $5,000" and names keep
+their case and legal suffix. normalize_entries adds typed columns next to
+them so consumers don't parse every row again:
+
+    first_date, latest_date, date_count       the parsed dates (month first)
+    amount_total, amount_max, amount_count    the amounts as numbers
+    underwriter_name, company_name, broker_name
+                                              lowercased, LLC/INC/... removed
+
+Entries are normalized in batches of NORMALIZE_BATCH_SIZE with
+pyarrow.compute kernels over whole columns, so the per-entry Python work is
+only building the column arrays and reading the results back.
+"""
+
+from itertools import islice
+
+from onenote_writers import ENTRY_COLUMNS
+
+NORMALIZE_BATCH_SIZE = 64 * 1024
+# Two-digit years below this are 20xx, the rest 19xx (the same pivot as strptime's %y)
+TWO_DIGIT_YEAR_PIVOT = 69
+
+DATE_PARTS = r'^(?P<month>\d{1,2})[/-](?P<day>\d{1,2})[/-](?P<year>\d{2}|\d{4})$'
+AMOUNT_NUMBER = r'^\d+(?:\.\d+)?$'
+NAME_SUFFIX = r'[\s,.]+(?:llc|l\.l\.c|inc|incorporated|corp|corporation|company|co|ltd)\.?$'
+NAME_FIELDS = ('underwriter', 'company', 'broker')
+
+NORMALIZED_FIELDS = [
+    'first_date', 'latest_date', 'date_count',
+    'amount_total', 'amount_max', 'amount_count',
+    'underwriter_name', 'company_name', 'broker_name',
+]
+NORMALIZED_COLUMNS = ENTRY_COLUMNS + NORMALIZED_FIELDS
+
+
+def _split_values(pc, column):
+    """Flatten a column of ", "-joined values, with the row each value came from"""
+    lists = pc.split_pattern(column, ', ')
+    return pc.list_flatten(lists), pc.list_parent_indices(lists).to_numpy()
+
+
+def _per_row(np, rows, parents, values):
+    """(first, max, sum, count) of values per row; parents is sorted, values has no gaps"""
+    count = np.bincount(parents, minlength=rows)
+    present = np.flatnonzero(count)
+    first = np.zeros(rows, values.dtype)
+    largest = np.zeros(rows, values.dtype)
+    total = np.zeros(rows, values.dtype)
+    if len(values):
+        starts = np.concatenate(([0], np.cumsum(count[present])[:-1]))
+        first[present] = values[starts]
+        largest[present] = np.maximum.reduceat(values, starts)
+        total[present] = np.add.reduceat(values, starts)
+    return first, largest, total, count
+
+
+def parse_dates(pa, pc, np, column):
+    """first_date, latest_date and date_count arrays for a column of joined dates"""
+    rows = len(column)
+    values, parents = _split_values(pc, column)
+    parts = pc.extract_regex(values, DATE_PARTS)
+    month, day, year = (
+        pc.fill_null(pc.cast(parts.field(name), pa.int64()), 0).to_numpy(zero_copy_only=False)
+        for name in ('month', 'day', 'year')
+    )
+    year = np.where(year < 100, year + np.where(year < TWO_DIGIT_YEAR_PIVOT, 2000, 1900), year)
+
+    # Day numbers since 1970; a day past the end of its month rolls over and is dropped
+    months = (year - 1970) * 12 + month - 1
+    days = months.astype('datetime64[M]').astype('datetime64[D]').astype(np.int64) + day - 1
+    valid = ((month >= 1) & (month <= 12) & (day >= 1) & (year > 0)
+             & (days.astype('datetime64[D]').astype('datetime64[M]').astype(np.int64) == months))
+
+    first, latest, _, count = _per_row(np, rows, parents[valid], days[valid])
+    missing = count == 0
+    return (
+        pa.array(first.astype(np.int32), pa.date32(), mask=missing),
+        pa.array(latest.astype(np.int32), pa.date32(), mask=missing),
+        pa.array(count, pa.int64(), mask=pc.is_null(column).to_numpy(zero_copy_only=False)),
+    )
+
+
+def parse_amounts(pa, pc, np, column):
+    """amount_total, amount_max and amount_count arrays for a column of joined amounts"""
+    rows = len(column)
+    values, parents = _split_values(pc, column)
+    digits = pc.replace_substring_regex(values, r'[$,]', '')
+    numeric = pc.fill_null(pc.match_substring_regex(digits, AMOUNT_NUMBER), False)
+    numeric = numeric.to_numpy(zero_copy_only=False)
+    numbers = pc.cast(pc.filter(digits, numeric), pa.float64()).to_numpy(zero_copy_only=False)
+
+    _, largest, total, count = _per_row(np, rows, parents[numeric], numbers)
+    missing = count == 0
+    return (
+        pa.array(total, pa.float64(), mask=missing),
+        pa.array(largest, pa.float64(), mask=missing),
+        pa.array(count, pa.int64(), mask=pc.is_null(column).to_numpy(zero_copy_only=False)),
+    )
+
+
+def normalize_names(pc, column):
+    """Lowercase names with collapsed whitespace and no legal suffix; empty becomes null"""
+    names = pc.utf8_lower(column)
+    names = pc.replace_substring_regex(names, r'\s+', ' ')
+    names = pc.replace_substring_regex(names, NAME_SUFFIX, '')
+    names = pc.utf8_trim(names, ' ,.')
+    return pc.if_else(pc.equal(names, ''), None, names)
+
+
+def normalize_columns(columns):
+    """Normalized arrays, by NORMALIZED_FIELDS name, for a dict of pyarrow string arrays"""
+    import numpy as np
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    normalized = dict(zip(NORMALIZED_FIELDS[:3], parse_dates(pa, pc, np, columns['dates'])))
+    normalized.update(zip(NORMALIZED_FIELDS[3:6], parse_amounts(pa, pc, np, columns['amounts'])))
+    for field in NAME_FIELDS:
+        normalized[f'{field}_name'] = normalize_names(pc, columns[field])
+    return normalized
+
+
+def normalize_entries(entries, batch_size=NORMALIZE_BATCH_SIZE):
+    """Yield entries with the NORMALIZED_FIELDS added, normalized a batch at a time"""
+    import pyarrow as pa
+
+    entries = iter(entries)
+    while True:
+        batch = list(islice(entries, batch_size))
+        if not batch:
+            return
+        columns = {
+            field: pa.array([entry.get(field) for entry in batch], pa.string())
+            for field in ('dates', 'amounts') + NAME_FIELDS
+        }
+        normalized = normalize_columns(columns)
+        values = [normalized[field].to_pylist() for field in NORMALIZED_FIELDS]
+        for entry, row in zip(batch, zip(*values)):
+            entry.update(zip(NORMALIZED_FIELDS, row))
+            yield entry
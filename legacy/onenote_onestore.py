@@ -0,0 +1,565 @@
+"""
+Offline reader for OneNote section (.one) files
+
+Parses the MS-ONESTORE revision store straight from a memory-mapped file, so
+page text can be extracted without a running OneNote instance (and on
+machines without OneNote at all, such as Linux batch workers). Only what text
+extraction needs is decoded: file node lists, object spaces, revisions,
+global ID tables and object property sets. Of the revisions an object space
+keeps, only the current one of the default context and the revisions it
+depends on are read, so older page versions don't show through. Property
+sets are parsed lazily, only for objects reachable from a page.
+
+Not supported: password protected sections, and filtering out uncommitted
+file nodes left behind by an interrupted write (the transaction log is not
+consulted).
+"""
+
+import mmap
+import os
+import struct
+import uuid
+from itertools import islice
+from pathlib import Path
+
+ONE_FILE_TYPE = uuid.UUID('7B5C52E4-D88C-4DA7-AEB1-5378D02996D3').bytes_le
+ONESTORE_FILE_FORMAT = uuid.UUID('109ADD3F-911B-49F5-A5D0-1791EDC8AED8').bytes_le
+
+HEADER_SIZE = 1024
+ROOT_LIST_OFFSET = 172
+FRAGMENT_HEADER_MAGIC = 0xA4567AB1F5F7F4C4
+FRAGMENT_FOOTER_MAGIC = 0x8BC215C38233BA4B
+FRAGMENT_FOOTER_SIZE = 20
+
+# FileNode IDs (MS-ONESTORE 2.4.3)
+OBJECT_SPACE_MANIFEST_ROOT = 0x004
+OBJECT_SPACE_MANIFEST_LIST_REFERENCE = 0x008
+REVISION_MANIFEST_LIST_REFERENCE = 0x010
+REVISION_MANIFEST_START_4 = 0x01B
+REVISION_MANIFEST_END = 0x01C
+REVISION_MANIFEST_START_6 = 0x01E
+REVISION_MANIFEST_START_7 = 0x01F
+GLOBAL_ID_TABLE_START = 0x021
+GLOBAL_ID_TABLE_START_2 = 0x022
+GLOBAL_ID_TABLE_ENTRY = 0x024
+GLOBAL_ID_TABLE_ENTRY_2 = 0x025
+GLOBAL_ID_TABLE_ENTRY_3 = 0x026
+GLOBAL_ID_TABLE_END = 0x028
+OBJECT_DECLARATION_WITH_REF_COUNT = 0x02D
+OBJECT_DECLARATION_WITH_REF_COUNT_2 = 0x02E
+OBJECT_REVISION_WITH_REF_COUNT = 0x041
+OBJECT_REVISION_WITH_REF_COUNT_2 = 0x042
+ROOT_OBJECT_REFERENCE_2 = 0x059
+ROOT_OBJECT_REFERENCE_3 = 0x05A
+REVISION_ROLE_DECLARATION = 0x05C
+REVISION_ROLE_AND_CONTEXT_DECLARATION = 0x05D
+OBJECT_DATA_ENCRYPTION_KEY = 0x07C
+OBJECT_DECLARATION_2_REF_COUNT = 0x0A4
+OBJECT_DECLARATION_2_LARGE_REF_COUNT = 0x0A5
+OBJECT_GROUP_LIST_REFERENCE = 0x0B0
+READ_ONLY_OBJECT_DECLARATION_2_REF_COUNT = 0x0C4
+READ_ONLY_OBJECT_DECLARATION_2_LARGE_REF_COUNT = 0x0C5
+CHUNK_TERMINATOR = 0x0FF
+
+OBJECT_DECLARATIONS_2 = {
+    OBJECT_DECLARATION_2_REF_COUNT,
+    OBJECT_DECLARATION_2_LARGE_REF_COUNT,
+    READ_ONLY_OBJECT_DECLARATION_2_REF_COUNT,
+    READ_ONLY_OBJECT_DECLARATION_2_LARGE_REF_COUNT,
+}
+
+REFERENCE_NODES = OBJECT_DECLARATIONS_2 | {
+    OBJECT_SPACE_MANIFEST_LIST_REFERENCE,
+    REVISION_MANIFEST_LIST_REFERENCE,
+    OBJECT_GROUP_LIST_REFERENCE,
+    OBJECT_DECLARATION_WITH_REF_COUNT,
+    OBJECT_DECLARATION_WITH_REF_COUNT_2,
+    OBJECT_REVISION_WITH_REF_COUNT,
+    OBJECT_REVISION_WITH_REF_COUNT_2,
+}
+
+# Property types (MS-ONESTORE 2.6.6)
+PROPERTY_SIZES = {0x1: 0, 0x2: 0, 0x3: 1, 0x4: 2, 0x5: 4, 0x6: 8}
+PROPERTY_BYTES = 0x7
+PROPERTY_OBJECT_ID = 0x8
+PROPERTY_OBJECT_IDS = 0x9
+PROPERTY_OBJECT_SPACE_ID = 0xA
+PROPERTY_OBJECT_SPACE_IDS = 0xB
+PROPERTY_CONTEXT_ID = 0xC
+PROPERTY_CONTEXT_IDS = 0xD
+PROPERTY_VALUES = 0x10
+PROPERTY_SET = 0x11
+
+# Property IDs without the boolean bit (MS-ONE 2.1.12)
+RICH_EDIT_TEXT_UNICODE = 0x1C001C22
+TEXT_EXTENDED_ASCII = 0x1C003498
+CACHED_TITLE_STRING = 0x1C001CF3
+CACHED_TITLE_STRING_FROM_PAGE = 0x1C001D3C
+
+ROOT_ROLE_CONTENT = 1
+ROOT_ROLE_METADATA = 2
+
+# The revisions that make up what OneNote shows; other contexts hold e.g. page versions
+DEFAULT_CONTEXT = (bytes(16), 0)
+REVISION_ROLE_DEFAULT = 1
+
+LINE_BREAKS = str.maketrans({'\r': '\n', '\x0b': '\n'})
+
+
+class OneStoreError(ValueError):
+    """The file is not a readable OneNote revision store"""
+
+
+def format_extended_guid(extended_guid):
+    guid, n = extended_guid
+    return f'{{{str(uuid.UUID(bytes_le=guid)).upper()}}}{{{n}}}'
+
+
+class ObjectSpace:
+    """Objects and root objects of one object space (a section or a page), or of one revision of it"""
+
+    def __init__(self, gosid, dependent=None):
+        self.gosid = gosid
+        # The revision this one only holds the changes since
+        self.dependent = dependent
+        # oid -> (jcid, stp, cb, global id table)
+        self.objects = {}
+        # root role -> oid
+        self.roots = {}
+
+
+class OneStoreReader:
+    """Memory-mapped reader for one .one section file"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size < HEADER_SIZE:
+                raise OneStoreError(f"{path}: too small to be a OneNote file")
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self.data[0:16] != ONE_FILE_TYPE or self.data[48:64] != ONESTORE_FILE_FORMAT:
+            self.close()
+            raise OneStoreError(f"{path}: not a OneNote section file")
+
+        self.root_gosid = None
+        self.spaces = {}
+        try:
+            self._read_root_list()
+        except (struct.error, IndexError) as e:
+            self.close()
+            raise OneStoreError(f"{path}: truncated revision store ({e})") from e
+        except OneStoreError:
+            self.close()
+            raise
+
+    def close(self):
+        self.data.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    # File node lists
+
+    def _chunk(self, stp, cb):
+        if stp + cb > len(self.data):
+            raise OneStoreError(f"{self.path}: reference past end of file at {stp:#x}")
+        return stp, cb
+
+    def _node_reference(self, pos, stp_format, cb_format):
+        """Read a FileNodeChunkReference, returning (stp, cb) and the next offset"""
+        if stp_format == 0:
+            stp, = struct.unpack_from('<Q', self.data, pos)
+            pos += 8
+        elif stp_format == 1:
+            stp, = struct.unpack_from('<I', self.data, pos)
+            pos += 4
+        elif stp_format == 2:
+            stp = struct.unpack_from('<H', self.data, pos)[0] * 8
+            pos += 2
+        else:
+            stp = struct.unpack_from('<I', self.data, pos)[0] * 8
+            pos += 4
+
+        if cb_format == 0:
+            cb, = struct.unpack_from('<I', self.data, pos)
+            pos += 4
+        elif cb_format == 1:
+            cb, = struct.unpack_from('<Q', self.data, pos)
+            pos += 8
+        elif cb_format == 2:
+            cb = self.data[pos] * 8
+            pos += 1
+        else:
+            cb = struct.unpack_from('<H', self.data, pos)[0] * 8
+            pos += 2
+        return (stp, cb), pos
+
+    def _file_nodes(self, stp, cb):
+        """Yield (node_id, reference, body offset) for every node of a file node list"""
+        fragments = set()
+        while cb:
+            stp, cb = self._chunk(stp, cb)
+            if stp in fragments or cb < 16 + FRAGMENT_FOOTER_SIZE:
+                raise OneStoreError(f"{self.path}: bad file node list fragment at {stp:#x}")
+            fragments.add(stp)
+            magic, = struct.unpack_from('<Q', self.data, stp)
+            if magic != FRAGMENT_HEADER_MAGIC:
+                raise OneStoreError(f"{self.path}: bad file node list fragment at {stp:#x}")
+
+            end = stp + cb - FRAGMENT_FOOTER_SIZE
+            next_stp, next_cb, footer = struct.unpack_from('<QIQ', self.data, end)
+            if footer != FRAGMENT_FOOTER_MAGIC:
+                raise OneStoreError(f"{self.path}: bad file node list footer at {end:#x}")
+
+            pos = stp + 16
+            while pos + 4 <= end:
+                header, = struct.unpack_from('<I', self.data, pos)
+                node_id = header & 0x3FF
+                size = (header >> 10) & 0x1FFF
+                if node_id == 0 or node_id == CHUNK_TERMINATOR:
+                    break
+                if size < 4 or pos + size > end:
+                    raise OneStoreError(f"{self.path}: bad file node at {pos:#x}")
+
+                body = pos + 4
+                reference = None
+                if (header >> 27) & 0xF in (1, 2):
+                    reference, body = self._node_reference(
+                        body, (header >> 23) & 0x3, (header >> 25) & 0x3
+                    )
+                elif node_id in REFERENCE_NODES:
+                    raise OneStoreError(f"{self.path}: file node without reference at {pos:#x}")
+                yield node_id, reference, body
+                pos += size
+
+            if next_stp == 0xFFFFFFFFFFFFFFFF:
+                break
+            stp, cb = next_stp, next_cb
+
+    def _extended_guid(self, pos):
+        guid = bytes(self.data[pos:pos + 16])
+        n, = struct.unpack_from('<I', self.data, pos + 16)
+        return guid, n
+
+    # Object spaces and revisions
+
+    def _read_root_list(self):
+        stp, cb = struct.unpack_from('<QI', self.data, ROOT_LIST_OFFSET)
+        for node_id, reference, body in self._file_nodes(stp, cb):
+            if node_id == OBJECT_SPACE_MANIFEST_ROOT:
+                self.root_gosid = self._extended_guid(body)
+            elif node_id == OBJECT_SPACE_MANIFEST_LIST_REFERENCE:
+                gosid = self._extended_guid(body)
+                self.spaces[gosid] = self._read_object_space(gosid, *reference)
+
+    def _read_object_space(self, gosid, stp, cb):
+        # Only the last revision manifest list of an object space is current
+        revision_list = None
+        for node_id, reference, body in self._file_nodes(stp, cb):
+            if node_id == REVISION_MANIFEST_LIST_REFERENCE:
+                revision_list = reference
+
+        space = ObjectSpace(gosid)
+        if revision_list:
+            self._read_revisions(space, *revision_list)
+        return space
+
+    def _read_revisions(self, space, stp, cb):
+        """Fill space with its objects and roots as of the current revision.
+
+        A revision holds what changed since the revision it depends on, and
+        the list also keeps revisions of other contexts, such as page
+        versions. The current revision is the latest one given the default
+        role in the default context; it and the revisions it depends on are
+        applied oldest first.
+        """
+        tables = {}
+        table = {}
+        rid = dependent = None
+        revision = ObjectSpace(None)
+        revisions = {None: revision}
+        # (context, role) -> the revision that last took that role
+        latest = {}
+        for node_id, reference, body in self._file_nodes(stp, cb):
+            if node_id in (REVISION_MANIFEST_START_4, REVISION_MANIFEST_START_6,
+                           REVISION_MANIFEST_START_7):
+                rid = self._extended_guid(body)
+                dependent = self._extended_guid(body + 20)
+                role_offset = 48 if node_id == REVISION_MANIFEST_START_4 else 40
+                role, = struct.unpack_from('<I', self.data, body + role_offset)
+                context = DEFAULT_CONTEXT
+                if node_id == REVISION_MANIFEST_START_7:
+                    context = self._extended_guid(body + 46)
+                revision = revisions[rid] = ObjectSpace(rid, dependent)
+                latest[context, role] = rid
+                table = {}
+            elif node_id == REVISION_MANIFEST_END:
+                tables[rid] = table
+            elif node_id == REVISION_ROLE_DECLARATION:
+                role, = struct.unpack_from('<I', self.data, body + 20)
+                latest[DEFAULT_CONTEXT, role] = self._extended_guid(body)
+            elif node_id == REVISION_ROLE_AND_CONTEXT_DECLARATION:
+                role, = struct.unpack_from('<I', self.data, body + 20)
+                latest[self._extended_guid(body + 24), role] = self._extended_guid(body)
+            elif node_id == OBJECT_DATA_ENCRYPTION_KEY:
+                raise OneStoreError(f"{self.path}: password protected sections are not supported")
+            elif node_id == OBJECT_GROUP_LIST_REFERENCE:
+                self._read_object_group(revision, *reference)
+            elif node_id in (GLOBAL_ID_TABLE_START, GLOBAL_ID_TABLE_START_2):
+                table = {}
+            elif node_id in (GLOBAL_ID_TABLE_ENTRY, GLOBAL_ID_TABLE_ENTRY_2,
+                             GLOBAL_ID_TABLE_ENTRY_3):
+                self._read_table_entry(node_id, body, table, tables.get(dependent, {}))
+            elif node_id in (OBJECT_DECLARATION_WITH_REF_COUNT,
+                             OBJECT_DECLARATION_WITH_REF_COUNT_2):
+                compact_id, jci = struct.unpack_from('<II', self.data, body)
+                oid = self._resolve(compact_id, table)
+                revision.objects[oid] = (0x00020000 | (jci & 0x3FF), *reference, table)
+            elif node_id in (OBJECT_REVISION_WITH_REF_COUNT, OBJECT_REVISION_WITH_REF_COUNT_2):
+                self._read_object_revision(revision, reference, body, table)
+            elif node_id == ROOT_OBJECT_REFERENCE_2:
+                compact_id, role = struct.unpack_from('<II', self.data, body)
+                revision.roots[role] = self._resolve(compact_id, table)
+            elif node_id == ROOT_OBJECT_REFERENCE_3:
+                role, = struct.unpack_from('<I', self.data, body + 20)
+                revision.roots[role] = self._extended_guid(body)
+
+        chain = []
+        current = latest.get((DEFAULT_CONTEXT, REVISION_ROLE_DEFAULT), rid)
+        while current in revisions and revisions[current] not in chain:
+            chain.append(revisions[current])
+            current = revisions[current].dependent
+        if revisions[None].objects and revisions[None] not in chain:
+            # Nodes ahead of any revision manifest start
+            chain.append(revisions[None])
+        for revision in reversed(chain):
+            for oid, (jcid, *location) in revision.objects.items():
+                # An object revision keeps the class its object was declared with
+                if not jcid and oid in space.objects:
+                    jcid = space.objects[oid][0]
+                space.objects[oid] = (jcid, *location)
+            space.roots.update(revision.roots)
+
+    def _read_object_group(self, space, stp, cb):
+        table = {}
+        for node_id, reference, body in self._file_nodes(stp, cb):
+            if node_id in (GLOBAL_ID_TABLE_START, GLOBAL_ID_TABLE_START_2):
+                table = {}
+            elif node_id == GLOBAL_ID_TABLE_ENTRY:
+                self._read_table_entry(node_id, body, table, {})
+            elif node_id in OBJECT_DECLARATIONS_2:
+                compact_id, jcid = struct.unpack_from('<II', self.data, body)
+                oid = self._resolve(compact_id, table)
+                space.objects[oid] = (jcid, *reference, table)
+            elif node_id in (OBJECT_REVISION_WITH_REF_COUNT, OBJECT_REVISION_WITH_REF_COUNT_2):
+                self._read_object_revision(space, reference, body, table)
+
+    def _read_object_revision(self, space, reference, body, table):
+        compact_id, = struct.unpack_from('<I', self.data, body)
+        oid = self._resolve(compact_id, table)
+        jcid = space.objects[oid][0] if oid in space.objects else 0
+        space.objects[oid] = (jcid, *reference, table)
+
+    def _read_table_entry(self, node_id, body, table, dependent_table):
+        if node_id == GLOBAL_ID_TABLE_ENTRY:
+            index, = struct.unpack_from('<I', self.data, body)
+            table[index] = bytes(self.data[body + 4:body + 20])
+        elif node_id == GLOBAL_ID_TABLE_ENTRY_2:
+            index_from, index_to = struct.unpack_from('<II', self.data, body)
+            if index_from in dependent_table:
+                table[index_to] = dependent_table[index_from]
+        else:
+            copy_from, count, copy_to = struct.unpack_from('<III', self.data, body)
+            for index, guid in dependent_table.items():
+                if copy_from <= index < copy_from + count:
+                    table[copy_to + index - copy_from] = guid
+
+    @staticmethod
+    def _resolve(compact_id, table):
+        """Turn a CompactID into an ExtendedGUID (guid bytes, n)"""
+        n = compact_id & 0xFF
+        index = compact_id >> 8
+        if not n and not index:
+            return None
+        return table.get(index, b''), n
+
+    # Property sets
+
+    def _id_stream(self, pos, end, table):
+        header, = struct.unpack_from('<I', self.data, pos)
+        count = header & 0xFFFFFF
+        if pos + 4 + 4 * count > end:
+            raise OneStoreError(f"{self.path}: bad object ID stream at {pos:#x}")
+        ids = [
+            self._resolve(compact_id, table)
+            for compact_id in struct.unpack_from(f'<{count}I', self.data, pos + 4)
+        ]
+        return ids, header, pos + 4 + 4 * count
+
+    def object_properties(self, space, oid):
+        """Decode the property set of an object into (property id, value) pairs"""
+        jcid, stp, cb, table = space.objects[oid]
+        stp, cb = self._chunk(stp, cb)
+        end = stp + cb
+        try:
+            oids, oid_header, pos = self._id_stream(stp, end, table)
+            osids = []
+            if not oid_header >> 31:
+                osids, osid_header, pos = self._id_stream(pos, end, table)
+                if (osid_header >> 30) & 1:
+                    _, _, pos = self._id_stream(pos, end, table)
+
+            properties, _ = self._property_set(pos, end, iter(oids), iter(osids))
+        except (struct.error, RecursionError) as e:
+            raise OneStoreError(f"{self.path}: bad property set at {stp:#x} ({e})") from e
+        return properties
+
+    def _property_set(self, pos, end, oids, osids):
+        count, = struct.unpack_from('<H', self.data, pos)
+        pos += 2 + 4 * count
+        if pos > end:
+            raise OneStoreError(f"{self.path}: bad property set at {pos:#x}")
+        prids = struct.unpack_from(f'<{count}I', self.data, pos - 4 * count)
+
+        properties = []
+        for prid in prids:
+            kind = (prid >> 26) & 0x1F
+            value = None
+            if kind in PROPERTY_SIZES:
+                pos += PROPERTY_SIZES[kind]
+            elif kind == PROPERTY_BYTES:
+                size, = struct.unpack_from('<I', self.data, pos)
+                value = (pos + 4, size)
+                pos += 4 + size
+            elif kind == PROPERTY_OBJECT_ID:
+                value = [next(oids, None)]
+            elif kind == PROPERTY_OBJECT_SPACE_ID:
+                value = [next(osids, None)]
+            elif kind in (PROPERTY_OBJECT_IDS, PROPERTY_OBJECT_SPACE_IDS, PROPERTY_CONTEXT_IDS):
+                size, = struct.unpack_from('<I', self.data, pos)
+                pos += 4
+                source = {PROPERTY_OBJECT_IDS: oids, PROPERTY_OBJECT_SPACE_IDS: osids}.get(kind)
+                value = list(islice(source, size)) if source else None
+            elif kind == PROPERTY_CONTEXT_ID:
+                pass
+            elif kind == PROPERTY_VALUES:
+                size, = struct.unpack_from('<I', self.data, pos)
+                pos += 4
+                value = []
+                if size:
+                    pos += 4
+                    for _ in range(size):
+                        nested, pos = self._property_set(pos, end, oids, osids)
+                        value.append(nested)
+            elif kind == PROPERTY_SET:
+                nested, pos = self._property_set(pos, end, oids, osids)
+                value = [nested]
+            else:
+                raise OneStoreError(f"{self.path}: unknown property type {kind:#x}")
+            if pos > end:
+                raise OneStoreError(f"{self.path}: property data past end of set at {pos:#x}")
+            properties.append((prid & 0x7FFFFFFF, value))
+        return properties, pos
+
+    def _text(self, prid, value):
+        offset, size = value
+        raw = self.data[offset:offset + size]
+        if prid == TEXT_EXTENDED_ASCII:
+            text = raw.decode('cp1252', errors='replace')
+        else:
+            text = raw.decode('utf-16-le', errors='replace')
+        return text.rstrip('\x00').translate(LINE_BREAKS)
+
+    # Text extraction
+
+    def _walk(self, space, oid, texts, space_refs):
+        """Depth-first walk from oid in property order, collecting text and space references"""
+        visited = {oid}
+        stack = [iter(self.object_properties(space, oid))]
+        while stack:
+            item = next(stack[-1], None)
+            if item is None:
+                stack.pop()
+                continue
+
+            prid, value = item
+            kind = (prid >> 26) & 0x1F
+            if prid in (RICH_EDIT_TEXT_UNICODE, TEXT_EXTENDED_ASCII):
+                texts.append(self._text(prid, value))
+            elif kind in (PROPERTY_OBJECT_ID, PROPERTY_OBJECT_IDS):
+                for child in reversed(value):
+                    if child in space.objects and child not in visited:
+                        visited.add(child)
+                        stack.append(iter(self.object_properties(space, child)))
+            elif kind in (PROPERTY_OBJECT_SPACE_ID, PROPERTY_OBJECT_SPACE_IDS):
+                space_refs.extend(gosid for gosid in value if gosid)
+            elif kind in (PROPERTY_VALUES, PROPERTY_SET):
+                for nested in reversed(value):
+                    stack.append(iter(nested))
+
+    def _page_order(self):
+        """Page object spaces in the order the section lists them"""
+        section = self.spaces.get(self.root_gosid)
+        space_refs = []
+        if section and ROOT_ROLE_CONTENT in section.roots:
+            root = section.roots[ROOT_ROLE_CONTENT]
+            if root in section.objects:
+                self._walk(section, root, [], space_refs)
+
+        ordered = [gosid for gosid in dict.fromkeys(space_refs) if gosid in self.spaces]
+        if not ordered:
+            ordered = [gosid for gosid in self.spaces if gosid != self.root_gosid]
+        return ordered
+
+    def page_title(self, space):
+        root = space.roots.get(ROOT_ROLE_METADATA)
+        if root in space.objects:
+            for prid, value in self.object_properties(space, root):
+                if prid in (CACHED_TITLE_STRING, CACHED_TITLE_STRING_FROM_PAGE):
+                    return self._text(prid, value).strip()
+        return ''
+
+    def page_text(self, space):
+        root = space.roots.get(ROOT_ROLE_CONTENT)
+        if root not in space.objects:
+            return ''
+        texts = []
+        self._walk(space, root, texts, [])
+        return '\n'.join(filter(None, (text.strip() for text in texts)))
+
+    def iter_pages(self, notebook=None):
+        """Yield page records shaped like the COM/PowerShell extractors' output"""
+        notebook = notebook if notebook is not None else self.path.parent.name
+        section = self.path.stem
+        for gosid in self._page_order():
+            space = self.spaces[gosid]
+            content = self.page_text(space)
+            if not content.strip():
+                continue
+            yield {
+                'notebook': notebook,
+                'section': section,
+                'page': self.page_title(space) or content.split('\n', 1)[0],
+                'content': content,
+                'page_id': format_extended_guid(gosid),
+            }
+
+
+def iter_offline_pages(path):
+    """Yield page records from a .one section file or a notebook folder of them"""
+    path = Path(path)
+    if path.is_dir():
+        sections = sorted(
+            section for section in path.rglob('*.one')
+            if 'OneNote_RecycleBin' not in section.parts
+        )
+        for section_path in sections:
+            with OneStoreReader(section_path) as reader:
+                yield from reader.iter_pages(notebook=path.name)
+    else:
+        with OneStoreReader(path) as reader:
+            yield from reader.iter_pages()
@@ -0,0 +1,710 @@
+"""
+Shared parsing helpers for the OneNote extractor scripts
+"""
+
+import hashlib
+import json
+import logging
+import re
+import time
+import xml.parsers.expat
+from collections import deque
+
+from onenote_metrics import metrics
+from onenote_records import Entry, PageText
+from onenote_rules import RulePackError, load_rule_pack
+
+logger = logging.getLogger(__name__)
+
+ONENOTE_NS = '{http://schemas.microsoft.com/office/onenote/2013/onenote}'
+# Element names as expat reports them with '}' as namespace separator
+ONENOTE_OE = ONENOTE_NS[1:] + 'OE'
+ONENOTE_T = ONENOTE_NS[1:] + 'T'
+# Characters of page XML handed to expat at a time
+PAGE_XML_FEED_SIZE = 1024 * 1024
+
+# Characters of page text sent to a worker process per task
+PARALLEL_BATCH_CHARS = 256 * 1024
+
+# Shared patterns that rule pack patterns refer to as {value}, {date} and {amount}
+FIELD_VALUE = r"([A-Za-z\s&,.'-]+)"
+DATE_PATTERN = r'\d{1,2}[/-]\d{1,2}[/-]\d{2,4}'
+AMOUNT_PATTERN = r'\$[\d,]+(?:\.\d{2})?'
+PATTERN_TEMPLATES = {'{value}': FIELD_VALUE, '{date}': DATE_PATTERN, '{amount}': AMOUNT_PATTERN}
+# Seconds of metadata matching per chunk before the optional fields are skipped
+CHUNK_BUDGET_SECONDS = 0.05
+# Letters IGNORECASE matches to i and s that str.lower() keeps (or, for
+# the dotted I, turns into two characters)
+IGNORECASE_FOLDS = str.maketrans({'\u0130': 'i', '\u0131': 'i', '\u017f': 's'})
+
+
+def lowercase(text):
+    """Lowercase text so a keyword is found where str.lower() or IGNORECASE would find it"""
+    if text.isascii():
+        return text.lower()
+    return text.translate(IGNORECASE_FOLDS).lower()
+
+
+class EntityScanner:
+    """Find business entity boundaries in a page in a single pass.
+
+    Behaves exactly like the original line-by-line loop: lines are stripped,
+    blank lines dropped, a chunk is closed before every entity line after the
+    first one, and text before the first entity is split once it grows past
+    ``orphan_limit`` characters. Chunks are sliced out of the normalized page
+    text by offset instead of being built up line by line.
+
+    ``markers`` must be line-local (they may not match across a newline), so
+    use ``[^\\S\\n]`` instead of ``\\s`` and guard character classes that
+    contain ``\\s`` with ``(?=[^\\n])``. Every marker must contain one of the
+    lowercase ``keywords``; the page is scanned for those literals first and
+    the markers only run on the lines where one shows up.
+    """
+
+    def __init__(self, markers, keywords, orphan_limit, min_length):
+        self.pattern = re.compile(
+            '|'.join(f'(?:{marker})' for marker in markers),
+            re.IGNORECASE | re.MULTILINE
+        )
+        literals = '|'.join(map(re.escape, keywords))
+        # Lowercased ASCII text lets the keyword scan run case-sensitively,
+        # which is several times faster than an IGNORECASE scan
+        self.keywords = re.compile(literals)
+        self.keywords_nocase = re.compile(literals, re.IGNORECASE)
+        self.orphan_limit = orphan_limit
+        self.min_length = min_length
+
+    @staticmethod
+    def normalize(content):
+        """Strip every line and drop the blank ones"""
+        return '\n'.join(filter(None, map(str.strip, content.split('\n'))))
+
+    def entity_lines(self, text):
+        """Yield the start offset of every line holding an entity marker"""
+        if text.isascii():
+            keyword_search = self.keywords.search
+            haystack = text.lower()
+        else:
+            keyword_search = self.keywords_nocase.search
+            haystack = text
+        marker_search = self.pattern.search
+        end = len(text)
+
+        pos = 0
+        while True:
+            hit = keyword_search(haystack, pos)
+            if not hit:
+                return
+            line_start = text.rfind('\n', 0, hit.start()) + 1
+            line_end = text.find('\n', hit.end())
+            if line_end == -1:
+                line_end = end
+            if marker_search(text, line_start, line_end):
+                yield line_start
+            pos = line_end + 1
+
+    def spans(self, text):
+        """Yield (start, end) offsets of every chunk in normalized text"""
+        end = len(text)
+        entity_lines = self.entity_lines(text)
+        first_entity = next(entity_lines, end)
+
+        # Text before the first entity is split once it gets too long
+        start = 0
+        while True:
+            split = text.find('\n', start + self.orphan_limit, first_entity)
+            if split == -1:
+                break
+            yield start, split
+            start = split + 1
+
+        # Every later entity line closes the chunk before it
+        for line_start in entity_lines:
+            yield start, line_start - 1
+            start = line_start
+
+        if start < end:
+            yield start, end
+
+    def page_text(self, content):
+        """Normalized page text.
+
+        It is content itself when normalizing leaves it unchanged, so
+        offsets into it don't keep a second copy of the page alive.
+        """
+        text = self.normalize(content)
+        return content if text == content else text
+
+    def text_spans(self, text):
+        """(start, end) offsets of the chunks of normalized text long enough to keep"""
+        min_length = self.min_length
+        return [
+            (start, end) for start, end in self.spans(text)
+            if end - start > min_length
+        ]
+
+    def chunk_spans(self, content):
+        """Normalized page text and the (start, end) offsets of its chunks"""
+        text = self.page_text(content)
+        return text, self.text_spans(text)
+
+    def chunk(self, content):
+        """Split page content into business entity chunks"""
+        text = self.normalize(content)
+        min_length = self.min_length
+        return [
+            text[start:end] for start, end in self.spans(text)
+            if end - start > min_length
+        ]
+
+
+class MatchRule:
+    """A compiled rule pack rule: keywords, an optional pattern and vetoes (see onenote_rules)"""
+
+    __slots__ = ('keywords', 'pattern', 'unless', 'needs_date', 'case_sensitive', 'search')
+
+    def __init__(self, keywords, pattern=None, unless=(), needs_date=False, case_sensitive=False,
+                 search=False):
+        self.keywords = tuple(keywords)
+        self.pattern = pattern and re.compile(pattern, 0 if case_sensitive else re.IGNORECASE)
+        self.unless = tuple(unless)
+        self.needs_date = needs_date
+        self.case_sensitive = case_sensitive
+        self.search = search
+
+    def holds(self, chunk, lower_chunk, lower, exact):
+        """The pattern's leftmost match (True without a pattern) if the rule holds, else None.
+
+        lower and exact hold the first offset (-1 if missing) of each
+        keyword looked up so far in the lowercased chunk and in the chunk
+        itself, so a keyword is searched for at most once per chunk.
+        """
+        if self.case_sensitive:
+            text, first = chunk, exact
+        else:
+            text, first = lower_chunk, lower
+        # The lookup is inlined; a call per keyword costs more than the find
+        for literal in self.unless:
+            pos = first.get(literal)
+            if pos is None:
+                pos = first[literal] = text.find(literal)
+            if pos != -1:
+                return None
+        pattern = self.pattern
+        if pattern is not None and not (self.case_sensitive or chunk.isascii()):
+            # IGNORECASE matches letters lower() keeps apart from the keywords
+            # (see lowercase), and offsets in the lowercased text may not line
+            # up, so the keywords can't gate the pattern here
+            return pattern.search(chunk)
+        if pattern is None or self.search:
+            for literal in self.keywords:
+                pos = first.get(literal)
+                if pos is None:
+                    pos = first[literal] = text.find(literal)
+                if pos != -1:
+                    return True if pattern is None else pattern.search(chunk)
+            return None
+
+        best = None
+        for literal in self.keywords:
+            pos = first.get(literal)
+            if pos is None:
+                pos = first[literal] = text.find(literal)
+            while pos != -1 and (best is None or pos < best.start()):
+                match = pattern.match(chunk, pos)
+                if match:
+                    best = match
+                    break
+                pos = text.find(literal, pos + 1)
+        return best
+
+
+class BusinessEntryExtractor:
+    """Validity check and metadata extraction for a chunk in one go.
+
+    The chunk is lowercased once, with str.lower() as the original ``in``
+    checks did, and dates are collected once, for both the acceptance rules
+    and the metadata. Rules are not searched across the chunk: each keyword
+    is looked up with ``str.find`` at most once per chunk, however many
+    rules use it, and patterns are only tried with ``match`` where their
+    keywords occur, so a rule or field on keywords the pack already has
+    costs no further pass over the chunk. With the built-in packs the result
+    is identical to the separate ``re.search`` calls of
+    ``is_valid_business_entry`` and ``extract_business_metadata``; on a
+    non-ASCII chunk, where IGNORECASE also matches letters such as the long
+    s that lower() keeps apart, pattern rules search the chunk instead.
+
+    ``fields`` is an ordered list of ``(field, [MatchRule, ...])``; the
+    rules of a field are tried in order. ``accept`` is the list of
+    acceptance rules and ``business_name`` an optional ``(field, pattern,
+    suffix, suffixes)`` fallback for a field no rule filled. rule_pack()
+    builds all of them from a rule pack.
+
+    Every acceptance rule needs one of its keywords, so page_entries first
+    looks for those literals in the page with ``str.find``: a page without
+    any (has_keyword) is dropped before it is even normalized, and chunks
+    without one (keyword_spans) are dropped without running a pattern.
+
+    Every pattern runs in linear time on any chunk, including pasted or
+    OCR'd text without line breaks. As a safety net, once building a chunk's
+    metadata has taken ``chunk_budget`` seconds of this thread's CPU time the
+    remaining fields are skipped and the chunk keeps what was found so far;
+    time spent waiting for the GIL or a busy machine doesn't count, so the
+    output doesn't depend on load.
+    """
+
+    def __init__(self, fields, accept, business_name=None, chunk_budget=CHUNK_BUDGET_SECONDS,
+                 rules_id=''):
+        self.fields = fields
+        self.dateless = [rule for rule in accept if not rule.needs_date]
+        self.dated = [rule for rule in accept if rule.needs_date]
+        # One of these occurs in every business entry (lowercase, then case-sensitive)
+        self.required_lower = tuple(sorted({literal for rule in accept if not rule.case_sensitive
+                                            for literal in rule.keywords}))
+        self.required_exact = tuple(sorted({literal for rule in accept if rule.case_sensitive
+                                            for literal in rule.keywords}))
+        self.business_name_field = None
+        if business_name:
+            field, pattern, suffix, suffixes = business_name
+            self.business_name_field = field
+            self.business_name_pattern = re.compile(pattern)
+            self.business_name_suffix = re.compile(suffix)
+            self.business_suffixes = MatchRule(suffixes, case_sensitive=True)
+        self.chunk_budget = chunk_budget
+        # Tells entries of this rule pack apart in the page cache
+        self.rules_id = rules_id
+        self.dates = re.compile(DATE_PATTERN)
+        self.amounts = re.compile(AMOUNT_PATTERN)
+
+    def has_keyword(self, content):
+        """Whether an acceptance rule keyword may occur anywhere in page content"""
+        lower_content = lowercase(content)
+        return (any(literal in lower_content for literal in self.required_lower)
+                or any(literal in content for literal in self.required_exact))
+
+    def keyword_spans(self, text, spans, skipped=None):
+        """The (start, end) spans of normalized page text that hold an acceptance rule keyword.
+
+        A chunk without one can't be a business entry. skipped, a list,
+        gets the length of every span left out.
+        """
+        lower_text = lowercase(text)
+        # Offsets in the lowercased text only line up if lowercasing keeps the length
+        aligned = len(lower_text) == len(text)
+        required_lower = self.required_lower
+        required_exact = self.required_exact
+        kept = []
+        for start, end in spans:
+            if aligned:
+                found = any(lower_text.find(literal, start, end) != -1 for literal in required_lower)
+            else:
+                lower_chunk = lowercase(text[start:end])
+                found = any(literal in lower_chunk for literal in required_lower)
+            if found or any(text.find(literal, start, end) != -1 for literal in required_exact):
+                kept.append((start, end))
+            elif skipped is not None:
+                skipped.append(end - start)
+        return kept
+
+    def has_business_suffix(self, chunk, lower_chunk, lower, exact):
+        """Cheap literal gate for the business name patterns"""
+        return self.business_suffixes.holds(chunk, lower_chunk, lower, exact)
+
+    def rejection(self, chunk, lower_chunk, lower, exact, dates):
+        """Why the chunk fails the acceptance rules, or None if it is a business entry"""
+        for rule in self.dateless:
+            if rule.holds(chunk, lower_chunk, lower, exact):
+                return None
+        if not dates:
+            return 'no_date'
+        for rule in self.dated:
+            if rule.holds(chunk, lower_chunk, lower, exact):
+                return None
+        return 'no_business_field'
+
+    def is_valid(self, chunk, lower_chunk, lower, exact, dates):
+        """Apply the business entry acceptance rules"""
+        return self.rejection(chunk, lower_chunk, lower, exact, dates) is None
+
+    def business_name(self, chunk):
+        """Leftmost run of capitalized words directly followed by a business suffix.
+
+        The single pattern ``(Word\\s+Word(?:\\s+Word)*)\\s*SUFFIX`` this
+        replaces retried every word of a long run of capitalized words,
+        which is quadratic. Only the end of a run can be followed by an
+        all-caps suffix, so each run is matched once and the suffix is
+        checked right after it, with the same result.
+        """
+        for run in self.business_name_pattern.finditer(chunk):
+            if self.business_name_suffix.match(chunk, run.end()):
+                return run.group()
+        return None
+
+    def build_metadata(self, chunk, lower_chunk, lower, exact, dates):
+        """Build the metadata dict in the same key order as before"""
+        metadata = {}
+        deadline = time.thread_time() + self.chunk_budget
+        over_budget = False
+
+        for field, rules in self.fields:
+            if time.thread_time() > deadline:
+                over_budget = True
+                break
+            for rule in rules:
+                match = rule.holds(chunk, lower_chunk, lower, exact)
+                if match:
+                    metadata[field] = match.group(1).strip()
+                    break
+
+        field = self.business_name_field
+        if field and field not in metadata and self.has_business_suffix(chunk, lower_chunk, lower, exact):
+            if over_budget or time.thread_time() > deadline:
+                over_budget = True
+            else:
+                name = self.business_name(chunk)
+                if name:
+                    metadata[field] = name.strip()
+
+        if over_budget:
+            logger.debug(f"Metadata budget of {self.chunk_budget}s used up on a "
+                         f"{len(chunk)} character chunk, skipped the remaining fields")
+            metrics.count('over_budget_chunks')
+
+        if dates:
+            metadata['dates'] = ', '.join(dates)
+            metadata['primary_date'] = dates[0]
+
+        amounts = self.amounts.findall(chunk)
+        if amounts:
+            metadata['amounts'] = ', '.join(amounts)
+
+        return metadata
+
+    def analyze(self, chunk):
+        """Return (is_valid, metadata); metadata is None for invalid chunks"""
+        lower_chunk = chunk.lower()
+        lower, exact = {}, {}
+        dates = self.dates.findall(chunk)
+        if not self.is_valid(chunk, lower_chunk, lower, exact, dates):
+            return False, None
+        return True, self.build_metadata(chunk, lower_chunk, lower, exact, dates)
+
+    def analyze_measured(self, chunk):
+        """analyze, recording validate and metadata time and rejections in metrics"""
+        start = time.perf_counter()
+        lower_chunk = chunk.lower()
+        lower, exact = {}, {}
+        dates = self.dates.findall(chunk)
+        reason = self.rejection(chunk, lower_chunk, lower, exact, dates)
+        checked = time.perf_counter()
+        metrics.add_time('validate', checked - start)
+        if reason is not None:
+            metrics.count(f'rejected_{reason}')
+            return False, None
+
+        metadata = self.build_metadata(chunk, lower_chunk, lower, exact, dates)
+        metrics.add_time('metadata', time.perf_counter() - checked)
+        return True, metadata
+
+    def metadata(self, chunk):
+        """Extract metadata without checking whether the chunk is valid"""
+        lower_chunk = chunk.lower()
+        return self.build_metadata(chunk, lower_chunk, {}, {},
+                                   self.dates.findall(chunk))
+
+
+def _expand(pattern):
+    """Substitute the shared patterns for their {name} in a rule pack pattern"""
+    for name, value in PATTERN_TEMPLATES.items():
+        pattern = pattern.replace(name, value)
+    return pattern
+
+
+def _match_rule(rule):
+    options = {key: value for key, value in rule.items() if key != 'pattern'}
+    return MatchRule(pattern=rule['pattern'] and _expand(rule['pattern']), **options)
+
+
+def compile_rule_pack(pack):
+    """The EntityScanner and BusinessEntryExtractor of a checked rule pack (see load_rule_pack)"""
+    entities = pack['entities']
+    business_name = pack.get('business_name')
+    try:
+        scanner = EntityScanner(entities['markers'], entities['keywords'],
+                                entities['orphan_limit'], entities['min_length'])
+        extractor = BusinessEntryExtractor(
+            fields=[(field['name'], [_match_rule(rule) for rule in field['rules']])
+                    for field in pack['fields']],
+            accept=[_match_rule(rule) for rule in pack['accept']],
+            business_name=business_name and (
+                business_name['field'], _expand(business_name['pattern']),
+                _expand(business_name['suffix']), business_name['suffixes']
+            ),
+            rules_id=hashlib.sha1(json.dumps(pack, sort_keys=True).encode('utf-8')).hexdigest()[:12],
+        )
+    except re.error as e:
+        raise RulePackError(f"bad pattern {e.pattern!r}: {e}") from e
+    for field, rules in extractor.fields:
+        if any(rule.pattern.groups < 1 for rule in rules):
+            raise RulePackError(f"the patterns of field {field!r} need a group for its value")
+    return scanner, extractor
+
+
+# Compiled rule packs by name or path
+_rule_packs = {}
+
+
+def rule_pack(name):
+    """(scanner, extractor) of a built-in rule pack name or a rule pack file, compiled once"""
+    if name not in _rule_packs:
+        _rule_packs[name] = compile_rule_pack(load_rule_pack(name))
+    return _rule_packs[name]
+
+
+# Rules of onenote_extractor.py (COM automation)
+com_scanner, com_extractor = rule_pack('com')
+
+# Rules of the PowerShell extractors (_fixed and _simple)
+powershell_scanner, powershell_extractor = rule_pack('powershell')
+
+
+def extract_text_from_page_xml(page_xml):
+    """Extract plain text from OneNote page XML.
+
+    Streams the page through expat instead of building a tree, so embedded
+    images and ink add parse time but no memory. Every T element is visited
+    once, in outline order, one line per T, indented with a tab per OE
+    nesting level below the top.
+    """
+    parser = xml.parsers.expat.ParserCreate(namespace_separator='}')
+    parser.buffer_text = True
+    lines = []
+    text = []
+    depth = 0
+    in_text = False
+
+    def start(name, attributes):
+        nonlocal depth, in_text
+        if name == ONENOTE_OE:
+            depth += 1
+        elif name == ONENOTE_T:
+            in_text = True
+
+    def end(name):
+        nonlocal depth, in_text
+        if name == ONENOTE_OE:
+            depth -= 1
+        elif name == ONENOTE_T:
+            in_text = False
+            line = ''.join(text).strip()
+            text.clear()
+            if line:
+                lines.append('\t' * max(depth - 1, 0) + line)
+
+    def characters(data):
+        if in_text:
+            text.append(data)
+
+    parser.StartElementHandler = start
+    parser.EndElementHandler = end
+    parser.CharacterDataHandler = characters
+
+    try:
+        for offset in range(0, len(page_xml), PAGE_XML_FEED_SIZE):
+            parser.Parse(page_xml[offset:offset + PAGE_XML_FEED_SIZE], False)
+        parser.Parse('', True)
+    except Exception as e:
+        logger.warning(f"Error parsing page XML: {e}")
+        return ""
+
+    return '\n'.join(lines)
+
+
+def page_entries(page_data, scanner, extractor):
+    """Entries of one page as Entry records; their source is set by _with_source"""
+    content = page_data.get('content', '')
+    if not content.strip():
+        return []
+
+    if metrics.enabled:
+        return _measured_page_entries(content, scanner, extractor)
+
+    if not extractor.has_keyword(content):
+        return []
+    text = scanner.page_text(content)
+    source = PageText(text, extractor.dates, extractor.amounts)
+    entries = []
+    for start, end in extractor.keyword_spans(text, scanner.text_spans(text)):
+        is_valid, metadata = extractor.analyze(text[start:end])
+        if is_valid:
+            entries.append(Entry(source, start, end, metadata))
+    return entries
+
+
+def _measured_page_entries(content, scanner, extractor):
+    start_time = time.perf_counter()
+    has_keyword = extractor.has_keyword(content)
+    checked = time.perf_counter()
+    metrics.add_time('prefilter', checked - start_time)
+    if not has_keyword:
+        metrics.count('prefiltered_pages')
+        metrics.count('prefiltered_chars', len(content))
+        return []
+
+    text = scanner.page_text(content)
+    spans = scanner.text_spans(text)
+    start_time = time.perf_counter()
+    metrics.add_time('chunk', start_time - checked)
+    metrics.count('chunks', len(spans))
+
+    skipped = []
+    spans = extractor.keyword_spans(text, spans, skipped)
+    metrics.add_time('prefilter', time.perf_counter() - start_time, calls=0)
+    if skipped:
+        metrics.count('prefiltered_chunks', len(skipped))
+        metrics.count('prefiltered_chars', sum(skipped))
+
+    source = PageText(text, extractor.dates, extractor.amounts)
+    entries = []
+    for start, end in spans:
+        is_valid, metadata = extractor.analyze_measured(text[start:end])
+        if is_valid:
+            entries.append(Entry(source, start, end, metadata))
+    metrics.count('entries', len(entries))
+    return entries
+
+
+def _with_source(page_data, entries):
+    """The page's entries as Entry records naming the page they came from"""
+    if not entries:
+        return []
+    if not isinstance(entries[0], Entry):
+        # Served from a PageCache, which keeps plain dicts
+        entries = Entry.from_dicts(entries)
+    for source in {id(entry.source): entry.source for entry in entries}.values():
+        source.set_source(page_data)
+    return entries
+
+
+def _cached_or_parsed(page_data, entries, cache, stats):
+    """Count cache hits and store freshly parsed pages that carry a lastModifiedTime"""
+    if 'entries' in page_data:
+        if stats is not None:
+            stats['cached_pages'] += 1
+        if metrics.enabled:
+            metrics.count('cached_pages')
+    elif cache is not None and page_data.get('last_modified'):
+        cache.store(page_data['page_id'], page_data['last_modified'],
+                    page_data.get('content', ''), [entry.page_dict() for entry in entries])
+    return entries
+
+
+def iter_business_entries(pages, scanner, extractor, stats=None, workers=1, cache=None):
+    """Lazily turn page records into business entries (Entry records, see onenote_records).
+
+    Pages are consumed one at a time, so only the current page and its chunks
+    are held in memory. ``stats`` (a Counter) counts the pages seen. With
+    ``workers`` > 1 pages are parsed in a process pool instead, see
+    iter_business_entries_parallel.
+
+    Pages that already carry ``entries`` (served from a PageCache) are not
+    parsed again; other pages are stored in ``cache`` once parsed.
+    """
+    if workers > 1:
+        yield from iter_business_entries_parallel(pages, scanner, extractor, workers, stats,
+                                                  cache=cache)
+        return
+
+    for page_data, entries in iter_page_entries(pages, scanner, extractor, stats, cache):
+        yield from entries
+
+
+def iter_page_entries(pages, scanner, extractor, stats=None, cache=None):
+    """Yield (page record, list of its business entries) one page at a time.
+
+    Same parsing, stats and caching as iter_business_entries, for callers
+    that report results page by page.
+    """
+    for page_data in pages:
+        if stats is not None:
+            stats['pages'] += 1
+        if metrics.enabled:
+            metrics.count('pages')
+
+        entries = page_data.get('entries')
+        if entries is None:
+            entries = page_entries(page_data, scanner, extractor)
+        yield page_data, _with_source(page_data, _cached_or_parsed(page_data, entries, cache, stats))
+
+
+# Scanner and extractor of a parse worker process, set once per process
+_worker_rules = None
+
+
+def _init_parse_worker(scanner, extractor, measure=False):
+    global _worker_rules
+    _worker_rules = (scanner, extractor)
+    # Forked workers start with a copy of the parent's numbers
+    metrics.reset()
+    metrics.enabled = measure
+
+
+def _parse_page_batch(pages):
+    """Entries per page, and the batch's metrics when they are being recorded"""
+    results = [
+        page_data['entries'] if 'entries' in page_data else page_entries(page_data, *_worker_rules)
+        for page_data in pages
+    ]
+    if not metrics.enabled:
+        return results, None
+    snapshot = metrics.snapshot()
+    metrics.reset()
+    return results, snapshot
+
+
+def _page_batches(pages, batch_chars, stats):
+    """Group pages into batches of roughly batch_chars characters"""
+    batch = []
+    size = 0
+    for page_data in pages:
+        if stats is not None:
+            stats['pages'] += 1
+        if metrics.enabled:
+            metrics.count('pages')
+        batch.append(page_data)
+        size += len(page_data.get('content', ''))
+        if size >= batch_chars:
+            yield batch
+            batch = []
+            size = 0
+    if batch:
+        yield batch
+
+
+def iter_business_entries_parallel(pages, scanner, extractor, workers, stats=None,
+                                   batch_chars=PARALLEL_BATCH_CHARS, cache=None):
+    """Like iter_business_entries, but parse batches of pages in worker processes.
+
+    The scanner and extractor are sent to each worker once, then only page
+    batches and their entries cross process boundaries. Batches are consumed
+    in submission order, so the output is identical to the serial path, and
+    at most two batches per worker are in flight to keep memory bounded.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    def finish(batch, future):
+        results, snapshot = future.result()
+        if snapshot is not None:
+            metrics.merge(snapshot)
+        for page_data, entries in zip(batch, results):
+            yield from _with_source(page_data, _cached_or_parsed(page_data, entries, cache, stats))
+
+    with ProcessPoolExecutor(workers, initializer=_init_parse_worker,
+                             initargs=(scanner, extractor, metrics.enabled)) as pool:
+        pending = deque()
+        for batch in _page_batches(pages, batch_chars, stats):
+            pending.append((batch, pool.submit(_parse_page_batch, batch)))
+            if len(pending) >= workers * 2:
+                yield from finish(*pending.popleft())
+        while pending:
+            yield from finish(*pending.popleft())
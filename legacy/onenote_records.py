@@ -0,0 +1,187 @@
+"""
+Compact business entry records
+
+A page's entries used to be separate dicts, each with its own copy of the
+notebook, section and page names and of its chunk of the page text. An
+Entry instead has fixed slots, points at a PageText shared by every entry of
+the page, and keeps only the offsets of its chunk in that text. Source names
+and the underwriter, company and broker values are interned, and dates,
+primary_date and amounts are found again in the chunk when they are read
+rather than stored, since they are plain pattern matches over it.
+
+Entries behave as mutable mappings with the same keys in the same order as
+the dicts they replace, so later stages use them unchanged; to_dict() gives
+the old dict. Keys added later (duplicates, normalized columns) are kept in
+a small per-entry dict.
+"""
+
+import sys
+from collections.abc import MutableMapping
+
+SOURCE_KEYS = ('source_notebook', 'source_section', 'source_page')
+NAME_FIELDS = ('underwriter', 'company', 'broker')
+# Metadata read back from the chunk with the page's date and amount patterns
+MATCHED_FIELDS = ('dates', 'primary_date', 'amounts')
+
+# One (keys, extra keys) pair per distinct order of metadata keys
+_field_orders = {}
+
+
+def _field_order(metadata):
+    keys = tuple(metadata)
+    order = _field_orders.get(keys)
+    if order is None:
+        extra = tuple(key for key in keys if key not in NAME_FIELDS and key not in MATCHED_FIELDS)
+        order = _field_orders[keys] = (keys, extra)
+    return order
+
+
+class PageText:
+    """Normalized text of one page and the page it came from, shared by its entries.
+
+    ``dates`` and ``amounts`` are the compiled patterns that found the
+    entries' dates and amounts, or None when the entries store them.
+    """
+
+    __slots__ = ('text', 'notebook', 'section', 'page', 'page_id', 'dates', 'amounts')
+
+    def __init__(self, text, dates=None, amounts=None):
+        self.text = text
+        self.notebook = self.section = self.page = self.page_id = ''
+        self.dates = dates
+        self.amounts = amounts
+
+    def set_source(self, page_data):
+        self.notebook = sys.intern(page_data.get('notebook', ''))
+        self.section = sys.intern(page_data.get('section', ''))
+        self.page = sys.intern(page_data.get('page', ''))
+        self.page_id = page_data.get('page_id') or ''
+
+
+class Entry(MutableMapping):
+    """One business entry: a chunk of a PageText by offset, plus its metadata"""
+
+    __slots__ = ('source', 'start', 'end', 'fields', 'extra') + NAME_FIELDS
+
+    def __init__(self, source, start, end, metadata):
+        self.source = source
+        self.start = start
+        self.end = end
+        self.fields, extra_keys = _field_order(metadata)
+        underwriter = metadata.get('underwriter')
+        self.underwriter = underwriter and sys.intern(underwriter)
+        company = metadata.get('company')
+        self.company = company and sys.intern(company)
+        broker = metadata.get('broker')
+        self.broker = broker and sys.intern(broker)
+        self.extra = {key: metadata[key] for key in extra_keys} if extra_keys else None
+
+    @classmethod
+    def from_dicts(cls, entries):
+        """Entries for a page's entry dicts (raw_content and metadata), sharing one PageText"""
+        raws = [entry.get('raw_content', '') for entry in entries]
+        source = PageText('\n'.join(raws))
+        records = []
+        start = 0
+        for raw, entry in zip(raws, entries):
+            metadata = {key: value for key, value in entry.items() if key != 'raw_content'}
+            record = cls(source, start, start + len(raw), metadata)
+            # Without the patterns the stored matches are kept as they are
+            for key in MATCHED_FIELDS:
+                if key in metadata:
+                    record[key] = metadata[key]
+            records.append(record)
+            start += len(raw) + 1
+        return records
+
+    @property
+    def raw_content(self):
+        return self.source.text[self.start:self.end]
+
+    def _matched(self, key):
+        source = self.source
+        chunk = source.text[self.start:self.end]
+        if key == 'amounts':
+            return ', '.join(source.amounts.findall(chunk))
+        dates = source.dates.findall(chunk)
+        return ', '.join(dates) if key == 'dates' else dates[0]
+
+    def get(self, key, default=None):
+        if key in self.fields:
+            if key in NAME_FIELDS:
+                return getattr(self, key)
+            if self.extra and key in self.extra:
+                return self.extra[key]
+            return self._matched(key)
+        if key == 'raw_content':
+            return self.source.text[self.start:self.end]
+        if key in SOURCE_KEYS:
+            source = self.source
+            return (source.notebook if key == 'source_notebook'
+                    else source.section if key == 'source_section' else source.page)
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        return default
+
+    def __getitem__(self, key):
+        value = self.get(key, self)
+        if value is self:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        if key in SOURCE_KEYS or key == 'raw_content' or key in NAME_FIELDS and key in self.fields:
+            raise TypeError(f"{key!r} of a parsed entry can't be changed")
+        if self.extra is None:
+            self.extra = {}
+        self.extra[key] = value
+
+    def __delitem__(self, key):
+        if key in self.fields or not (self.extra and key in self.extra):
+            raise KeyError(key)
+        del self.extra[key]
+
+    def __iter__(self):
+        yield from SOURCE_KEYS
+        yield 'raw_content'
+        yield from self.fields
+        if self.extra:
+            for key in self.extra:
+                if key not in self.fields:
+                    yield key
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f"Entry({self.to_dict()!r})"
+
+    def to_dict(self, with_source=True):
+        """The entry as the dict it stands for, in the same key order"""
+        source = self.source
+        if with_source:
+            entry = {'source_notebook': source.notebook, 'source_section': source.section,
+                     'source_page': source.page}
+        else:
+            entry = {}
+        chunk = entry['raw_content'] = source.text[self.start:self.end]
+        extra = self.extra or {}
+        dates = None
+        for key in self.fields:
+            if key in NAME_FIELDS:
+                entry[key] = getattr(self, key)
+            elif key in extra:
+                entry[key] = extra[key]
+            elif key == 'amounts':
+                entry[key] = ', '.join(source.amounts.findall(chunk))
+            else:
+                if dates is None:
+                    dates = source.dates.findall(chunk)
+                entry[key] = ', '.join(dates) if key == 'dates' else dates[0]
+        if extra:
+            entry.update(extra)
+        return entry
+
+    def page_dict(self):
+        """raw_content and metadata without the source columns, as cached per page"""
+        return self.to_dict(with_source=False)
@@ -0,0 +1,153 @@
+"""
+Declarative rule packs for the business entry parser
+
+A rule pack is a JSON file (or YAML, with PyYAML installed) holding the
+entity markers, acceptance rules and field patterns that an EntityScanner
+and a BusinessEntryExtractor are compiled from (onenote_parsing.rule_pack).
+rules/com.json has the rules of onenote_extractor.py, rules/powershell.json
+those of the PowerShell scripts; a pack is given by one of those names or
+by its path.
+
+    {
+      "entities": {"markers": [regex, ...], "keywords": [literal, ...],
+                   "orphan_limit": 1000, "min_length": 50},
+      "accept": [rule, ...],
+      "fields": [{"name": "underwriter", "rules": [rule, ...]}, ...],
+      "business_name": {"field": "company", "pattern": regex, "suffix": regex,
+                        "suffixes": [literal, ...]}
+    }
+
+A rule is {"keywords": [...], "pattern": regex, "unless": [...],
+"needs_date": false, "case_sensitive": false, "search": false}; everything
+but keywords is optional. It holds when one of its keywords occurs in the
+chunk, none of ``unless`` does and the pattern, if any, matches. Keywords
+are literals within a line that don't start or end with a space, lowercase
+unless case_sensitive is set. The pattern is only tried with ``match``
+where one of the keywords occurs, so it has to start with one; with search
+set the keywords just gate a search of the chunk.
+
+A chunk is a business entry when one of the accept rules holds; rules with
+needs_date also need a date in the chunk. A field takes group 1 of the
+first of its rules that holds. ``{value}``, ``{date}`` and ``{amount}`` in
+a pattern stand for the shared field value, date and amount patterns.
+"""
+
+import json
+from pathlib import Path
+
+RULES_DIR = Path(__file__).resolve().parent / 'rules'
+BUILTIN_PACKS = ('com', 'powershell')
+
+# Everything a rule may leave out
+RULE_DEFAULTS = {'pattern': None, 'unless': [], 'needs_date': False, 'case_sensitive': False, 'search': False}
+
+
+class RulePackError(ValueError):
+    """The rule pack is not a valid set of parsing rules"""
+
+
+def pack_path(name):
+    """File of a built-in pack name; any other name is a path"""
+    if name in BUILTIN_PACKS:
+        return RULES_DIR / f'{name}.json'
+    return Path(name)
+
+
+def load_rule_pack(name):
+    """Read and check a rule pack, returning it with every rule's defaults filled in"""
+    path = pack_path(name)
+    with open(path, encoding='utf-8') as f:
+        if path.suffix.lower() in ('.yaml', '.yml'):
+            try:
+                import yaml
+            except ImportError:
+                raise RulePackError(f"{path}: YAML rule packs need PyYAML (pip install pyyaml)") from None
+            try:
+                pack = yaml.safe_load(f)
+            except yaml.YAMLError as e:
+                raise RulePackError(f"{path}: {e}") from e
+        else:
+            try:
+                pack = json.load(f)
+            except ValueError as e:
+                raise RulePackError(f"{path}: {e}") from e
+    return check_rule_pack(pack, path)
+
+
+def _strings(value, where, lowercase=False, empty=False):
+    if (not isinstance(value, list) or not (value or empty)
+            or not all(isinstance(item, str) and item for item in value)):
+        raise RulePackError(f"{where} must be a list of strings")
+    if lowercase and any(item != item.lower() for item in value):
+        raise RulePackError(f"{where} must be lowercase")
+    return value
+
+
+def _rule(rule, where, needs_pattern=False):
+    if not isinstance(rule, dict):
+        raise RulePackError(f"{where} must be an object")
+    unknown = rule.keys() - RULE_DEFAULTS.keys() - {'keywords'}
+    if unknown:
+        raise RulePackError(f"{where}: unknown keys {', '.join(sorted(unknown))}")
+    rule = {**RULE_DEFAULTS, **rule}
+    for key in ('needs_date', 'case_sensitive', 'search'):
+        if not isinstance(rule[key], bool):
+            raise RulePackError(f"{where}.{key} must be true or false")
+    keywords = _strings(rule.get('keywords'), f"{where}.keywords", lowercase=not rule['case_sensitive'])
+    # The prefilter looks for keywords in the page before its lines are
+    # stripped, and its chunks end at line breaks
+    if any(keyword != keyword.strip() or '\n' in keyword for keyword in keywords):
+        raise RulePackError(f"{where}.keywords can't span lines or start or end with a space")
+    _strings(rule['unless'], f"{where}.unless", lowercase=not rule['case_sensitive'], empty=True)
+    if rule['pattern'] is None:
+        if needs_pattern or rule['search']:
+            raise RulePackError(f"{where} needs a pattern")
+    elif not isinstance(rule['pattern'], str):
+        raise RulePackError(f"{where}.pattern must be a string")
+    return rule
+
+
+def check_rule_pack(pack, source='rule pack'):
+    """The pack with rule defaults filled in; raises RulePackError on a mistake"""
+    if not isinstance(pack, dict):
+        raise RulePackError(f"{source}: must be an object")
+    entities = pack.get('entities')
+    if not isinstance(entities, dict):
+        raise RulePackError(f"{source}: entities must be an object")
+    _strings(entities.get('markers'), f"{source}: entities.markers")
+    _strings(entities.get('keywords'), f"{source}: entities.keywords", lowercase=True)
+    for key in ('orphan_limit', 'min_length'):
+        if not isinstance(entities.get(key), int):
+            raise RulePackError(f"{source}: entities.{key} must be a number")
+
+    accept = pack.get('accept')
+    if not isinstance(accept, list) or not accept:
+        raise RulePackError(f"{source}: accept must be a list of rules")
+    accept = [_rule(rule, f"{source}: accept[{i}]") for i, rule in enumerate(accept)]
+
+    fields = pack.get('fields', [])
+    if not isinstance(fields, list):
+        raise RulePackError(f"{source}: fields must be a list")
+    checked = []
+    for i, field in enumerate(fields):
+        where = f"{source}: fields[{i}]"
+        if not isinstance(field, dict) or not isinstance(field.get('name'), str) or not field['name']:
+            raise RulePackError(f"{where} needs a name")
+        rules = field.get('rules')
+        if not isinstance(rules, list) or not rules:
+            raise RulePackError(f"{where}.rules must be a list of rules")
+        checked.append({'name': field['name'], 'rules': [
+            _rule(rule, f"{where}.rules[{j}]", needs_pattern=True) for j, rule in enumerate(rules)
+        ]})
+
+    business_name = pack.get('business_name')
+    if business_name is not None:
+        where = f"{source}: business_name"
+        if not isinstance(business_name, dict):
+            raise RulePackError(f"{where} must be an object")
+        for key in ('field', 'pattern', 'suffix'):
+            if not isinstance(business_name.get(key), str) or not business_name[key]:
+                raise RulePackError(f"{where}.{key} must be a string")
+        _strings(business_name.get('suffixes'), f"{where}.suffixes")
+
+    return {**pack, 'accept': accept, 'fields': checked}
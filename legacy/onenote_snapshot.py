@@ -0,0 +1,172 @@
+"""
+Hierarchy snapshots for extracting only what changed since the last run
+
+A HierarchySnapshot keeps the ID, lastModifiedTime and names of every page
+of the last hierarchy walk in SQLite. diff() compares a new walk with it by
+page ID, so only pages added or changed since are fetched and parsed; pages
+that are gone are collected in ``deleted`` and written out as tombstones,
+one entry per page with change = 'deleted'. Every entry gets page_id and
+change columns (CHANGE_FIELDS), so a run's output is the delta since the
+previous one: a consumer replaces all rows of each page_id in it. A changed
+page that no longer has any rows in the output (kept), whether it has no
+entries left or --dedupe merged them all into other pages' entries, gets
+one row with change = 'changed' and empty raw_content (cleared), so its
+old rows are dropped too.
+
+The new walk only replaces the snapshot when save() is called after the
+output was written, and pages whose fetch failed keep the version they had,
+so an interrupted or failed run picks them up again. Snapshots are kept per
+scope, the hierarchy node the walk started from ('' for all open notebooks).
+"""
+
+import sqlite3
+
+CHANGE_FIELDS = ['page_id', 'change']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    scope TEXT NOT NULL,
+    page_id TEXT NOT NULL,
+    last_modified TEXT NOT NULL,
+    notebook TEXT NOT NULL,
+    section TEXT NOT NULL,
+    page TEXT NOT NULL,
+    PRIMARY KEY (scope, page_id)
+);
+CREATE TEMP TABLE walked (
+    scope TEXT NOT NULL,
+    page_id TEXT NOT NULL,
+    last_modified TEXT NOT NULL,
+    notebook TEXT NOT NULL,
+    section TEXT NOT NULL,
+    page TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (scope, page_id)
+);
+CREATE TEMP TABLE failed (page_id TEXT PRIMARY KEY);
+"""
+
+
+class HierarchySnapshot:
+    """The pages of the previous hierarchy walk, to diff a new walk against"""
+
+    def __init__(self, path):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.executescript(SCHEMA)
+        self.scopes = []
+        # Pages in the walks diffed so far, and 'added' or 'changed' by page ID
+        self.pages = 0
+        self.changes = {}
+        self.deleted = []
+        # Pages that kept() passed rows of, and how many changed ones it saw none of
+        self.kept_pages = set()
+        self.cleared_pages = 0
+
+    def diff(self, records, scope=''):
+        """The page records of a new walk that were added or changed, in walk order.
+
+        A page without a lastModifiedTime always counts as changed. Pages of
+        the scope's snapshot that are missing from the walk go to ``deleted``.
+        """
+        records = [record for record in records if record.get('page_id')]
+        self.db.executemany(
+            'INSERT OR REPLACE INTO walked VALUES (?, ?, ?, ?, ?, ?, ?)',
+            [(scope, record['page_id'], record.get('last_modified') or '', record.get('notebook', ''),
+              record.get('section', ''), record.get('page', ''), position)
+             for position, record in enumerate(records)]
+        )
+        self.scopes.append(scope)
+        self.pages += len(records)
+
+        rows = self.db.execute(
+            'SELECT w.position, p.page_id IS NULL FROM walked w '
+            'LEFT JOIN pages p ON p.scope = w.scope AND p.page_id = w.page_id '
+            "WHERE w.scope = ? AND (p.page_id IS NULL OR w.last_modified = '' "
+            'OR p.last_modified != w.last_modified) '
+            'ORDER BY w.position', (scope,)
+        ).fetchall()
+        self.deleted.extend(self.db.execute(
+            'SELECT page_id, notebook, section, page FROM pages p WHERE scope = ? AND NOT EXISTS '
+            '(SELECT 1 FROM walked w WHERE w.scope = p.scope AND w.page_id = p.page_id)', (scope,)
+        ))
+
+        changed = []
+        for position, added in rows:
+            record = records[position]
+            self.changes[record['page_id']] = 'added' if added else 'changed'
+            changed.append(record)
+        return changed
+
+    def fetch_failed(self, page_id):
+        """Keep the page's snapshot version, so the next run fetches it again"""
+        self.db.execute('INSERT OR IGNORE INTO failed VALUES (?)', (page_id,))
+
+    def label(self, entries):
+        """Pass Entry records through with their page_id and change columns set"""
+        for entry in entries:
+            page_id = entry.source.page_id
+            entry['page_id'] = page_id
+            entry['change'] = self.changes.get(page_id, 'changed')
+            yield entry
+
+    def kept(self, entries):
+        """Pass labelled entries through as they are written, noting the pages they belong to.
+
+        Put after anything that drops or merges entries, so cleared() knows
+        which changed pages have no row left.
+        """
+        for entry in entries:
+            self.kept_pages.add(entry['page_id'])
+            yield entry
+
+    def cleared(self):
+        """An entry dict per changed page that kept() saw no entries of, once it is done.
+
+        It has no content and change = 'changed', so the page's old rows are
+        replaced by nothing. Pages whose fetch failed are left out.
+        """
+        failed = {page_id for page_id, in self.db.execute('SELECT page_id FROM failed')}
+        emptied = [page_id for page_id, change in self.changes.items()
+                   if change == 'changed' and page_id not in self.kept_pages and page_id not in failed]
+        self.cleared_pages = len(emptied)
+        for page_id in emptied:
+            notebook, section, page = self.db.execute(
+                'SELECT notebook, section, page FROM walked WHERE page_id = ?', (page_id,)
+            ).fetchone()
+            yield {
+                'source_notebook': notebook, 'source_section': section, 'source_page': page,
+                'raw_content': '', 'page_id': page_id, 'change': 'changed',
+            }
+
+    def tombstones(self):
+        """An entry dict per deleted page, with no content and change = 'deleted'"""
+        for page_id, notebook, section, page in self.deleted:
+            yield {
+                'source_notebook': notebook, 'source_section': section, 'source_page': page,
+                'raw_content': '', 'page_id': page_id, 'change': 'deleted',
+            }
+
+    def save(self):
+        """Make the walks diffed so far the snapshot of their scopes"""
+        for scope in self.scopes:
+            self.db.execute(
+                'DELETE FROM pages WHERE scope = ? AND page_id NOT IN '
+                '(SELECT page_id FROM walked WHERE scope = ?)', (scope, scope)
+            )
+        self.db.execute(
+            'INSERT OR REPLACE INTO pages '
+            'SELECT scope, page_id, last_modified, notebook, section, page FROM walked '
+            'WHERE page_id NOT IN (SELECT page_id FROM failed)'
+        )
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,208 @@
+"""
+Streaming output writers for extracted business entries
+"""
+
+import datetime
+import json
+import time
+from collections import Counter
+
+from onenote_metrics import metrics
+
+# Every key an entry can have, in the order the old DataFrame usually had them
+ENTRY_COLUMNS = [
+    'source_notebook', 'source_section', 'source_page', 'raw_content',
+    'underwriter', 'company', 'broker', 'dates', 'primary_date', 'amounts',
+]
+
+# Low-cardinality columns stored as dictionary indices in Parquet
+DICTIONARY_COLUMNS = ('source_notebook', 'source_section', 'underwriter')
+# Parquet types of the columns that don't hold text, by pyarrow type name
+COLUMN_TYPES = {
+    'duplicates': 'int64',
+    'first_date': 'date32', 'latest_date': 'date32', 'date_count': 'int64',
+    'amount_total': 'float64', 'amount_max': 'float64', 'amount_count': 'int64',
+}
+PARQUET_ROW_GROUP_SIZE = 64 * 1024
+
+
+def _json_default(value):
+    # Typed columns from onenote_normalize; everything else is already JSON
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class JsonArrayWriter:
+    """Write entries as an indented JSON array, one element at a time.
+
+    The file is byte-for-byte what ``json.dump(entries, f, indent=2,
+    ensure_ascii=False)`` produced, without holding the list in memory.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'w', encoding='utf-8')
+        self.count = 0
+
+    def write(self, entry):
+        element = json.dumps(entry, indent=2, ensure_ascii=False,
+                             default=_json_default).replace('\n', '\n  ')
+        self.file.write(('[\n  ' if not self.count else ',\n  ') + element)
+        self.count += 1
+
+    def close(self):
+        self.file.write('\n]' if self.count else '[]')
+        self.file.close()
+
+
+class ExcelStreamWriter:
+    """Write entries to xlsx with openpyxl's constant-memory write-only mode"""
+
+    def __init__(self, path, columns=ENTRY_COLUMNS):
+        from openpyxl import Workbook
+
+        self.path = path
+        self.columns = columns
+        self.workbook = Workbook(write_only=True)
+        self.sheet = self.workbook.create_sheet('Sheet1')
+        self.sheet.append(columns)
+        self.count = 0
+
+    def write(self, entry):
+        self.sheet.append([entry.get(column) for column in self.columns])
+        self.count += 1
+
+    def close(self):
+        self.workbook.save(self.path)
+
+
+class ParquetStreamWriter:
+    """Write entries to Parquet, one row group per row_group_size entries.
+
+    Every column is a nullable string unless COLUMN_TYPES says otherwise;
+    DICTIONARY_COLUMNS are dictionary-encoded so readers get them back as
+    categoricals.
+    """
+
+    def __init__(self, path, columns=ENTRY_COLUMNS, row_group_size=PARQUET_ROW_GROUP_SIZE,
+                 dictionary_columns=DICTIONARY_COLUMNS):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.pa = pa
+        self.path = path
+        self.columns = columns
+        self.row_group_size = row_group_size
+        self.dictionary_columns = set(dictionary_columns)
+        self.schema = pa.schema([
+            pa.field(column, pa.dictionary(pa.int32(), pa.string())
+                     if column in self.dictionary_columns
+                     else getattr(pa, COLUMN_TYPES.get(column, 'string'))())
+            for column in columns
+        ])
+        self.writer = pq.ParquetWriter(path, self.schema)
+        self.buffer = {column: [] for column in columns}
+        self.buffered = 0
+        self.count = 0
+
+    def write(self, entry):
+        for column, values in self.buffer.items():
+            values.append(entry.get(column))
+        self.buffered += 1
+        self.count += 1
+        if self.buffered >= self.row_group_size:
+            self.flush()
+
+    def flush(self):
+        if not self.buffered:
+            return
+        arrays = []
+        for field, values in zip(self.schema, self.buffer.values()):
+            if field.name in self.dictionary_columns:
+                array = self.pa.array(values, type=self.pa.string()).dictionary_encode()
+            else:
+                array = self.pa.array(values, type=field.type)
+            arrays.append(array)
+            values.clear()
+        self.writer.write_table(self.pa.Table.from_arrays(arrays, schema=self.schema))
+        self.buffered = 0
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+
+def parquet_to_xlsx(parquet_path, xlsx_path, columns=ENTRY_COLUMNS):
+    """Convert a Parquet file of entries to xlsx, one record batch at a time"""
+    import pyarrow.parquet as pq
+
+    excel = ExcelStreamWriter(xlsx_path, columns)
+    try:
+        for batch in pq.ParquetFile(parquet_path).iter_batches(columns=columns):
+            for entry in batch.to_pylist():
+                excel.write(entry)
+    finally:
+        excel.close()
+
+
+# Output formats the extractor scripts can write, by name; factories take (path, columns)
+WRITERS = {
+    'xlsx': ('.xlsx', ExcelStreamWriter),
+    'json': ('.json', lambda path, columns=ENTRY_COLUMNS: JsonArrayWriter(path)),
+    'parquet': ('.parquet', ParquetStreamWriter),
+}
+
+
+def write_outputs(entries, formats, stem, columns=ENTRY_COLUMNS):
+    """Write entries to one file per format, named stem plus the format's extension.
+
+    xlsx is the slowest writer by far, so when Parquet is written too the
+    xlsx file is converted from it once every entry is in, instead of
+    slowing down the stream. Returns the write_entries stats and a dict of
+    format to path for the files written.
+    """
+    paths = {name: f"{stem}{WRITERS[name][0]}" for name in formats}
+    streamed = [name for name in formats if not (name == 'xlsx' and 'parquet' in formats)]
+    stats = write_entries(entries, [
+        lambda name=name: WRITERS[name][1](paths[name], columns) for name in streamed
+    ])
+    if not stats['entries']:
+        return stats, {}
+
+    if 'xlsx' not in streamed and 'xlsx' in paths:
+        parquet_to_xlsx(paths['parquet'], paths['xlsx'], columns)
+    return stats, paths
+
+
+def write_entries(entries, writer_factories):
+    """Stream entries into every writer as they are produced.
+
+    Writers are only created once the first entry arrives, so a run without
+    entries leaves no empty files behind. Returns a Counter with the number
+    of entries and how many had an underwriter, company and broker.
+    """
+    stats = Counter()
+    writers = []
+    measure = metrics.enabled
+    try:
+        for entry in entries:
+            if not isinstance(entry, dict):
+                # Entry records are turned into the dict they stand for once, for every writer
+                entry = entry.to_dict()
+            if not writers:
+                writers = [factory() for factory in writer_factories]
+            start = time.perf_counter() if measure else 0
+            for writer in writers:
+                writer.write(entry)
+            if measure:
+                metrics.add_time('write', time.perf_counter() - start)
+            stats['entries'] += 1
+            for field in ('underwriter', 'company', 'broker'):
+                if entry.get(field):
+                    stats[field] += 1
+    finally:
+        with metrics.timer('write_close'):
+            for writer in writers:
+                writer.close()
+    return stats
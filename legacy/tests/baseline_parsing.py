@@ -0,0 +1,246 @@
+"""
+The parsing functions of the extractors as they were before the rule packs
+
+Copied from the first versions of onenote_extractor.py (the 'com' pack) and
+onenote_extractor_fixed.py (the 'powershell' pack) for tests/test_parsing.py
+to check the packs against. Keep them as they are.
+"""
+
+import re
+
+
+# onenote_extractor.py
+
+def com_chunk_by_business_entities(content):
+    """Chunk content based on business entity markers"""
+    chunks = []
+
+    lines = content.split('\n')
+    entity_markers = [
+        r'(?:underwriter|broker|agent):\s*([A-Za-z\s&,.\'-]+)',
+        r'(?:company|business|client|account):\s*([A-Za-z\s&,.\'-]+)',
+        r'^([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)\s*(?:LLC|INC|CORP|COMPANY|GROUP)',
+    ]
+
+    current_chunk = ''
+    found_entity = False
+
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+
+        # Check if this line starts a new business entity
+        for pattern in entity_markers:
+            if re.search(pattern, line, re.IGNORECASE):
+                # Save current chunk if it has content
+                if current_chunk.strip() and found_entity:
+                    chunks.append(current_chunk.strip())
+                    current_chunk = ''
+                found_entity = True
+                break
+
+        current_chunk += line + '\n'
+
+        # If chunk gets too long without entity, split it
+        if len(current_chunk) > 1000 and not found_entity:
+            chunks.append(current_chunk.strip())
+            current_chunk = ''
+
+    # Add final chunk
+    if current_chunk.strip():
+        chunks.append(current_chunk.strip())
+
+    return [chunk for chunk in chunks if len(chunk.strip()) > 50]
+
+
+def com_is_valid_business_entry(chunk):
+    """Check if chunk is a valid business entry"""
+    lower_chunk = chunk.lower()
+
+    # Must have underwriter (and not N/A)
+    has_underwriter = 'underwriter' in lower_chunk and 'n/a' not in lower_chunk
+
+    # Or have broker/company AND date
+    has_broker = 'broker' in lower_chunk and 'n/a' not in lower_chunk
+    has_company = bool(re.search(r'(?:company|business|client|account):\s*[a-z]', chunk, re.IGNORECASE))
+    has_date = bool(re.search(r'\d{1,2}[/-]\d{1,2}[/-]\d{2,4}', chunk))
+
+    return has_underwriter or ((has_broker or has_company) and has_date)
+
+
+def com_extract_business_metadata(chunk):
+    """Extract business metadata from chunk"""
+    metadata = {}
+
+    # Extract underwriter
+    underwriter_match = re.search(r'underwriter:\s*([A-Za-z\s&,.\'-]+)', chunk, re.IGNORECASE)
+    if underwriter_match:
+        metadata['underwriter'] = underwriter_match.group(1).strip()
+
+    # Extract company
+    company_match = re.search(r'(?:company|business|client|account):\s*([A-Za-z\s&,.\'-]+)', chunk, re.IGNORECASE)
+    if company_match:
+        metadata['company'] = company_match.group(1).strip()
+
+    # Extract broker
+    broker_match = re.search(r'broker:\s*([A-Za-z\s&,.\'-]+)', chunk, re.IGNORECASE)
+    if broker_match:
+        metadata['broker'] = broker_match.group(1).strip()
+
+    # Extract dates
+    dates = re.findall(r'\d{1,2}[/-]\d{1,2}[/-]\d{2,4}', chunk)
+    if dates:
+        metadata['dates'] = ', '.join(dates)
+        metadata['primary_date'] = dates[0]
+
+    # Extract money amounts
+    amounts = re.findall(r'\$[\d,]+(?:\.\d{2})?', chunk)
+    if amounts:
+        metadata['amounts'] = ', '.join(amounts)
+
+    return metadata
+
+
+# onenote_extractor_fixed.py
+
+def powershell_chunk_by_business_entities(content):
+    """Chunk content based on business entity markers"""
+    chunks = []
+
+    lines = content.split('\n')
+    entity_patterns = [
+        r'underwriter:?\s*([A-Za-z\s&,.\'-]+)',
+        r'(?:company|business|client|account):?\s*([A-Za-z\s&,.\'-]+)',
+        r'^([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)\s*(?:LLC|INC|CORP|COMPANY|GROUP)',
+        r'\b[A-Z][a-z]+\s+[A-Z][a-z]+\s+(?:LLC|INC|CORP|COMPANY)\b'
+    ]
+
+    current_chunk = ''
+    found_entity = False
+
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+
+        # Check if this line starts a new business entity
+        for pattern in entity_patterns:
+            if re.search(pattern, line, re.IGNORECASE):
+                # Save current chunk if it has content
+                if current_chunk.strip() and found_entity:
+                    chunks.append(current_chunk.strip())
+                    current_chunk = ''
+                found_entity = True
+                break
+
+        current_chunk += line + '\n'
+
+        # If chunk gets too long without entity, split it
+        if len(current_chunk) > 800 and not found_entity:
+            chunks.append(current_chunk.strip())
+            current_chunk = ''
+
+    # Add final chunk
+    if current_chunk.strip():
+        chunks.append(current_chunk.strip())
+
+    return [chunk for chunk in chunks if len(chunk.strip()) > 30]
+
+
+def powershell_is_valid_business_entry(chunk):
+    """Check if chunk is a valid business entry"""
+    lower_chunk = chunk.lower()
+
+    # Must have underwriter (and not N/A)
+    has_underwriter = ('underwriter' in lower_chunk or 'underwritten' in lower_chunk) and 'n/a' not in lower_chunk
+
+    # Or have broker/company AND date
+    has_broker = 'broker' in lower_chunk and 'n/a' not in lower_chunk
+    has_company = bool(re.search(r'(?:company|business|client|account)[:\s]*[a-z]', chunk, re.IGNORECASE))
+    has_date = bool(re.search(r'\d{1,2}[/-]\d{1,2}[/-]\d{2,4}', chunk))
+
+    # Also accept entries with company names ending in LLC, INC, etc
+    has_business_name = bool(re.search(r'[A-Z][a-z]+\s+[A-Z][a-z]+\s+(?:LLC|INC|CORP|COMPANY)', chunk))
+
+    return has_underwriter or ((has_broker or has_company or has_business_name) and has_date)
+
+
+def powershell_extract_business_metadata(chunk):
+    """Extract business metadata from chunk"""
+    metadata = {}
+
+    # Extract underwriter
+    underwriter_patterns = [
+        r'underwriter:?\s*([A-Za-z\s&,.\'-]+)',
+        r'underwritten\s+by\s*([A-Za-z\s&,.\'-]+)'
+    ]
+
+    for pattern in underwriter_patterns:
+        match = re.search(pattern, chunk, re.IGNORECASE)
+        if match:
+            metadata['underwriter'] = match.group(1).strip()
+            break
+
+    # Extract company
+    company_match = re.search(r'(?:company|business|client|account):?\s*([A-Za-z\s&,.\'-]+)', chunk, re.IGNORECASE)
+    if company_match:
+        metadata['company'] = company_match.group(1).strip()
+
+    # Extract broker
+    broker_match = re.search(r'broker:?\s*([A-Za-z\s&,.\'-]+)', chunk, re.IGNORECASE)
+    if broker_match:
+        metadata['broker'] = broker_match.group(1).strip()
+
+    # Extract business names
+    business_name_match = re.search(r'([A-Z][a-z]+\s+[A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)\s*(?:LLC|INC|CORP|COMPANY)', chunk)
+    if business_name_match and 'company' not in metadata:
+        metadata['company'] = business_name_match.group(1).strip()
+
+    # Extract dates
+    dates = re.findall(r'\d{1,2}[/-]\d{1,2}[/-]\d{2,4}', chunk)
+    if dates:
+        metadata['dates'] = ', '.join(dates)
+        metadata['primary_date'] = dates[0]
+
+    # Extract money amounts
+    amounts = re.findall(r'\$[\d,]+(?:\.\d{2})?', chunk)
+    if amounts:
+        metadata['amounts'] = ', '.join(amounts)
+
+    return metadata
+
+
+BASELINE = {
+    'com': (com_chunk_by_business_entities, com_is_valid_business_entry,
+            com_extract_business_metadata),
+    'powershell': (powershell_chunk_by_business_entities, powershell_is_valid_business_entry,
+                   powershell_extract_business_metadata),
+}
+
+
+def parse_business_entries(content_list, pack):
+    """parse_business_entries of the extractors, without the source columns"""
+    chunk_by_business_entities, is_valid_business_entry, extract_business_metadata = BASELINE[pack]
+    business_entries = []
+
+    for page_data in content_list:
+        content = page_data['content']
+        if not content.strip():
+            continue
+
+        # Split content into potential business entries
+        entries = chunk_by_business_entities(content)
+
+        for entry in entries:
+            if is_valid_business_entry(entry):
+                metadata = extract_business_metadata(entry)
+
+                business_entry = {
+                    'raw_content': entry,
+                    **metadata
+                }
+
+                business_entries.append(business_entry)
+
+    return business_entries
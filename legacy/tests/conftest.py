@@ -0,0 +1,9 @@
+"""
+Puts the legacy modules and the benchmarks' synthetic notebooks on the import path
+"""
+
+import os
+import sys
+
+TESTS = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [os.path.dirname(TESTS), os.path.join(os.path.dirname(TESTS), 'benchmarks')]
@@ -0,0 +1,237 @@
+"""
+Writes small MS-ONESTORE section files for the offline reader's tests
+
+Lays a section out the way OneNote 2010 and later do: a root file node list
+naming the section's object space and one object space per page, each
+with a revision manifest list whose revisions hold object groups of
+property sets (MS-ONESTORE 2.1 and 2.5). Pages may have several revisions,
+each depending on the one before, and a revision can be put in another
+context (as OneNote keeps page versions) to check it is not read as the
+page's current content.
+
+Running this module rewrites tests/data/Underwriting/Deals.one, the
+fixture tests/test_onestore.py reads:
+
+    python tests/onestore_writer.py
+"""
+
+import os
+import struct
+import uuid
+
+from onenote_onestore import (FRAGMENT_FOOTER_MAGIC, FRAGMENT_HEADER_MAGIC, HEADER_SIZE,
+                              ONE_FILE_TYPE, ONESTORE_FILE_FORMAT, ROOT_LIST_OFFSET)
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'Underwriting', 'Deals.one')
+
+# Object classes and properties (MS-ONE 2.1.12, 2.2)
+JCID_SECTION_NODE = 0x00060007
+JCID_PAGE_SERIES_NODE = 0x00060008
+JCID_PAGE_NODE = 0x0006000B
+JCID_OUTLINE_NODE = 0x0006000C
+JCID_OUTLINE_ELEMENT_NODE = 0x0006000D
+JCID_RICH_TEXT_OE_NODE = 0x0006000E
+JCID_PAGE_METADATA = 0x00020030
+ELEMENT_CHILD_NODES = 0x24001C1F
+CONTENT_CHILD_NODES = 0x24001C20
+CHILD_GRAPH_SPACE_ELEMENT_NODES = 0x2C001D63
+RICH_EDIT_TEXT_UNICODE = 0x1C001C22
+CACHED_TITLE_STRING = 0x1C001CF3
+PAGE_LEVEL = 0x14001DFF
+
+NIL_LIST = (0xFFFFFFFFFFFFFFFF, 0)
+DEFAULT_CONTEXT = (uuid.UUID(int=0), 0)
+# Seeds the GUIDs, so the fixture is the same every time it is written
+NAMESPACE = uuid.UUID('0f1c5e2a-6f0e-4a53-9b7e-2d1b7c3e9a10')
+
+
+def guid(name):
+    return uuid.uuid5(NAMESPACE, name)
+
+
+def extended_guid(value):
+    return value[0].bytes_le + struct.pack('<I', value[1])
+
+
+def compact_id(index, n):
+    return struct.pack('<I', (index << 8) | n)
+
+
+class SectionWriter:
+    """Appends file node lists and property sets to a revision store being built"""
+
+    def __init__(self):
+        self.data = bytearray(HEADER_SIZE)
+        self.list_ids = iter(range(1, 1 << 20))
+
+    def add(self, data):
+        """Append data 8-byte aligned; returns its (stp, cb) reference"""
+        self.data += bytes(-len(self.data) % 8)
+        stp = len(self.data)
+        self.data += data
+        return stp, len(data)
+
+    @staticmethod
+    def node(node_id, body=b'', reference=None, base_type=1):
+        """A FileNode, with a 64-bit offset and 32-bit size reference if given"""
+        if reference is not None:
+            body = struct.pack('<QI', *reference) + body
+        else:
+            base_type = 0
+        return struct.pack('<I', node_id | (4 + len(body)) << 10 | base_type << 27) + body
+
+    def node_list(self, nodes, fragments=1):
+        """Write nodes as a file node list of that many fragments; returns its reference"""
+        list_id = next(self.list_ids)
+        size = -(-len(nodes) // fragments)
+        parts = [nodes[start:start + size] for start in range(0, len(nodes), size)] or [[]]
+        following = NIL_LIST
+        for sequence, part in reversed(list(enumerate(parts))):
+            following = self.add(
+                struct.pack('<QII', FRAGMENT_HEADER_MAGIC, list_id, sequence) + b''.join(part)
+                + struct.pack('<I', 0xFF) + struct.pack('<QIQ', *following, FRAGMENT_FOOTER_MAGIC)
+            )
+        return following
+
+    def property_set(self, properties, oids=(), osids=()):
+        """An ObjectSpaceObjectPropSet; properties are (id, bytes), ids are CompactIDs"""
+        data = struct.pack('<I', len(oids) | (0 if osids else 1 << 31)) + b''.join(oids)
+        if osids:
+            data += struct.pack('<I', len(osids)) + b''.join(osids)
+        data += struct.pack('<H', len(properties))
+        data += b''.join(struct.pack('<I', prid) for prid, _ in properties)
+        data += b''.join(value for _, value in properties)
+        return self.add(data)
+
+    def revision(self, rid, dependent, guids, objects, roots, context=DEFAULT_CONTEXT):
+        """A revision manifest (RevisionManifestStart6 or, in another context, Start7)
+
+        guids fills the global ID table; objects are (compact id, jcid,
+        property set reference) and roots (compact id, root role).
+        """
+        table = [self.node(0x022)]
+        table += [self.node(0x024, struct.pack('<I', index) + value.bytes_le)
+                  for index, value in enumerate(guids)]
+        table.append(self.node(0x028))
+        declarations = [self.node(0x0A4, oid + struct.pack('<I', jcid) + b'\x00\x01', reference)
+                        for oid, jcid, reference in objects]
+        group_id = (guid(f'group {rid}'), 1)
+        group = self.node_list([self.node(0x0B4, extended_guid(group_id)), *table, *declarations,
+                                self.node(0x0B8)], fragments=2)
+
+        start = extended_guid(rid) + extended_guid(dependent) + struct.pack('<IH', 1, 0)
+        if context != DEFAULT_CONTEXT:
+            start = self.node(0x01F, start + extended_guid(context))
+        else:
+            start = self.node(0x01E, start)
+        root_references = []
+        for oid, role in roots:
+            index, n = struct.unpack('<I', oid)[0] >> 8, oid[0]
+            root_references.append(self.node(0x05A, extended_guid((guids[index], n))
+                                             + struct.pack('<I', role)))
+        # Revisions of .one files only refer to objects by ExtendedGUID, so have no ID table
+        return [start, self.node(0x0B0, extended_guid(group_id), group), *root_references,
+                self.node(0x01C)]
+
+    def object_space(self, gosid, revisions):
+        revision_list = self.node_list([self.node(0x014, extended_guid(gosid) + struct.pack('<I', 0))]
+                                       + [node for revision in revisions for node in revision])
+        return self.node_list([self.node(0x00C, extended_guid(gosid)),
+                               self.node(0x010, b'', revision_list, base_type=2)])
+
+
+def text(value):
+    data = value.encode('utf-16-le')
+    return struct.pack('<I', len(data)) + data
+
+
+def page_revision(writer, name, rid, dependent, title, paragraphs, context=DEFAULT_CONTEXT):
+    """A page revision: page node -> outline -> one rich text element per paragraph, plus metadata
+
+    Paragraph i is always object i + 10 of the page, so a later revision
+    replaces its text by declaring the same object again; a paragraph of
+    None is left as the revision depended on has it.
+    """
+    page_guid = guid(f'{name} objects')
+    objects = []
+    elements = []
+    for number, paragraph in enumerate(paragraphs, 10):
+        oid = compact_id(0, number)
+        if paragraph is not None:
+            objects.append((oid, JCID_RICH_TEXT_OE_NODE,
+                            writer.property_set([(RICH_EDIT_TEXT_UNICODE, text(paragraph))])))
+        elements.append(oid)
+    outline = compact_id(0, 2)
+    objects.append((outline, JCID_OUTLINE_NODE, writer.property_set(
+        [(CONTENT_CHILD_NODES, struct.pack('<I', len(elements)))], elements)))
+    page = compact_id(0, 1)
+    objects.append((page, JCID_PAGE_NODE, writer.property_set(
+        [(ELEMENT_CHILD_NODES, struct.pack('<I', 1)), (PAGE_LEVEL, struct.pack('<I', 1))], [outline])))
+    metadata = compact_id(0, 3)
+    objects.append((metadata, JCID_PAGE_METADATA, writer.property_set([(CACHED_TITLE_STRING, text(title))])))
+    return writer.revision(rid, dependent, [page_guid], objects, [(page, 1), (metadata, 2)], context)
+
+
+def write_section(path, pages):
+    """Write a section file of pages: (name, [(title, paragraphs, context or None), ...]) each"""
+    writer = SectionWriter()
+    page_spaces = []
+    for name, revisions in pages:
+        gosid = (guid(f'{name} space'), 1)
+        manifests = []
+        dependent = (uuid.UUID(int=0), 0)
+        for number, (title, paragraphs, context) in enumerate(revisions):
+            rid = (guid(f'{name} revision {number}'), 1)
+            manifests.append(page_revision(writer, name, rid, dependent, title, paragraphs,
+                                           context or DEFAULT_CONTEXT))
+            if not context:
+                dependent = rid
+        page_spaces.append((gosid, writer.object_space(gosid, manifests)))
+
+    # Section node -> page series -> the page object spaces, in order
+    section_gosid = (guid('section space'), 1)
+    guids = [guid('section objects')] + [gosid[0] for gosid, _ in page_spaces]
+    series = compact_id(0, 2)
+    series_set = writer.property_set(
+        [(CHILD_GRAPH_SPACE_ELEMENT_NODES, struct.pack('<I', len(page_spaces)))],
+        osids=[compact_id(index, 1) for index in range(1, len(guids))]
+    )
+    section = compact_id(0, 1)
+    section_set = writer.property_set([(ELEMENT_CHILD_NODES, struct.pack('<I', 1))], [series])
+    revision = writer.revision((guid('section revision'), 1), (uuid.UUID(int=0), 0), guids,
+                               [(series, JCID_PAGE_SERIES_NODE, series_set),
+                                (section, JCID_SECTION_NODE, section_set)], [(section, 1)])
+    section_space = writer.object_space(section_gosid, [revision])
+
+    root = writer.node_list([writer.node(0x004, extended_guid(section_gosid)),
+                             writer.node(0x008, extended_guid(section_gosid), section_space, base_type=2)]
+                            + [writer.node(0x008, extended_guid(gosid), reference, base_type=2)
+                               for gosid, reference in page_spaces])
+    writer.data[0:16] = ONE_FILE_TYPE
+    writer.data[48:64] = ONESTORE_FILE_FORMAT
+    struct.pack_into('<QI', writer.data, ROOT_LIST_OFFSET, *root)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(writer.data)
+
+
+# Pages of the fixture; a context marks a revision kept as an older page version
+FIXTURE_PAGES = [
+    ('q1', [
+        ('Q1 Deals', ['Underwriter: John Smith', 'Company: Acme LLC'], None),
+        ('Q1 Deals', ['Underwriter: John Smith', 'Company: Acme Holdings LLC',
+                      'Date: 01/02/2024 amount $5,000'], None),
+        ('Q1 Deals (draft)', ['Underwriter: Draft Person', 'Company: Draft Co'],
+         (guid('version history'), 1)),
+    ]),
+    ('empty', [('Empty', [], None)]),
+    ('notes', [
+        ('Notes', ['Broker: Jane Doe', 'Client: Bobé Inc'], None),
+        ('Notes', [None, None, 'Underwritten by Mark Lee on 3/4/2023'], None),
+    ]),
+]
+
+
+if __name__ == '__main__':
+    write_section(FIXTURE, FIXTURE_PAGES)
+    print(f"Wrote {FIXTURE}")
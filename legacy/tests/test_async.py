@@ -0,0 +1,72 @@
+"""
+AsyncExtractor runs that stop part way must not let the index drop the pages they left out
+"""
+
+import sqlite3
+from collections import Counter
+
+from onenote_async import AsyncExtractor
+from onenote_backends import ReplayBackend
+from onenote_index import EntryIndex
+from onenote_parsing import iter_business_entries, rule_pack
+from synthetic import generate_pages, record_notebook
+
+PAGES = 200
+
+
+def index_run(pages, path, extractor):
+    """One --index run the way the extractor scripts do it; returns its page stats"""
+    scanner, entry_extractor = rule_pack('com')
+    stats = Counter()
+    with EntryIndex(path) as index:
+        entries = iter_business_entries(index.track_pages(pages, stats), scanner, entry_extractor, stats)
+        for _ in index.index_entries(entries):
+            pass
+        if not extractor.incomplete():
+            stats['pruned_pages'] = index.prune()
+    return stats
+
+
+def indexed_pages(path):
+    with sqlite3.connect(path) as db:
+        return db.execute('SELECT COUNT(*) FROM pages').fetchone()[0]
+
+
+def cancel_after(extractor, count):
+    """The extractor's pages, cancelling the run once count of them have come through"""
+    for number, page_data in enumerate(extractor.iter_pages(), 1):
+        if number == count:
+            extractor.cancel()
+        yield page_data
+
+
+def test_complete_run_prunes(tmp_path):
+    record_notebook(generate_pages(PAGES), tmp_path / 'notebook')
+    extractor = AsyncExtractor(ReplayBackend(tmp_path / 'notebook'))
+    stats = index_run(extractor.iter_pages(), tmp_path / 'index.db', extractor)
+    assert stats['pages'] == PAGES
+    assert not extractor.incomplete()
+    assert indexed_pages(tmp_path / 'index.db') == PAGES
+
+
+def test_cancelled_run_keeps_unfetched_pages(tmp_path):
+    record_notebook(generate_pages(PAGES), tmp_path / 'notebook')
+    full = AsyncExtractor(ReplayBackend(tmp_path / 'notebook'))
+    index_run(full.iter_pages(), tmp_path / 'index.db', full)
+
+    extractor = AsyncExtractor(ReplayBackend(tmp_path / 'notebook'))
+    stats = index_run(cancel_after(extractor, 20), tmp_path / 'index.db', extractor)
+    assert 20 <= stats['pages'] < PAGES
+    assert extractor.incomplete()
+    # Every page was either delivered or counted as skipped
+    assert extractor.stats['pages'] + extractor.stats['skipped_pages'] == PAGES
+    assert 'pruned_pages' not in stats
+    assert indexed_pages(tmp_path / 'index.db') == PAGES
+
+
+def test_hierarchy_error_is_incomplete(tmp_path):
+    (tmp_path / 'notebook').mkdir()
+    extractor = AsyncExtractor(ReplayBackend(tmp_path / 'notebook'))
+    assert list(extractor.iter_pages()) == []
+    assert extractor.stats['run_errors'] == 1
+    assert extractor.incomplete()
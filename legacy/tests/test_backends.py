@@ -0,0 +1,39 @@
+"""
+PowerShellBackend against the benchmarks' stand-in for PowerShell
+"""
+
+import logging
+import os
+import sys
+
+from onenote_backends import PowerShellBackend, powershell_literal
+
+STUB = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks',
+                    'powershell_stub.py')
+
+
+def stub_backend(*args):
+    return PowerShellBackend('notebook.one', command=[sys.executable, STUB, *args])
+
+
+def test_page_progress_is_debug_only(caplog):
+    with caplog.at_level(logging.INFO, logger='onenote_backends'):
+        pages = list(stub_backend('--pages', '5').iter_pages())
+    assert len(pages) == 5
+    messages = [record.getMessage() for record in caplog.records]
+    assert 'Processing OneNote file: stub' in messages
+    assert not any('Page:' in message for message in messages)
+
+    caplog.clear()
+    with caplog.at_level(logging.DEBUG, logger='onenote_backends'):
+        list(stub_backend('--pages', '5').iter_pages())
+    assert sum('Page:' in record.getMessage() for record in caplog.records) == 5
+
+
+def test_file_path_is_a_literal():
+    path = "C:\\Notes\\$(Remove-Item x) $env:TEMP it's `n ‘quoted’.one"
+    backend = PowerShellBackend(path)
+    literal = "'C:\\Notes\\$(Remove-Item x) $env:TEMP it''s `n ‘‘quoted’’.one'"
+    assert powershell_literal(path) == literal
+    assert f'Resolve-Path -LiteralPath {literal}' in backend.hierarchy_script(open_file=True)
+    assert "GetPageContent('{A}{1}''', [ref]$xml)" in backend.page_script("{A}{1}'")
@@ -0,0 +1,50 @@
+"""
+EntryIndex pruning only drops pages of the sections a run walked
+"""
+
+from collections import Counter
+
+from onenote_index import EntryIndex
+from onenote_parsing import iter_business_entries, rule_pack
+from synthetic import generate_pages, page_id
+
+
+def section_pages(section, first, count):
+    """count synthetic pages of one section file of the Underwriting notebook"""
+    pages = generate_pages(count, seed=first)
+    for number, page_data in enumerate(pages, first):
+        page_data.update(notebook='Underwriting', section=section, page_id=page_id(number),
+                         last_modified='2025-01-01T00:00:00.000Z')
+    return pages
+
+
+def index_run(path, pages):
+    """One complete --index run over pages; returns its page stats"""
+    scanner, extractor = rule_pack('com')
+    stats = Counter()
+    with EntryIndex(path) as index:
+        entries = iter_business_entries(index.track_pages(pages, stats), scanner, extractor, stats)
+        for _ in index.index_entries(entries):
+            pass
+        stats['pruned_pages'] = index.prune()
+    return stats
+
+
+def indexed_sections(path):
+    with EntryIndex(path) as index:
+        return Counter(section for section, in index.db.execute('SELECT section FROM pages'))
+
+
+def test_section_runs_keep_sibling_sections(tmp_path):
+    index_run(tmp_path / 'index.db', section_pages('SectionA', 0, 10))
+    stats = index_run(tmp_path / 'index.db', section_pages('SectionB', 10, 15))
+    assert stats['pruned_pages'] == 0
+    assert indexed_sections(tmp_path / 'index.db') == {'SectionA': 10, 'SectionB': 15}
+
+
+def test_prune_drops_pages_gone_from_a_walked_section(tmp_path):
+    index_run(tmp_path / 'index.db', section_pages('SectionA', 0, 10) + section_pages('SectionB', 10, 15))
+    stats = index_run(tmp_path / 'index.db', section_pages('SectionB', 10, 15)[:-3])
+    assert stats['indexed_pages'] == 0
+    assert stats['pruned_pages'] == 3
+    assert indexed_sections(tmp_path / 'index.db') == {'SectionA': 10, 'SectionB': 12}
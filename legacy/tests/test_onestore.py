@@ -0,0 +1,51 @@
+"""
+Offline .one reading against the checked-in section file (see onestore_writer.py)
+"""
+
+import shutil
+
+import pytest
+
+from onenote_onestore import OneStoreError, OneStoreReader, iter_offline_pages
+from onestore_writer import FIXTURE, FIXTURE_PAGES, write_section
+
+EXPECTED = [
+    {
+        'notebook': 'Underwriting',
+        'section': 'Deals',
+        'page': 'Q1 Deals',
+        'content': 'Underwriter: John Smith\nCompany: Acme Holdings LLC\nDate: 01/02/2024 amount $5,000',
+        'page_id': '{A330503C-ECC7-542D-8725-6ECB9A2C7E03}{1}',
+    },
+    {
+        'notebook': 'Underwriting',
+        'section': 'Deals',
+        'page': 'Notes',
+        'content': 'Broker: Jane Doe\nClient: Bobé Inc\nUnderwritten by Mark Lee on 3/4/2023',
+        'page_id': '{01A8B094-4B0D-5AB3-AFA5-AC575F0466EF}{1}',
+    },
+]
+
+
+def test_section_file_pages():
+    # The current revision of each page, without the empty page or the draft version
+    assert list(iter_offline_pages(FIXTURE)) == EXPECTED
+
+
+def test_notebook_folder_names_the_notebook(tmp_path):
+    shutil.copy(FIXTURE, tmp_path / 'Deals.one')
+    assert [page['notebook'] for page in iter_offline_pages(tmp_path)] == [tmp_path.name] * 2
+
+
+def test_fixture_matches_its_writer(tmp_path):
+    write_section(tmp_path / 'Deals.one', FIXTURE_PAGES)
+    with open(FIXTURE, 'rb') as f:
+        assert (tmp_path / 'Deals.one').read_bytes() == f.read()
+
+
+def test_truncated_file(tmp_path):
+    with open(FIXTURE, 'rb') as f:
+        (tmp_path / 'Deals.one').write_bytes(f.read()[:2048])
+    with pytest.raises(OneStoreError):
+        with OneStoreReader(tmp_path / 'Deals.one') as reader:
+            list(reader.iter_pages())
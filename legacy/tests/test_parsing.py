@@ -0,0 +1,150 @@
+"""
+The rule packs against the original parsing functions (see baseline_parsing.py)
+
+Every page is parsed by the original chunk/validate/metadata loop and by
+each way the extractor runs a pack: chunks of the scanner analyzed one by
+one, the has_keyword/keyword_spans prefilters of page_entries, and the same
+with metrics on. The pages are synthetic notebooks with keywords in other
+cases, non-ASCII letters (including the ones IGNORECASE matches to ASCII
+letters that str.lower() keeps apart) and uneven whitespace mixed in.
+"""
+
+import random
+
+import pytest
+
+from baseline_parsing import BASELINE, parse_business_entries
+from onenote_metrics import metrics
+from onenote_parsing import page_entries, rule_pack
+from synthetic import generate_notebook, generate_pages
+
+KEYWORDS = ['underwriter', 'underwritten', 'broker', 'agent', 'company', 'business', 'client',
+            'account', 'llc', 'inc', 'corp', 'group']
+
+# Long s and Kelvin sign (IGNORECASE: s, k; lower(): themselves, k), dotless i and
+# dotted capital I (IGNORECASE: i; lower(): themselves, i plus a combining dot)
+FOLDED = {'s': 'ſ', 'k': 'K', 'i': 'ıİ'}
+
+# Letters whose case mapping changes the text's length, and other non-ASCII text
+NON_ASCII = ['é', 'É', 'ß', 'ẞ', 'Σ', 'ς', 'ﬃ', 'ǅ', 'İ', 'ı', 'ſ', 'K', 'Å', '日本', '́', 'ŉ']
+
+WHITESPACE = ['  ', '\t', '\r', '\xa0', '　', '\x0b', '\x0c', ' ', '\x85']
+
+
+def recase(rng, word):
+    return rng.choice([word.upper(), word.title(), word.swapcase(),
+                       ''.join(rng.choice((c.lower(), c.upper())) for c in word)])
+
+
+def fold(rng, word):
+    """word with one of its s, k or i letters swapped for a non-ASCII look-alike"""
+    places = [index for index, c in enumerate(word) if c.lower() in FOLDED]
+    if not places:
+        return word
+    index = rng.choice(places)
+    return word[:index] + rng.choice(FOLDED[word[index].lower()]) + word[index + 1:]
+
+
+def mutate_line(rng, line):
+    roll = rng.random()
+    if roll < 0.55:
+        return line
+    lower = line.lower()
+    found = [keyword for keyword in KEYWORDS if keyword in lower]
+    if roll < 0.7 and found:
+        start = lower.find(rng.choice(found))
+        end = start + len(max((k for k in found if lower.startswith(k, start)), key=len))
+        word = line[start:end]
+        word = fold(rng, word) if rng.random() < 0.5 else recase(rng, word)
+        return line[:start] + word + line[end:]
+    if roll < 0.82:
+        index = rng.randint(0, len(line))
+        return line[:index] + rng.choice(NON_ASCII) + line[index:]
+    if roll < 0.92:
+        return rng.choice(WHITESPACE) + line + rng.choice(WHITESPACE)
+    if roll < 0.96:
+        return line + rng.choice([' n/a', ' N/A', ' (n/a)'])
+    return line + '\n' + rng.choice(['', ' ', '\t'])
+
+
+def mutated(pages, seed):
+    rng = random.Random(seed)
+    for page_data in pages:
+        page_data['content'] = '\n'.join(mutate_line(rng, line)
+                                         for line in page_data['content'].split('\n'))
+    return pages
+
+
+PAGES = (generate_pages(150, seed=1) + generate_notebook(40, business_share=0.3, seed=2)
+         + mutated(generate_pages(300, seed=3), seed=4)
+         + mutated(generate_notebook(60, business_share=0.5, meeting_lines=20, seed=5), seed=6))
+
+CHUNKS = [
+    'Underwriter: John Smith on the renewal',
+    'UNDERWRITER: JOHN SMITH on the renewal',
+    'Underwrıter: John Smith on the renewal',
+    'UNDERWRİTER: John Smith on the renewal',
+    'Underwritten by Mark Lee on 3/4/2023',
+    'UNDERWRİTTEN BY Mark Lee on 3/4/2023',
+    'Underwriter: John Smith, prior carrier N/A',
+    'Broker: Jane Doe 01/02/2024',
+    'BroKer: Jane Doe 01/02/2024',
+    'Buſineſs: Acme Holdings 1/2/24',
+    'ACCOUNT: Acme 12-31-2024 $5,000.00',
+    'Client Acme Widgets LLC 5/6/2025',
+    'Acme Widgets CORP 5/6/2025 Σίσυφος',
+    'Straße Holdings LLC 5/6/2025',
+    'Company: Bobé Inc 01/02/2024',
+    'ﬃcompany: x 1/2/2024',
+    'Team sync 1/2/2024: roadmap review, $1,000 offsite',
+]
+
+
+@pytest.fixture(params=['plain', 'prefiltered', 'measured'])
+def parse(request):
+    """Parse pages with a pack the way the extractor can, into dicts like the original"""
+    def plain(pages, scanner, extractor):
+        entries = []
+        for page_data in pages:
+            for chunk in scanner.chunk(page_data['content']):
+                is_valid, metadata = extractor.analyze(chunk)
+                if is_valid:
+                    entries.append({'raw_content': chunk, **metadata})
+        return entries
+
+    def prefiltered(pages, scanner, extractor):
+        return [entry.page_dict() for page_data in pages
+                for entry in page_entries(page_data, scanner, extractor)]
+
+    if request.param == 'plain':
+        return plain
+    if request.param == 'measured':
+        metrics.enabled = True
+        request.addfinalizer(lambda: setattr(metrics, 'enabled', False))
+    return prefiltered
+
+
+def items(entries):
+    """Entries as lists of items, so the key order counts too"""
+    return [list(entry.items()) for entry in entries]
+
+
+@pytest.mark.parametrize('pack', ['com', 'powershell'])
+def test_pages_match_the_original(pack, parse):
+    expected = parse_business_entries(PAGES, pack)
+    assert len(expected) > 500
+    assert items(parse(PAGES, *rule_pack(pack))) == items(expected)
+
+
+@pytest.mark.parametrize('pack', ['com', 'powershell'])
+def test_chunks_match_the_original(pack):
+    _, is_valid_business_entry, extract_business_metadata = BASELINE[pack]
+    _, extractor = rule_pack(pack)
+    for chunk in CHUNKS:
+        if is_valid_business_entry(chunk):
+            expected = True, list(extract_business_metadata(chunk).items())
+        else:
+            expected = False, None
+        is_valid, metadata = extractor.analyze(chunk)
+        assert (is_valid, metadata and list(metadata.items())) == expected, chunk
+        assert items([extractor.metadata(chunk)]) == items([extract_business_metadata(chunk)])
@@ -0,0 +1,57 @@
+"""
+--snapshot runs of onenote_extractor.py replaying a synthetic notebook
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+from synthetic import page_id, record_notebook
+
+EXTRACTOR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                         'onenote_extractor.py')
+
+DEAL = 'Underwriter: John Smith\nAcme Widgets renewal effective 1/2/2024, premium $5,000'
+OTHER = 'Broker: Jane Doe\nNorthwind Traders renewal effective 3/4/2024, limit $1,000,000'
+
+
+def extract(tmp_path, pages, modified=None, *options):
+    """Entry dicts of one --snapshot run over pages"""
+    record_notebook(pages, tmp_path / 'replay', modified)
+    run = tmp_path / 'run'
+    run.mkdir(exist_ok=True)
+    for path in run.glob('onenote_extracted_*'):
+        path.unlink()
+    (tmp_path / 'notebook.one').touch()
+    subprocess.run([sys.executable, EXTRACTOR, str(tmp_path / 'notebook.one'),
+                    '--replay', str(tmp_path / 'replay'), '--snapshot', str(tmp_path / 'snapshot.sqlite'),
+                    '--formats', 'json', *options], cwd=run, check=True, capture_output=True)
+    output, = run.glob('onenote_extracted_*.json')
+    return json.loads(output.read_text(encoding='utf-8'))
+
+
+def test_dedupe_keeps_a_row_per_changed_page(tmp_path):
+    pages = [
+        {'notebook': 'Underwriting', 'section': 'Deals', 'page': 'Acme', 'content': DEAL},
+        {'notebook': 'Underwriting', 'section': 'Deals', 'page': 'Northwind', 'content': OTHER},
+    ]
+    first = extract(tmp_path, pages, None, '--dedupe')
+    assert {entry['page_id'] for entry in first} == {page_id(0), page_id(1)}
+
+    # Northwind's only entry is now a copy of Acme's, which dedupe merges into Acme's row
+    pages[0]['content'] = DEAL + '\n\n' + OTHER
+    pages[1]['content'] = DEAL
+    edited = {0: '2025-02-01T00:00:00.000Z', 1: '2025-02-01T00:00:00.000Z'}
+    delta = extract(tmp_path, pages, edited, '--dedupe')
+
+    rows = {}
+    for entry in delta:
+        rows.setdefault(entry['page_id'], []).append(entry)
+    assert set(rows) == {page_id(0), page_id(1)}
+    # The page title opens the page's first chunk
+    assert [entry['raw_content'] for entry in rows[page_id(0)]] == ['Acme\n' + DEAL, OTHER]
+    assert rows[page_id(0)][0]['duplicates'] == 1
+    # An empty row replaces Northwind's old one, which the merged entry would otherwise leave behind
+    cleared, = rows[page_id(1)]
+    assert cleared['change'] == 'changed' and not cleared['raw_content']